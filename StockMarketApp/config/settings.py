@@ -1,2 +1,93 @@
 # File to configure the settings for the StockMarketApp project
-# This file contains various settings that control the behavior of the application
\ No newline at end of file
+# This file contains various settings that control the behavior of the application
+import os
+
+# Symbol master settings (see data/symbol_master.py)
+NIFTY500_CONSTITUENTS_URL = "https://nsearchives.nseindia.com/content/indices/ind_nifty500list.csv"
+SYMBOL_MASTER_INDICES = ["NIFTY 50", "NIFTY NEXT 50", "NIFTY BANK"]  # Extra indices merged in via nse.get_stocks_in_index()
+
+# API quota settings (see data/quota_manager.py)
+# Each provider maps to a list of token buckets as (capacity, period in seconds)
+API_RATE_LIMITS = {
+    'alphavantage': [(5, 60), (25, 86400)],  # Free tier: 5 calls per minute, 25 calls per day
+    'finnhub': [(60, 60)],  # Free tier: 60 calls per minute
+    'marketaux': [(100, 86400)],  # Free tier: 100 calls per day
+    'nse': [(3, 1)]  # Keep NSE scraping polite: about 3 calls per second
+}
+API_QUOTA_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "api_quota.db")
+API_QUOTA_WAIT_SECONDS = 5  # Longest time a call queues for a token before falling back to the cache
+
+# Record/replay settings for offline benchmarking (see data/replay.py)
+HTTP_MODE = os.getenv('STOCKAPP_HTTP_MODE', 'live')  # 'live', 'record' or 'replay'
+REPLAY_DIR = os.getenv('STOCKAPP_REPLAY_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "recordings"))
+REPLAY_LATENCY_MS = float(os.getenv('STOCKAPP_REPLAY_LATENCY_MS', '0'))  # Mean simulated provider latency
+REPLAY_JITTER_MS = float(os.getenv('STOCKAPP_REPLAY_JITTER_MS', '0'))  # Standard deviation of the simulated latency
+REPLAY_ERROR_RATE = float(os.getenv('STOCKAPP_REPLAY_ERROR_RATE', '0'))  # Share of replayed calls that fail (0.0 - 1.0)
+
+# News store settings (see data/news_store.py)
+NEWS_INGEST_INTERVAL_SECONDS = 900  # Background ingester polls the news providers every 15 minutes
+NEWS_INITIAL_LOOKBACK_DAYS = 2  # How far back the first ingestion run reaches
+
+# Snapshot watcher settings (see data/snapshot_watcher.py)
+SNAPSHOT_POLL_SECONDS = 2  # Polling interval when inotify (watchdog) is not available
+SNAPSHOT_REFRESH_SECONDS = 5  # How often the dashboard checks for a new snapshot version (it re-renders only on a change)
+
+# Dashboard snapshot settings (see data/dashboard_snapshot.py)
+DASHBOARD_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dashboard_snapshot.pkl")
+
+# Price feed settings (see update_current_prices in data/portfolio_data_processor.py)
+PRICE_FEED_INDEX = "NIFTY 500"  # One nse.get_stock_quote_in_index() call quotes every stock of the symbol master's main index
+PRICE_REFRESH_MIN_SECONDS = 60  # A stock's price is not refreshed again within this many seconds
+PRICE_REFRESH_LOCK_SECONDS = 30  # Longest wait for a price refresh running in another process
+
+# Event bus settings (see data/event_bus.py)
+EVENT_BUS_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "event_bus.db")
+EVENT_BUS_POLL_SECONDS = 1  # How often each process checks the shared event log for changes made elsewhere
+EVENT_BUS_RETENTION_SECONDS = 3600  # Events older than this are pruned from the log
+
+# Portfolio risk settings (see data/portfolio_risk.py)
+RISK_BENCHMARK_INDEX = "NIFTY BANK"  # Index in bank_nifty_index_data that beta is measured against
+RISK_LOOKBACK_DAYS = 365  # Calendar days of daily closes used for the returns matrix
+RISK_FREE_RATE = 0.065  # Annual risk-free rate for Sharpe and Sortino (Indian T-bill yield)
+RISK_VAR_CONFIDENCE = 0.95  # Confidence level of the one-day Value at Risk
+TRADING_DAYS_PER_YEAR = 252
+
+# Transaction history settings (see get_transactions_page in data/portfolio_data_processor.py)
+TRANSACTION_PAGE_SIZE = 25  # Transactions per page in the Manage Transactions view
+
+# Scenario simulation settings (see data/portfolio_simulation.py)
+SIMULATION_PATHS = 100_000  # Monte Carlo paths per simulation
+SIMULATION_BAND_POINTS = 40  # Days along the horizon at which the percentile bands are recorded
+SIMULATION_PERCENTILES = (5, 25, 50, 75, 95)
+SIMULATION_CHUNK_ELEMENTS = 4_000_000  # Paths x band points x holdings numbers generated at once (float32, about 16 MB per array, two arrays per chunk)
+SIMULATION_WORKERS = 1  # Above 1, chunks of paths are spread over that many processes
+
+# Ledger snapshot settings (see data/portfolio_ledger.py)
+LEDGER_SNAPSHOT_MIN_EVENTS = 50  # A month end becomes a snapshot once this many transactions were replayed since the previous one
+
+# Performance attribution settings (see data/portfolio_attribution.py)
+ATTRIBUTION_BENCHMARKS = {
+    # Benchmark index -> sector weights in percent (NSE factsheet, approximate; normalised when used)
+    'NIFTY 50': {
+        'Financial Services': 37.5, 'Information Technology': 10.5, 'Oil Gas & Consumable Fuels': 10.0,
+        'Automobile and Auto Components': 7.5, 'Fast Moving Consumer Goods': 6.5, 'Telecommunication': 4.7,
+        'Healthcare': 4.0, 'Construction': 3.8, 'Metals & Mining': 3.6, 'Consumer Durables': 2.9, 'Power': 2.7,
+        'Construction Materials': 2.0, 'Consumer Services': 1.9, 'Capital Goods': 1.4, 'Services': 1.0
+    },
+    'NIFTY BANK': {'Financial Services': 100.0}
+}
+ATTRIBUTION_SECTOR_INDEXES = {
+    # Symbol master sector -> sectoral index in nifty_indexes_data; other sectors earn the benchmark's own return
+    'Financial Services': 'NIFTY FINANCIAL SERVICES',
+    'Information Technology': 'NIFTY IT',
+    'Oil Gas & Consumable Fuels': 'NIFTY OIL & GAS',
+    'Fast Moving Consumer Goods': 'NIFTY FMCG',
+    'Automobile and Auto Components': 'NIFTY AUTO',
+    'Healthcare': 'NIFTY HEALTHCARE INDEX',
+    'Metals & Mining': 'NIFTY METAL',
+    'Consumer Durables': 'NIFTY CONSUMER DURABLES',
+    'Realty': 'NIFTY REALTY',
+    'Media Entertainment & Publication': 'NIFTY MEDIA',
+    'Power': 'NIFTY ENERGY',
+    'Construction': 'NIFTY INFRASTRUCTURE'
+}
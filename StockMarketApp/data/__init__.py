@@ -10,7 +10,24 @@ from .data_processor import compute_rsi, compute_dma # Import data processing fu
 
 from .file_data_processor import read_csv_to_dataframe, read_top_gainers_csv_to_dataframe, read_top_losers_csv_to_dataframe, read_index_valuation_csv_to_dataframe # Import file data processing functions from file_data_processor module
 
-from .portfolio_data_processor import add_transaction, get_all_transactions, get_portfolio_summary, delete_transaction, TransactionType, Transaction, CurrentPrice, initialize_default_prices, update_current_prices, get_last_price_update, test_connection, get_database_stats # Import portfolio data processing functions from portfolio_data_processor module
+from .dashboard_snapshot import load_dashboard_snapshot, write_dashboard_snapshot # Import the consolidated dashboard snapshot functions from dashboard_snapshot module
+
+from .symbol_master import get_symbol_index, search_symbols, is_valid_symbol, build_symbol_master # Import symbol master functions from symbol_master module
+
+from .news_store import ingest_news, read_news_page, read_latest_news # Import news store functions from news_store module
+
+from .transaction_import import import_transactions, parse_contract_note # Import bulk transaction import functions from transaction_import module
+
+from .portfolio_nav import get_portfolio_nav, init_nav_tables # Import daily portfolio NAV functions from portfolio_nav module
+
+from .portfolio_risk import get_portfolio_risk # Import portfolio risk analytics from portfolio_risk module
+from .portfolio_simulation import get_portfolio_simulation, SIMULATION_METHODS # Import the Monte Carlo scenario simulator from portfolio_simulation module
+
+from .portfolio_ledger import get_holdings_as_of # Import the point-in-time holdings view from portfolio_ledger module
+
+from .portfolio_attribution import get_portfolio_attribution, init_attribution_tables # Import the Brinson performance attribution from portfolio_attribution module
+
+from .portfolio_data_processor import add_transaction, get_all_transactions, get_transactions_page, get_portfolio_summary, delete_transaction, TransactionType, Transaction, CurrentPrice, initialize_default_prices, update_current_prices, get_last_price_update, test_connection, get_database_stats, get_realized_pl, rebuild_lot_accounting, reconcile_holdings, add_transactions_bulk, Lot, LotMatch, Holding, Portfolio, get_portfolios, create_portfolio, DEFAULT_PORTFOLIO_ID, get_portfolio_xirr, LedgerEvent, LedgerEventType, LedgerSnapshot # Import portfolio data processing functions from portfolio_data_processor module
 
 __all__ = [
     'read_data', 
@@ -30,8 +47,11 @@ __all__ = [
     'read_top_gainers_csv_to_dataframe',
     'read_top_losers_csv_to_dataframe',
     'read_index_valuation_csv_to_dataframe',
+    'load_dashboard_snapshot',
+    'write_dashboard_snapshot',
     'add_transaction', 
     'get_all_transactions',
+    'get_transactions_page',
     'get_portfolio_summary',
     'delete_transaction',
     'TransactionType',
@@ -41,7 +61,39 @@ __all__ = [
     'update_current_prices',
     'get_last_price_update',
     'test_connection',
-    'get_database_stats'
+    'get_database_stats',
+    'get_realized_pl',
+    'rebuild_lot_accounting',
+    'reconcile_holdings',
+    'add_transactions_bulk',
+    'import_transactions',
+    'parse_contract_note',
+    'Lot',
+    'LotMatch',
+    'Holding',
+    'Portfolio',
+    'get_portfolios',
+    'create_portfolio',
+    'DEFAULT_PORTFOLIO_ID',
+    'get_portfolio_nav',
+    'init_nav_tables',
+    'get_portfolio_risk',
+    'get_portfolio_simulation',
+    'SIMULATION_METHODS',
+    'get_holdings_as_of',
+    'get_portfolio_attribution',
+    'init_attribution_tables',
+    'LedgerEvent',
+    'LedgerEventType',
+    'LedgerSnapshot',
+    'get_portfolio_xirr',
+    'get_symbol_index',
+    'search_symbols',
+    'is_valid_symbol',
+    'build_symbol_master',
+    'ingest_news',
+    'read_news_page',
+    'read_latest_news'
 ]  # Define the public interface of the package
 
 # __all__ = ['etch_stock_ticker_finnhub', 'fetch_market_news', 'fetch_global_market_news', 'read_bank_nifty_data']  # Define the public interface of the package
\ No newline at end of file
@@ -17,26 +17,57 @@ import pandas as pd
 # Looking for specific symbols or tickers from Alpha Vantage API
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.api_config import alpha_vantage_api_key, finnhub_api_key, marketaux_api_key
+from data.quota_manager import acquire, store_response, get_cached_response
+from data import replay
+
+# Shared request helper: every call takes a token from the provider's quota bucket first.
+# When the bucket is empty, the request fails or the provider answers with an error payload
+# (e.g. Alpha Vantage {"Information": "...rate limit..."}), the last good response is returned instead.
+# Requests go through the record/replay adapter (live by default, see data/replay.py).
+def _get_json(provider: str, url: str, cache_key: str, is_valid):
+    if replay.is_replaying() or acquire(provider):
+        try:
+            data = replay.get_json(cache_key, url)
+            if is_valid(data):
+                if not replay.is_replaying():
+                    store_response(cache_key, provider, data)  # Replayed responses stay out of the live response cache
+                return data
+            print(f"{provider} returned an error payload for {cache_key}: {str(data)[:200]}")
+        except Exception as e:
+            print(f"Error calling {provider} for {cache_key}: {e}")
+    else:
+        print(f"{provider} quota exhausted, serving {cache_key} from cache")
+    cached = get_cached_response(cache_key)
+    return cached if cached is not None else {}
+
 def fetch_stock_ticker(keyword: str) -> dict:
     url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={keyword}&apikey={alpha_vantage_api_key}"
-    response = requests.get(url)
-    data = response.json()
+    data = _get_json('alphavantage', url, f"alphavantage:symbol_search:{keyword.lower()}",
+                     lambda d: isinstance(d, dict) and 'bestMatches' in d)
     # Retrieves the value for the 'bestMatches' key from dictionary 'data'
     matches = data.get('bestMatches', []) 
     # Filter results to include only those from India/Bombay region
     filtered = [match for match in matches if match.get('4. region') == 'India/Bombay']
     return (filtered) 
 
-def fetch_global_market_news() -> pd.DataFrame: 
-    url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&limt=10&apikey={alpha_vantage_api_key}"
-    response = requests.get(url)
-    data = response.json()
+def fetch_global_market_news_articles(time_from: str = None) -> list:
+    # Raw Alpha Vantage feed; time_from (YYYYMMDDTHHMM) limits it to articles published after that time
+    url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&sort=LATEST&limit=50&apikey={alpha_vantage_api_key}"
+    if time_from:
+        url += f"&time_from={time_from}"
+    data = _get_json('alphavantage', url, f"alphavantage:news_sentiment:{time_from or 'latest'}",
+                     lambda d: isinstance(d, dict) and 'feed' in d)
     # print(data) # Debug line to check whether API limit is exceeded or not
     # Retrieves the value for the 'feed' key from dictionary 'data'
-    news_data = data.get('feed', [])
+    return data.get('feed', [])
+
+def fetch_global_market_news(time_from: str = None) -> pd.DataFrame: 
+    news_data = fetch_global_market_news_articles(time_from)
     # return (news_data) # Return the list of news articles as a dictionary
     # Convert the list of news articles to a pandas DataFrame
     df = pd.DataFrame.from_dict(news_data)
+    if df.empty:
+        return pd.DataFrame(columns=['Title', 'Summary', 'Source', 'Date', 'URL'])
     selected_df = df[['title', 'summary', 'source', 'time_published', 'url']].copy()
     # Rename the column
     selected_df = selected_df.rename(columns={'source': 'Source', 'title': 'Title', 'summary': 'Summary', 'time_published': 'Date', 'url': 'URL'})
@@ -59,8 +90,8 @@ def fetch_global_market_news() -> pd.DataFrame:
 
 def fetch_stock_ticker_finnhub(symbol: str) -> dict:
     url = f"https://finnhub.io/api/v1/search?q={symbol}&exchange=NS&token={finnhub_api_key}"
-    response = requests.get(url)
-    data = response.json()
+    data = _get_json('finnhub', url, f"finnhub:search:{symbol.lower()}",
+                     lambda d: isinstance(d, list) or (isinstance(d, dict) and 'result' in d))
     if isinstance(data, list) and len(data) > 0:
         result_data = data[0].get('result', [])
     elif isinstance(data, dict):
@@ -77,20 +108,26 @@ def fetch_stock_ticker_finnhub(symbol: str) -> dict:
 # Fetching NIFTY top gainers and losers using NSETOOLS API
 
 # Market news from MarketAux API
-def fetch_market_news(number: int) -> pd.DataFrame:
-    url = f"https://api.marketaux.com/v1/news/all?countries=in&filter_entities=true&limit={number}&published_after=2025-09-10T11:06&api_token={marketaux_api_key}"
-    response = requests.get(url)
-    data = response.json()
+def fetch_market_news_articles(number: int, published_after: str = None) -> list:
+    # Raw MarketAux articles; published_after (YYYY-MM-DDTHH:MM:SS) limits them to newer articles
+    url = f"https://api.marketaux.com/v1/news/all?countries=in&filter_entities=true&limit={number}&api_token={marketaux_api_key}"
+    if published_after:
+        url += f"&published_after={published_after}"
+    data = _get_json('marketaux', url, f"marketaux:news:{number}:{published_after or 'latest'}",
+                     lambda d: isinstance(d, list) or (isinstance(d, dict) and 'data' in d))
     if isinstance(data, list) and len(data) > 0:
-        result_data = data[0].get('data', [])
+        return data[0].get('data', [])
     elif isinstance(data, dict):
-        result_data = data.get('data', [])
-    else:
-        result_data = []
+        return data.get('data', [])
+    return []
 
+def fetch_market_news(number: int, published_after: str = None) -> pd.DataFrame:
+    result_data = fetch_market_news_articles(number, published_after)
     # return (result_data) # Return the list of news articles as a dictionary
     # Convert the list of news articles to a pandas DataFrame
     df = pd.DataFrame.from_dict(result_data)
+    if df.empty:
+        return pd.DataFrame(columns=['title', 'description', 'source', 'published_at', 'url', 'image_url'])
     return df
 
 # Example usage: Fetching market news and printing the output as json
@@ -0,0 +1,120 @@
+# File contains the consolidated dashboard snapshot for the StockMarketApp project
+# The ingestion step (data/ingest_pipeline.py) reads the six dashboard datasets once - the Nifty index and
+# stock quotes from the database and the advance/decline, gainers, losers and index valuation snapshot
+# files - and derives every display frame the dashboard shows: advances and declines already filtered and
+# sorted, all frames reduced to their display columns with display names and 1-based row numbers. The
+# result is written as one versioned file, so a dashboard rerun does a single cached load and only slices
+# the page it shows, whatever the size of the universe.
+#
+# Usage: python data/dashboard_snapshot.py   (rebuilds the snapshot from the current datasets)
+import os
+import sys
+import threading
+import time
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import DASHBOARD_SNAPSHOT_PATH
+from data.database import read_nifty_indexes_data, read_nifty_stocks_quotes
+from data import snapshot_store
+from data.file_data_processor import DATASET_PATHS, load_dataset, get_file_version
+from data.snapshot_watcher import _file_stamp
+
+# Display columns per frame: source column -> column name shown on the dashboard
+_QUOTE_COLUMNS = {'symbol': 'Symbol', 'lastPrice': 'Last Price', 'change': 'Change', 'pChange': 'Change %'}
+DISPLAY_COLUMNS = {
+    'advances': dict(_QUOTE_COLUMNS, totalTradedVolume='Volume'),
+    'declines': dict(_QUOTE_COLUMNS, totalTradedVolume='Volume'),
+    'top_gainers': _QUOTE_COLUMNS,
+    'top_losers': _QUOTE_COLUMNS,
+    'index_valuation': {'index': 'Index', 'pe': 'P/E Ratio', 'pb': 'P/B Ratio', 'dy': 'Dividend Yield (%)'}
+}
+# Display formats of the numeric columns (applied by the page to the rows it shows)
+DISPLAY_FORMATS = {'Last Price': '₹{:.2f}', 'Change': '{:.2f}', 'Change %': '{:.2f}%', 'Volume': '{:,.0f}'}
+
+# ================================================
+# BUILD (ingestion side)
+# ================================================
+
+def _display(df, name):
+    # Keep the display columns under their display names, numbered from 1
+    columns = DISPLAY_COLUMNS[name]
+    if df.empty:
+        return pd.DataFrame(columns=list(columns.values()))
+    df = df.reindex(columns=list(columns)).rename(columns=columns)
+    df.index = range(1, len(df) + 1)
+    return df
+
+def build_dashboard_snapshot() -> dict:
+    # Read every dashboard dataset and derive the display frames; returns the snapshot dict
+    # sources records the snapshot file versions read, so a newer file marks the snapshot as stale
+    sources = {name: _file_stamp(name) for name in DATASET_PATHS}
+    advance_decline = load_dataset('advance_decline')
+    if advance_decline.empty:
+        advances = declines = advance_decline
+    else:
+        advances = advance_decline[advance_decline['pChange'] > 0].sort_values('pChange', ascending=False)
+        declines = advance_decline[advance_decline['pChange'] < 0].sort_values('pChange', ascending=True)
+    return {
+        'version': time.time_ns() // 1_000_000,  # Build time in milliseconds, increases with every build
+        'sources': sources,
+        'indexes': read_nifty_indexes_data(),
+        'stocks': read_nifty_stocks_quotes(),
+        'advances': _display(advances, 'advances'),
+        'declines': _display(declines, 'declines'),
+        'top_gainers': _display(load_dataset('top_gainers'), 'top_gainers'),
+        'top_losers': _display(load_dataset('top_losers'), 'top_losers'),
+        'index_valuation': _display(load_dataset('index_valuation'), 'index_valuation')
+    }
+
+def _write(snapshot, path):
+    # Replace the file atomically, so readers never see a half-written snapshot
+    snapshot_store.write_atomic(path, lambda tmp_path: pd.to_pickle(snapshot, tmp_path))
+
+def write_dashboard_snapshot(path=DASHBOARD_SNAPSHOT_PATH):
+    # Build the snapshot and replace its file; returns (success, message)
+    try:
+        snapshot = build_dashboard_snapshot()
+        _write(snapshot, path)
+        return True, f"Dashboard snapshot version {snapshot['version']} written"
+    except Exception as e:
+        return False, f"Error writing dashboard snapshot: {str(e)}"
+
+# ================================================
+# LOAD (dashboard side)
+# ================================================
+
+_snapshot_cache = None  # ((mtime_ns, size) of the snapshot file, snapshot dict)
+_snapshot_lock = threading.Lock()
+
+def _is_stale(snapshot):
+    # True when a dataset file was replaced after the snapshot was built (e.g. by data_fetch.py)
+    return any(_file_stamp(name) != version for name, version in snapshot['sources'].items())
+
+def load_dashboard_snapshot(path=DASHBOARD_SNAPSHOT_PATH) -> dict:
+    # Return the current dashboard snapshot; the file is read once per version, and rebuilt
+    # here first when it is missing or older than one of its dataset files
+    global _snapshot_cache
+    with _snapshot_lock:
+        file_version = get_file_version(path)
+        if _snapshot_cache is None or _snapshot_cache[0] != file_version:
+            snapshot = None
+            if file_version is not None:
+                try:
+                    snapshot = pd.read_pickle(path)
+                except Exception as e:
+                    print(f"Error reading dashboard snapshot {path}: {e}")
+            _snapshot_cache = (file_version, snapshot)
+        snapshot = _snapshot_cache[1]
+        if snapshot is None or _is_stale(snapshot):
+            snapshot = build_dashboard_snapshot()
+            try:
+                _write(snapshot, path)
+                file_version = get_file_version(path)
+            except Exception as e:
+                print(f"Error writing dashboard snapshot: {e}")  # Still served from memory
+            _snapshot_cache = (file_version, snapshot)
+        return snapshot
+
+if __name__ == "__main__":
+    success, message = write_dashboard_snapshot()
+    print(("OK: " if success else "FAILED: ") + message)
@@ -3,6 +3,8 @@
 # including APIs, databases, and external files. It handles data retrieval,
 # ensuring that the data is up-to-date and formatted correctly for further processing.
 # It also includes functions for handling errors during data fetching and logging the results.
+# NOTE: The fetch -> .csv -> database.py upload flow below is kept for reference only.
+# Ingestion now runs through data/ingest_pipeline.py, which streams fetched records straight into MySQL.
 
 
 # Documentation: of niftystocks can be found at https://pypi.org/project/niftystocks/ 
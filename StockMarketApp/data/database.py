@@ -14,214 +14,9 @@ from sqlalchemy.dialects.mysql import DOUBLE
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-####----Code to read CSV and upload to MySQL using SQLAlchemy----####
-engine = None
-try:
-    # # Read CSV file using pandas - Code block for uploading NIFTY BANK bulk data
-    # df = pd.read_csv('nifty_bank_bulk_data.csv', parse_dates=['Date'], dayfirst=True)
-    # # Read CSV file using pandas - Code block for uploading BANK NIFTY index data
-    # df = pd.read_csv('nifty_bank_index_data.csv', parse_dates=['HistoricalDate'], dayfirst=True)
-    # Read CSV file using pandas - Code vlock for uploading Nifty 50 stock quotes data
-    # df = pd.read_csv('nifty50_stock_quotes.csv', parse_dates=['date365dAgo', 'date30dAgo'], dayfirst=True)
-    # Read CSV file using pandas - Code block for uploading NIFTY 50 index data
-    df = pd.read_csv('nifty_indexes_data.csv', parse_dates=['timeVal'], dayfirst=True)
-
-    # Drop columns not needed
-    # df = df.drop(['RequestNumber', 'Index Name'], axis=1)
-    # df = df.drop(['priority', 'identifier', 'series', 'stockIndClosePrice', 'ffmc'], axis=1)
-#     # Rename columns to snake_case and compatible with SQL naming conventions
-#     df.rename(columns={
-#         'Symbol': 'symbol',
-#         'Series': 'series',
-#         'Date': 'trade_date',
-#         'PrevClose': 'prev_close',
-#         'OpenPrice': 'open_price',
-#         'HighPrice': 'high_price',
-#         'LowPrice': 'low_price',
-#         'LastPrice': 'last_price',
-#         'ClosePrice': 'close_price',
-#         'AveragePrice': 'average_price',
-#         'TotalTradedQuantity': 'total_traded_quantity',
-#         'TurnoverInRs': 'turnover_in_rs',
-#         'No.ofTrades': 'number_of_trades',
-#         'DeliverableQty': 'deliverable_qty',
-#         '%DlyQttoTradedQty': 'percent_dly_qty_to_traded'
-#     }, inplace=True)
-
-    # Rename columns for SQL compatibility
-    # df.rename(columns={
-    #     'INDEX_NAME': 'index_name',
-    #     'HistoricalDate': 'historical_date',
-    #     'OPEN': 'open',
-    #     'HIGH': 'high',
-    #     'LOW': 'low',
-    #     'CLOSE': 'close'
-    # }, inplace=True)
-
-    # Rename columns of Nifty 50 stock quotes data
-    # df.rename(columns={
-    #     'symbol': 'symbol',			
-    #     'open': 'open',	
-    #     'dayHigh': 'day_high',	
-    #     'dayLow': 'day_low',	
-    #     'lastPrice': 'last_price',	
-    #     'previousClose': 'previous_close',	
-    #     'change': 'change',	
-    #     'pChange': 'p_change',    
-    #     'totalTradedVolume': 'total_traded_volume',	
-    #     'totalTradedValue': 'total_traded_value',	
-    #     'yearHigh': 'year_high',	
-    #     'yearLow': 'year_low',	
-    #     'nearWKH': 'near_wk_high',	
-    #     'nearWKL': 'near_wk_low',
-    #     'perChange365d': 'per_change_365d',	
-    #     'perChange30d': 'per_change_30d',	
-    #     'date365dAgo': 'date_365d_ago',	
-    #     'date30dAgo': 'date_30d_ago',	
-    #     'chartTodayPath': 'chart_today_path',	    
-    #     'chart30dPath': 'chart_30d_path',	
-    #     'chart365dPath': 'chart_365d_path',	
-    #     'meta': 'meta'
-    # }, inplace=True)
-    
-    # Rename columns of Nifty indexes data
-    df.rename(columns={
-        'yearLow': 'year_low',	
-        'last': 'last_price',	
-        'indexName': 'index_name',
-        'yearHigh': 'year_high',	
-        'previousClose': 'previous_close',		
-        'high': 'high',	
-        'low': 'low',	
-        'timeVal': 'date_time',	
-        'percChange': 'percentage_change',	
-        'open': 'open',	
-        'indexSubType': 'index_Type'
-    }, inplace=True)
-
-    # Parse historical_date to datetime
-    # df['historical_date'] = pd.to_datetime(df['historical_date'], format="%d %b %Y")
-    # Parse date_365d_ago and date_30d_ago to datetime
-    # df['date_365d_ago'] = pd.to_datetime(df['date_365d_ago'], format="%d %b %Y")
-    # df['date_30d_ago'] = pd.to_datetime(df['date_30d_ago'], format="%d %b %Y")  
-    df['date_time'] = pd.to_datetime(df['date_time'], format="%b %d,%Y %H:%M:%S")
-    # Parse meta column to valid JSON 
-    # df['meta'] = df['meta'].apply(json.dumps) 
-#     # Clean and convert data types
-#     for col in ['total_traded_quantity', 'number_of_trades', 'deliverable_qty']:
-#         df[col] = pd.to_numeric(df[col], errors='coerce')
-
-#     for col in ['prev_close', 'open_price', 'high_price', 'low_price', 'last_price', 'close_price', 'average_price', 'turnover_in_rs', 'percent_dly_qty_to_traded']:
-#         df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Clean and convert data types for BANK INFTY index data
-    # for col in ['open', 'high', 'low', 'close']:
-    #     df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Clean and convert data types for Nifty 50 stock quotes data
-    # for col in ['open', 'day_high', 'day_low', 'last_price', 'previous_close', 'change', 'p_change', 'total_traded_volume', 'total_traded_value', 'year_high', 'year_low', 'near_wk_high', 'near_wk_low','per_change_365d', 'per_change_30d']:
-    #     df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Clean (by removing the commas from the string) and convert data types for Nifty indexes data
-    for col in ['year_low', 'last_price', 'year_high', 'previous_close', 'high', 'low', 'open', 'percentage_change']:
-        df[col] = df[col].astype(str).str.replace(',', '', regex=False).str.strip()
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Create SQLAlchemy engine
-    engine = create_engine(DB_CONNECTION_STRING)
-
-    # Define metadata and table
-    metadata = MetaData()
-#     bank_nifty_table = Table(
-#         'bank_nifty_data', metadata,
-#         Column('id', Integer, primary_key=True, autoincrement=True),
-#         Column('symbol', String(20), nullable=False),
-#         Column('series', String(10), nullable=False),
-#         Column('trade_date', Date, nullable=False),
-#         Column('prev_close', Float),
-#         Column('open_price', Float),
-#         Column('high_price', Float),
-#         Column('low_price', Float),
-#         Column('last_price', Float),
-#         Column('close_price', Float),
-#         Column('average_price', Float),
-#         Column('total_traded_quantity', BigInteger),
-#         Column('turnover_in_rs', DOUBLE),
-#         Column('number_of_trades', Integer),
-#         Column('deliverable_qty', BigInteger),
-#         Column('percent_dly_qty_to_traded', Float),
-#         # UniqueConstraint('symbol', 'trade_date', name='uix_symbol_date')
-#     )
-    # bank_nifty_index_table = Table(
-    #     'bank_nifty_index_data', metadata,
-    #     Column('id', Integer, primary_key=True, autoincrement=True),
-    #     Column('index_name', String(30)),
-    #     Column('historical_date', Date),
-    #     Column('open', Double),
-    #     Column('high', Double),
-    #     Column('low', Double),
-    #     Column('close', Double)
-    # )
-    # nifty50_stock_quotes_table = Table(
-    #     'nifty50_stock_quotes_data', metadata,
-    #     Column('id', Integer, primary_key=True, autoincrement=True),
-    #     Column('symbol', String(20), nullable=False),
-    #     Column('open', Double),
-    #     Column('day_high', Double),
-    #     Column('day_low', Double),
-    #     Column('last_price', Double),
-    #     Column('previous_close', Double),
-    #     Column('change', Double),
-    #     Column('p_change', Double),
-    #     Column('total_traded_volume', BigInteger),
-    #     Column('total_traded_value', BigInteger),
-    #     Column('year_high', Double),
-    #     Column('year_low', Double),
-    #     Column('near_wk_high', Double),
-    #     Column('near_wk_low', Double),
-    #     Column('per_change_365d', Double),
-    #     Column('per_change_30d', Double),
-    #     Column('date_365d_ago', Date),
-    #     Column('date_30d_ago', Date),
-    #     Column('chart_today_path', String(255)),
-    #     Column('chart_30d_path', String(255)),
-    #     Column('chart_365d_path', String(255)),
-    #     Column('meta', JSON)
-    # )
-    nifty_indexes_table = Table(
-        'nifty_indexes_data', metadata,
-        Column('id', Integer, primary_key=True, autoincrement=True),
-        Column('year_low', Double),
-        Column('last_price', Double),
-        Column('index_name', String(50), nullable=False),
-        Column('year_high', Double),
-        Column('previous_close', Double),
-        Column('high', Double),
-        Column('low', Double),
-        Column('date_time', Date),
-        Column('percentage_change', Double),
-        Column('open', Double),
-        Column('index_Type', String(30))
-    )
-    # Create table if not exists
-    metadata.create_all(engine)
-
-#     # Insert or replace data using pandas to_sql (replace with 'append' if you want to add without deleting)
-#     df.to_sql('bank_nifty_data', con=engine, if_exists='append', index=False, method='multi')
-    # df.to_sql('bank_nifty_index_data', con=engine, if_exists='append', index=False, method='multi')
-    # df.to_sql('nifty50_stock_quotes_data', con=engine, if_exists='append', index=False, method='multi')
-    df.to_sql('nifty_indexes_data', con=engine, if_exists='append', index=False, method='multi')
-
-    print("Data uploaded successfully.")
-except FileNotFoundError:
-    print(f"Error: The .csv file was not found.")
-except SQLAlchemyError as e:
-    print(f"Database error occurred: {e}")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
-finally:
-    if engine:
-        engine.dispose()  # Dispose the engine and close all connections
+####----Loading data into MySQL----####
+# Market data is no longer uploaded from .csv files here. Run the streaming ingestion pipeline instead,
+# which fetches, normalizes and upserts each dataset directly: python data/ingest_pipeline.py [dataset ...]
 
 ####----Code to read all Bank Nifty bulk data from MySQL using SQLAlchemy----####
 def read_bank_nifty_data() -> pd.DataFrame:
@@ -374,11 +169,9 @@ class User(Base):
     name = Column(String(50), nullable=True)
     age = Column(Integer, nullable=True)
 
+Session = sessionmaker(bind=engine)
+session = Session()  # Create a new session (connects lazily on the first query, so importing works without a database)
 try:    
-    engine.connect()
-    print("Connection to MySQL was successful!")
-    Session = sessionmaker(bind=engine)
-    session = Session()  # Create a new session
 
 #     # Read all data from the database table
     def read_data():
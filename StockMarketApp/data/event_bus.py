@@ -0,0 +1,180 @@
+# File contains the change event bus for the StockMarketApp project
+# Writers publish what changed (prices, or one portfolio's transactions) together with the affected stock symbols.
+# Subscribers in the same process are called right away; other processes (Streamlit workers,
+# ingestion scripts, CLI imports) see the event through a shared SQLite event log that a background
+# listener polls. The dependent cache at the bottom subscribes to the bus and drops only the entries
+# that depend on the changed topic and symbols, instead of clearing every cache of every page.
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import EVENT_BUS_DB_PATH, EVENT_BUS_POLL_SECONDS, EVENT_BUS_RETENTION_SECONDS
+
+PRICES = 'prices'  # Shared by all portfolios
+TRANSACTIONS = 'transactions'
+
+def transactions_topic(portfolio_id):
+    # Transaction events are per portfolio, so one investor's trades leave the other portfolios' caches alone
+    return f"{TRANSACTIONS}:{portfolio_id}"
+
+_origin = uuid.uuid4().hex  # Identifies this process in the shared event log
+_subscribers = []
+_lock = threading.Lock()
+
+def _connect():
+    # Open the shared event log (autocommit mode)
+    connection = sqlite3.connect(EVENT_BUS_DB_PATH, timeout=10, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            symbols TEXT,
+            origin TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )""")
+    return connection
+
+# ================================================
+# PUBLISH / SUBSCRIBE
+# ================================================
+
+def subscribe(callback):
+    # Register callback(topic, symbols); symbols is a set, or None when any symbol may have changed
+    with _lock:
+        _subscribers.append(callback)
+
+def _dispatch(topic, symbols):
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(topic, symbols)
+        except Exception as e:
+            print(f"Error in event subscriber for {topic}: {e}")
+
+def publish(topic, symbols=None):
+    # Announce a change to every subscriber in this process and append it to the shared event log
+    # symbols: the affected stock symbols, or None when the change is not limited to known symbols
+    symbols = None if symbols is None else set(symbols)
+    if symbols is not None and not symbols:
+        return
+    _dispatch(topic, symbols)
+    try:
+        connection = _connect()
+        try:
+            now = time.time()
+            connection.execute(
+                "INSERT INTO events (topic, symbols, origin, created_at) VALUES (?, ?, ?, ?)",
+                (topic, None if symbols is None else json.dumps(sorted(symbols)), _origin, now)
+            )
+            connection.execute("DELETE FROM events WHERE created_at < ?", (now - EVENT_BUS_RETENTION_SECONDS,))
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Event log error for {topic}: {e}")
+
+# ================================================
+# CROSS-PROCESS LISTENER
+# ================================================
+
+def _latest_seq(connection):
+    return connection.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+def _listen_forever(interval_seconds):
+    # Forward events published by other processes to the subscribers of this one
+    last_seq = None
+    while True:
+        try:
+            connection = _connect()
+            try:
+                if last_seq is None:
+                    last_seq = _latest_seq(connection)  # Only events published after the listener started
+                rows = connection.execute(
+                    "SELECT seq, topic, symbols, origin FROM events WHERE seq > ? ORDER BY seq", (last_seq,)
+                ).fetchall()
+            finally:
+                connection.close()
+            for seq, topic, symbols, origin in rows:
+                last_seq = seq
+                if origin != _origin:
+                    _dispatch(topic, None if symbols is None else set(json.loads(symbols)))
+        except sqlite3.Error as e:
+            print(f"Event log error: {e}")
+        time.sleep(interval_seconds)
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def start_listener(interval_seconds=None):
+    # Start following the shared event log (once per process); returns the listener thread
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen_forever, args=(interval_seconds or EVENT_BUS_POLL_SECONDS,),
+                                         daemon=True, name="event-bus-listener")
+            _listener.start()
+    return _listener
+
+# ================================================
+# DEPENDENT CACHE
+# ================================================
+
+_cache = {}  # key -> (value, {topic: set of symbols or None for any symbol})
+_cache_lock = threading.Lock()
+_generations = {}  # topic -> number of invalidations, so a load that overlapped one is not stored
+_cache_generation = 0  # Bumped when the whole cache is dropped
+_cache_day = date.today()  # Entries are kept for one day (many keys contain the day they were computed for)
+
+def _snapshot(topics):
+    return _cache_generation, tuple(_generations.get(topic, 0) for topic in topics)
+
+def cached(key, loader, depends):
+    # Return the cached value for key, or call loader() and cache its result (None results are not cached)
+    # depends maps each topic the value depends on to None (any symbol of that topic invalidates it)
+    # or to a function returning the symbols the loaded value depends on
+    global _cache_day, _cache_generation
+    topics = list(depends)
+    with _cache_lock:
+        if _cache_day != date.today():
+            # Day-keyed entries of past days are never asked for again; drop everything once a day so the cache stays bounded
+            _cache.clear()
+            _cache_generation += 1
+            _cache_day = date.today()
+        if key in _cache:
+            return _cache[key][0]
+        generation = _snapshot(topics)
+    value = loader()
+    if value is not None:
+        dependencies = {topic: None if symbols_of is None else set(symbols_of(value)) for topic, symbols_of in depends.items()}
+        with _cache_lock:
+            # A change published while loader() ran may not be in value; return it but do not keep it
+            if _snapshot(topics) == generation:
+                _cache[key] = (value, dependencies)
+    return value
+
+def invalidate(topic, symbols=None):
+    # Drop the cached values that depend on the topic and any of the symbols; returns the dropped keys
+    with _cache_lock:
+        _generations[topic] = _generations.get(topic, 0) + 1
+        dropped = [
+            key for key, (_, dependencies) in _cache.items()
+            if topic in dependencies and (symbols is None or dependencies[topic] is None or dependencies[topic] & symbols)
+        ]
+        for key in dropped:
+            del _cache[key]
+    return dropped
+
+def clear_cache():
+    # Drop every cached value (manual refresh)
+    global _cache_generation
+    with _cache_lock:
+        _cache.clear()
+        _cache_generation += 1
+
+subscribe(invalidate)
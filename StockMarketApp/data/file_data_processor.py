@@ -1,9 +1,16 @@
 # Read operation from local .csv files for dashboard and other pages
+# All snapshot files go through one loader with a process-wide cache keyed by (path, mtime, size),
+# so a file is parsed once and a new snapshot (e.g. written by data/ingest_pipeline.py) is picked up
+# automatically on the next read, without clearing any Streamlit cache.
+# When pyarrow is installed, each CSV is converted once to a columnar .arrow file next to it
+# (see data/snapshot_store.py) and later reads memory-map that file instead of parsing the CSV.
 import pandas as pd
 import base64
 import sys
 import os
+import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data import snapshot_store
 local_csv_path = os.path.join(os.path.dirname(__file__), "nifty_advance_decline_data.csv")
 top_gainers_csv_path = os.path.join(os.path.dirname(__file__), "nifty_top_gainers_data.csv")
 top_losers_csv_path = os.path.join(os.path.dirname(__file__), "nifty_top_losers_data.csv")
@@ -12,67 +19,120 @@ DEFAULT_FILE_NAME = local_csv_path
 DEFAULT_FILE_NAME_TOP_GAINERS = top_gainers_csv_path
 DEFAULT_FILE_NAME_TOP_LOSERS = top_losers_csv_path
 DEFAULT_FILE_NAME_INDEX_VALUATION = index_valuation_csv_path
+# Snapshot files by dataset name (written by data/ingest_pipeline.py)
+DATASET_PATHS = {
+    'advance_decline': local_csv_path,
+    'top_gainers': top_gainers_csv_path,
+    'top_losers': top_losers_csv_path,
+    'index_valuation': index_valuation_csv_path
+}
 
-def read_csv_to_dataframe(file_path=None) -> pd.DataFrame:
-    # Check if a file_path was provided. If not, use the default.
-    if file_path is None:
-        file_path = DEFAULT_FILE_NAME
-    # Check if the file exists 
-    if not os.path.exists(file_path):
-        print(f"File not found: {file_path}")
-        return pd.DataFrame()  # Return empty DataFrame if file not found
+# Columns and types read per dataset (only what the pages use, so parsing stays cheap)
+_QUOTE_DTYPES = {'symbol': 'string', 'lastPrice': 'float64', 'change': 'float64', 'pChange': 'float64'}
+DATASET_SCHEMAS = {
+    'advance_decline': dict(_QUOTE_DTYPES, totalTradedVolume='float64'),
+    'top_gainers': _QUOTE_DTYPES,
+    'top_losers': _QUOTE_DTYPES,
+    'index_valuation': {'index': 'string', 'pe': 'float64', 'pb': 'float64', 'dy': 'float64'}
+}
+
+_file_cache = {}  # CSV path -> ((source path, mtime_ns, size), DataFrame)
+_file_cache_lock = threading.Lock()
+
+def get_file_version(file_path):
+    # Return (mtime_ns, size) of a file, or None if it does not exist
     try:
-        df = pd.read_csv(file_path)
-        print(f"Successfully read CSV file: {file_path}")
-        return df
-    except Exception as e:
-        print(f"Error reading CSV file {file_path}: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on error
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
-def read_top_gainers_csv_to_dataframe(file_path=None) -> pd.DataFrame:
-    # Check if a file_path was provided. If not, use the default.
-    if file_path is None:
-        file_path = DEFAULT_FILE_NAME_TOP_GAINERS
-    # Check if the file exists 
-    if not os.path.exists(file_path):
+def _snapshot_source(file_path):
+    # Return (path, (path, mtime_ns, size)) of the file to read for a CSV snapshot: its columnar
+    # copy when that is at least as new as the CSV, otherwise the CSV itself (None if neither exists)
+    csv_version = get_file_version(file_path)
+    if snapshot_store.is_available():
+        arrow_file = snapshot_store.arrow_path(file_path)
+        arrow_version = get_file_version(arrow_file)
+        if arrow_version is not None and (csv_version is None or arrow_version[0] >= csv_version[0]):
+            return arrow_file, (arrow_file,) + arrow_version
+    if csv_version is None:
+        return file_path, None
+    return file_path, (file_path,) + csv_version
+
+def get_dataset_version(name):
+    # Return the version of a dataset's snapshot file (changes whenever the file is replaced)
+    return _snapshot_source(DATASET_PATHS[name])[1]
+
+def _read_file(file_path, schema):
+    # Parse a snapshot file, reading only the declared columns with their declared types
+    if schema is None:
+        return pd.read_csv(file_path)
+    df = pd.read_csv(file_path, usecols=lambda c: c in schema)
+    for column, dtype in schema.items():
+        if column in df.columns:
+            if dtype == 'float64':
+                # Snapshots written from NSE frames may contain thousands separators
+                df[column] = pd.to_numeric(df[column].astype(str).str.replace(',', '', regex=False), errors='coerce').astype('float64')
+            else:
+                df[column] = df[column].astype(dtype)
+    return df
+
+def load_dataset_file(file_path, schema=None) -> pd.DataFrame:
+    # Return the contents of a snapshot file, parsing it only when it changed since the last read
+    source, version = _snapshot_source(file_path)
+    if version is None:
         print(f"File not found: {file_path}")
         return pd.DataFrame()  # Return empty DataFrame if file not found
-    try:
-        df = pd.read_csv(file_path)
-        print(f"Successfully read CSV file: {file_path}")
-        return df
-    except Exception as e:
-        print(f"Error reading CSV file {file_path}: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on error
+    cached = _file_cache.get(file_path)
+    if cached is None or cached[0] != version:
+        with _file_cache_lock:
+            cached = _file_cache.get(file_path)
+            if cached is None or cached[0] != version:
+                try:
+                    if source != file_path:
+                        df = snapshot_store.read_arrow(source)
+                    else:
+                        df = _read_file(file_path, schema)
+                        _convert_to_arrow(file_path, df)
+                    cached = (version, df)
+                except Exception as e:
+                    print(f"Error reading snapshot file {source}: {e}")
+                    return pd.DataFrame()  # Return empty DataFrame on error
+                _file_cache[file_path] = cached
+    # Callers get a shallow copy: the memory-mapped column blocks stay shared (zero-copy, one page cache for all
+    # processes), and copy-on-write (pandas 3) copies a block only when a caller writes to it, so the cached frame
+    # never changes; string values are immutable, so sharing them is safe too
+    return cached[1].copy(deep=False)
+
+def _convert_to_arrow(file_path, df):
+    # Store a freshly parsed CSV as a columnar file, so the next read (in any process) memory-maps it
+    if snapshot_store.is_available():
+        try:
+            snapshot_store.write_arrow(snapshot_store.arrow_path(file_path), df)
+        except Exception as e:
+            print(f"Error writing columnar snapshot for {file_path}: {e}")
+
+def load_dataset(name, file_path=None) -> pd.DataFrame:
+    # Load a dashboard dataset by name ('advance_decline', 'top_gainers', 'top_losers', 'index_valuation')
+    return load_dataset_file(file_path or DATASET_PATHS[name], DATASET_SCHEMAS.get(name))
+
+def invalidate_dataset(name=None):
+    # Drop cached frames (one dataset or all), e.g. when a watcher reports a change
+    with _file_cache_lock:
+        if name is None:
+            _file_cache.clear()
+        else:
+            _file_cache.pop(DATASET_PATHS[name], None)
+
+def read_csv_to_dataframe(file_path=None) -> pd.DataFrame:
+    return load_dataset('advance_decline', file_path)
+
+def read_top_gainers_csv_to_dataframe(file_path=None) -> pd.DataFrame:
+    return load_dataset('top_gainers', file_path)
 
 def read_top_losers_csv_to_dataframe(file_path=None) -> pd.DataFrame:
-    # Check if a file_path was provided. If not, use the default.
-    if file_path is None:
-        file_path = DEFAULT_FILE_NAME_TOP_LOSERS
-    # Check if the file exists
-    if not os.path.exists(file_path):
-        print(f"File not found: {file_path}")
-        return pd.DataFrame()  # Return empty DataFrame if file not found
-    try:
-        df = pd.read_csv(file_path)
-        print(f"Successfully read CSV file: {file_path}")
-        return df
-    except Exception as e:
-        print(f"Error reading CSV file {file_path}: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on error 
-    
+    return load_dataset('top_losers', file_path)
+
 def read_index_valuation_csv_to_dataframe(file_path=None) -> pd.DataFrame:
-    # Check if a file_path was provided. If not, use the default.
-    if file_path is None:
-        file_path = DEFAULT_FILE_NAME_INDEX_VALUATION
-    # Check if the file exists
-    if not os.path.exists(file_path):
-        print(f"File not found: {file_path}")
-        return pd.DataFrame()  # Return empty DataFrame if file not found
-    try:
-        df = pd.read_csv(file_path)
-        print(f"Successfully read CSV file: {file_path}")
-        return df
-    except Exception as e:
-        print(f"Error reading CSV file {file_path}: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on error 
\ No newline at end of file
+    return load_dataset('index_valuation', file_path)
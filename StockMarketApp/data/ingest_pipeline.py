@@ -0,0 +1,357 @@
+# File contains the streaming ingestion pipeline for the StockMarketApp project
+# Fetchers (nsepython / nsetools / nselib) yield raw DataFrames, a vectorized transform stage renames
+# columns, strips thousands separators and parses dates, and the result goes straight into batched
+# MySQL upserts. This replaces the old flow of to_csv (data_fetch.py) -> manual edit of database.py
+# -> read_csv -> to_sql. Dashboard snapshot files are written directly from the fetched frames, and
+# their display frames are materialized once into the dashboard snapshot (data/dashboard_snapshot.py).
+#
+# Usage: python data/ingest_pipeline.py [dataset ...]   (default: all datasets)
+import importlib
+import os
+import sys
+import time
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.database_config import DB_CONNECTION_STRING
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Float, Double, Date, BigInteger, UniqueConstraint, JSON
+from sqlalchemy.dialects.mysql import DOUBLE, insert as mysql_insert
+from sqlalchemy.exc import SQLAlchemyError
+from data.quota_manager import acquire
+from data import replay, snapshot_store
+
+UPSERT_BATCH_SIZE = 500
+
+# ================================================
+# TABLE DEFINITIONS (unique keys make re-ingestion idempotent)
+# ================================================
+
+metadata = MetaData()
+
+bank_nifty_table = Table(
+    'bank_nifty_data', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('symbol', String(20), nullable=False),
+    Column('series', String(10), nullable=False),
+    Column('trade_date', Date, nullable=False),
+    Column('prev_close', Float),
+    Column('open_price', Float),
+    Column('high_price', Float),
+    Column('low_price', Float),
+    Column('last_price', Float),
+    Column('close_price', Float),
+    Column('average_price', Float),
+    Column('total_traded_quantity', BigInteger),
+    Column('turnover_in_rs', DOUBLE),
+    Column('number_of_trades', Integer),
+    Column('deliverable_qty', BigInteger),
+    Column('percent_dly_qty_to_traded', Float),
+    UniqueConstraint('symbol', 'trade_date', name='unique_symbol_date')  # Same key as scripts/db_setup.sql
+)
+
+bank_nifty_index_table = Table(
+    'bank_nifty_index_data', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('index_name', String(30)),
+    Column('historical_date', Date),
+    Column('open', Double),
+    Column('high', Double),
+    Column('low', Double),
+    Column('close', Double),
+    UniqueConstraint('index_name', 'historical_date', name='uix_index_date')
+)
+
+nifty50_stock_quotes_table = Table(
+    'nifty50_stock_quotes_data', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('symbol', String(20), nullable=False),
+    Column('open', Double),
+    Column('day_high', Double),
+    Column('day_low', Double),
+    Column('last_price', Double),
+    Column('previous_close', Double),
+    Column('change', Double),
+    Column('p_change', Double),
+    Column('total_traded_volume', BigInteger),
+    Column('total_traded_value', BigInteger),
+    Column('year_high', Double),
+    Column('year_low', Double),
+    Column('near_wk_high', Double),
+    Column('near_wk_low', Double),
+    Column('per_change_365d', Double),
+    Column('per_change_30d', Double),
+    Column('date_365d_ago', Date),
+    Column('date_30d_ago', Date),
+    Column('chart_today_path', String(255)),
+    Column('chart_30d_path', String(255)),
+    Column('chart_365d_path', String(255)),
+    Column('meta', JSON),
+    UniqueConstraint('symbol', name='uix_symbol')
+)
+
+nifty_indexes_table = Table(
+    'nifty_indexes_data', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('year_low', Double),
+    Column('last_price', Double),
+    Column('index_name', String(50), nullable=False),
+    Column('year_high', Double),
+    Column('previous_close', Double),
+    Column('high', Double),
+    Column('low', Double),
+    Column('date_time', Date),
+    Column('percentage_change', Double),
+    Column('open', Double),
+    Column('index_Type', String(30)),
+    UniqueConstraint('index_name', 'date_time', name='uix_index_date_time')
+)
+
+# ================================================
+# FETCHERS (generators of raw DataFrames)
+# ================================================
+
+def _nse_call(key, func, *args, **kwargs):
+    # Every NSE call takes a token from the shared quota and goes through the record/replay adapter
+    # With the quota exhausted the call is not made; the caller skips this fetch and logs it
+    if not replay.is_replaying() and not acquire('nse', max_wait=60):
+        raise RuntimeError(f"nse quota exhausted, skipping {key}")
+    return replay.call(key, func, *args, **kwargs)
+
+def _lib(module, name):
+    # Resolve a library function only when it is called, so replaying works without the NSE libraries installed
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    return call
+
+def _nse_tools(method):
+    # Same as _lib() for methods of nsetools.Nse
+    def call(*args, **kwargs):
+        from nsetools import Nse
+        return getattr(Nse(), method)(*args, **kwargs)
+    return call
+
+def fetch_nifty_indexes():
+    yield pd.DataFrame(_nse_call("nse:nse_index", _lib('nsepython', 'nse_index')))
+
+def fetch_nifty50_stock_quotes(index='NIFTY 50'):
+    quotes = _nse_call(f"nse:stock_quote_in_index:{index}", _nse_tools('get_stock_quote_in_index'), index=index, include_index=False)
+    yield pd.DataFrame(quotes)
+
+def fetch_bank_nifty_index(index='NIFTY BANK', days=120):
+    end_date = pd.Timestamp.today()
+    start_date = end_date - pd.Timedelta(days=days)
+    start, end = start_date.strftime('%d-%b-%Y'), end_date.strftime('%d-%b-%Y')
+    yield pd.DataFrame(_nse_call(f"nse:index_history:{index}:{days}d", _lib('nsepython', 'index_history'), index, start, end))
+
+def fetch_bank_nifty_bulk(index='NIFTY BANK', period='1W'):
+    # Streams one frame per constituent so the first batches reach the database before the last symbol is fetched
+    symbols = _nse_call(f"nse:stocks_in_index:{index}", _nse_tools('get_stocks_in_index'), index=index)
+    for symbol in symbols:
+        try:
+            df = _nse_call(f"nse:price_volume_deliverable:{symbol}:{period}",
+                           _lib('nselib.capital_market', 'price_volume_and_deliverable_position_data'), symbol=symbol, period=period)
+            df = pd.DataFrame(df)
+            df['Symbol'] = symbol
+            yield df
+        except Exception as e:
+            print(f"Failed for {symbol}: {e}")
+
+# ================================================
+# DATASET SPECIFICATIONS
+# ================================================
+
+DATASETS = {
+    'nifty_indexes': {
+        'table': nifty_indexes_table,
+        'fetch': fetch_nifty_indexes,
+        'rename': {
+            'yearLow': 'year_low', 'last': 'last_price', 'indexName': 'index_name', 'yearHigh': 'year_high',
+            'previousClose': 'previous_close', 'high': 'high', 'low': 'low', 'timeVal': 'date_time',
+            'percChange': 'percentage_change', 'open': 'open', 'indexSubType': 'index_Type'
+        },
+        'dates': {'date_time': "%b %d,%Y %H:%M:%S"}
+    },
+    'nifty50_stock_quotes': {
+        'table': nifty50_stock_quotes_table,
+        'fetch': fetch_nifty50_stock_quotes,
+        'rename': {
+            'dayHigh': 'day_high', 'dayLow': 'day_low', 'lastPrice': 'last_price', 'previousClose': 'previous_close',
+            'pChange': 'p_change', 'totalTradedVolume': 'total_traded_volume', 'totalTradedValue': 'total_traded_value',
+            'yearHigh': 'year_high', 'yearLow': 'year_low', 'nearWKH': 'near_wk_high', 'nearWKL': 'near_wk_low',
+            'perChange365d': 'per_change_365d', 'perChange30d': 'per_change_30d', 'date365dAgo': 'date_365d_ago',
+            'date30dAgo': 'date_30d_ago', 'chartTodayPath': 'chart_today_path', 'chart30dPath': 'chart_30d_path',
+            'chart365dPath': 'chart_365d_path'
+        },
+        'dates': {'date_365d_ago': "%d-%b-%Y", 'date_30d_ago': "%d-%b-%Y"}
+    },
+    'bank_nifty_index': {
+        'table': bank_nifty_index_table,
+        'fetch': fetch_bank_nifty_index,
+        'rename': {
+            'INDEX_NAME': 'index_name', 'HistoricalDate': 'historical_date',
+            'OPEN': 'open', 'HIGH': 'high', 'LOW': 'low', 'CLOSE': 'close'
+        },
+        'dates': {'historical_date': "%d %b %Y"}
+    },
+    'bank_nifty_bulk': {
+        'table': bank_nifty_table,
+        'fetch': fetch_bank_nifty_bulk,
+        'rename': {
+            'Symbol': 'symbol', 'Series': 'series', 'Date': 'trade_date', 'PrevClose': 'prev_close',
+            'OpenPrice': 'open_price', 'HighPrice': 'high_price', 'LowPrice': 'low_price', 'LastPrice': 'last_price',
+            'ClosePrice': 'close_price', 'AveragePrice': 'average_price', 'TotalTradedQuantity': 'total_traded_quantity',
+            'TurnoverInRs': 'turnover_in_rs', 'No.ofTrades': 'number_of_trades', 'DeliverableQty': 'deliverable_qty',
+            '%DlyQttoTradedQty': 'percent_dly_qty_to_traded'
+        },
+        'dates': {'trade_date': "%d-%b-%Y"}
+    }
+}
+
+# ================================================
+# TRANSFORM STAGE (vectorized)
+# ================================================
+
+def transform(df: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    # Normalize one raw frame into the column names and types of the target table
+    table = spec['table']
+    df = df.rename(columns=spec.get('rename', {}))
+    columns = [c.name for c in table.columns if c.name in df.columns]
+    df = df[columns].copy()
+    for column in columns:
+        col_type = table.c[column].type
+        if column in spec.get('dates', {}):
+            # Try the documented NSE format first, then fall back to pandas' own parser
+            parsed = pd.to_datetime(df[column], format=spec['dates'][column], errors='coerce')
+            missing = parsed.isna() & df[column].notna()
+            if missing.any():
+                parsed[missing] = pd.to_datetime(df.loc[missing, column], errors='coerce', dayfirst=True)
+            df[column] = parsed.dt.date
+        elif isinstance(col_type, (Float, Double, DOUBLE, Integer, BigInteger)) and not table.c[column].primary_key:
+            # Remove thousands separators (e.g. '1,234.50') before converting to numbers
+            df[column] = pd.to_numeric(df[column].astype(str).str.replace(',', '', regex=False).str.strip(), errors='coerce')
+    # NaN/NaT are not valid SQL values
+    return df.astype(object).where(df.notna(), None)
+
+def iter_records(name: str, batch_size=UPSERT_BATCH_SIZE):
+    # Yield lists of normalized records (dicts) of at most batch_size rows for a dataset
+    spec = DATASETS[name]
+    pending = []
+    for raw in spec['fetch']():
+        if raw is None or len(raw) == 0:
+            continue
+        pending.extend(transform(raw, spec).to_dict(orient='records'))
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+# ================================================
+# LOAD STAGE (batched upserts)
+# ================================================
+
+def _upsert_statement(table):
+    # INSERT ... ON DUPLICATE KEY UPDATE every non-key column
+    stmt = mysql_insert(table)
+    key_columns = {c.name for constraint in table.constraints if isinstance(constraint, UniqueConstraint) for c in constraint.columns}
+    updates = {c.name: stmt.inserted[c.name] for c in table.columns if not c.primary_key and c.name not in key_columns}
+    return stmt.on_duplicate_key_update(updates)
+
+def run_pipeline(name: str, batch_size=UPSERT_BATCH_SIZE):
+    # Fetch, transform and upsert one dataset; returns (success, message)
+    engine = None
+    try:
+        engine = create_engine(DB_CONNECTION_STRING)
+        table = DATASETS[name]['table']
+        metadata.create_all(engine, tables=[table])
+        stmt = _upsert_statement(table)
+        start = time.perf_counter()
+        total = 0
+        for batch in iter_records(name, batch_size):
+            with engine.begin() as connection:
+                connection.execute(stmt, batch)  # executemany, sent as multi-row INSERT statements
+            total += len(batch)
+        elapsed = time.perf_counter() - start
+        return True, f"{name}: upserted {total} rows into {table.name} in {elapsed:.1f}s"
+    except SQLAlchemyError as e:
+        return False, f"{name}: database error occurred: {e}"
+    except Exception as e:
+        return False, f"{name}: an unexpected error occurred: {e}"
+    finally:
+        if engine:
+            engine.dispose()  # Dispose the engine and close all connections
+
+# ================================================
+# DASHBOARD SNAPSHOTS (written straight from the fetched frames)
+# ================================================
+
+def _fetch_index_valuation():
+    names = _nse_call("nse:index_list", _nse_tools('get_index_list'))
+    if names and isinstance(names[0], list):
+        names = [n[0] for n in names if n]
+    rows = []
+    for name in names:
+        try:
+            quote = _nse_call(f"nse:index_quote:{name}", _nse_tools('get_index_quote'), index=name)
+            quote['Index Name'] = name
+            rows.append(quote)
+        except Exception as e:
+            print(f"Failed to fetch valuation data for {name}: {e}")
+    return pd.DataFrame(rows)
+
+SNAPSHOT_FETCHERS = {
+    'advance_decline': lambda: pd.DataFrame(_nse_call("nse:advances_declines", _lib('nsepython', 'nse_get_advances_declines'))),
+    'top_gainers': lambda: pd.DataFrame(_nse_call("nse:top_gainers", _lib('nsepython', 'nse_get_top_gainers'))),
+    'top_losers': lambda: pd.DataFrame(_nse_call("nse:top_losers", _lib('nsepython', 'nse_get_top_losers'))),
+    'index_valuation': _fetch_index_valuation
+}
+
+def write_snapshot(path: str, df: pd.DataFrame):
+    # Replace the file atomically, so readers never see a half-written snapshot
+    snapshot_store.write_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+
+def refresh_dashboard_snapshots():
+    # Fetch the dashboard datasets and replace their snapshot files; returns (success, message)
+    from data.file_data_processor import DATASET_PATHS, DATASET_SCHEMAS
+    refreshed = []
+    errors = []
+    for name, fetch in SNAPSHOT_FETCHERS.items():
+        try:
+            df = fetch()
+            if df.empty:
+                errors.append(f"{name}: no data")
+                continue
+            write_snapshot(DATASET_PATHS[name], df)
+            if snapshot_store.is_available():
+                # Columnar copy for memory-mapped reads on the dashboard
+                converted, message = snapshot_store.convert_snapshot(DATASET_PATHS[name], DATASET_SCHEMAS.get(name))
+                if not converted:
+                    errors.append(f"{name}: {message}")
+            refreshed.append(name)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    message = f"Refreshed snapshots: {', '.join(refreshed) or 'none'}"
+    if refreshed:
+        # Materialize the dashboard display frames once, here, instead of on every dashboard rerun
+        from data.dashboard_snapshot import write_dashboard_snapshot
+        written, snapshot_message = write_dashboard_snapshot()
+        if not written:
+            errors.append(snapshot_message)
+    if errors:
+        message += f" (errors: {'; '.join(errors)})"
+    return len(errors) == 0, message
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(DATASETS) + ['dashboard']
+    for dataset in selected:
+        if dataset == 'dashboard':
+            success, message = refresh_dashboard_snapshots()
+        elif dataset in DATASETS:
+            success, message = run_pipeline(dataset)
+        else:
+            success, message = False, f"Unknown dataset: {dataset}"
+        print(("OK: " if success else "FAILED: ") + message)
+    if any(dataset in ('nifty_indexes', 'nifty50_stock_quotes') for dataset in selected) and 'dashboard' not in selected:
+        # The dashboard tickers are part of the dashboard snapshot too
+        from data.dashboard_snapshot import write_dashboard_snapshot
+        success, message = write_dashboard_snapshot()
+        print(("OK: " if success else "FAILED: ") + message)
@@ -0,0 +1,200 @@
+# File contains the persistent news store for the StockMarketApp project
+# Articles from MarketAux and Alpha Vantage are saved once in a de-duplicated news table, keyed by a
+# hash of the article URL (with a second unique hash on the title to catch the same story from another provider).
+# A background ingester fetches only articles newer than the last one seen per provider, and the
+# news page reads pages of articles from this table instead of calling the APIs on every render.
+#
+# Usage: python data/news_store.py   (runs the ingester in the foreground)
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.database_config import DB_CONNECTION_STRING
+from config.settings import NEWS_INGEST_INTERVAL_SECONDS, NEWS_INITIAL_LOOKBACK_DAYS
+from sqlalchemy import create_engine, func, Column, String, Text, DateTime, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import sessionmaker, declarative_base
+from data.api_client import fetch_market_news_articles, fetch_global_market_news_articles
+
+Base = declarative_base()  # Base class for SQLAlchemy models
+# ================================================
+# DATABASE MODELS
+# ================================================
+
+class NewsArticle(Base):
+    __tablename__ = 'news_articles'
+
+    article_id = Column(String(40), primary_key=True)  # SHA-1 of the normalized URL
+    title_hash = Column(String(40), nullable=False, unique=True)  # SHA-1 of the normalized title
+    provider = Column(String(20), nullable=False)
+    title = Column(String(500), nullable=False)
+    summary = Column(Text)
+    source = Column(String(100))
+    url = Column(String(1000))
+    image_url = Column(String(1000))
+    published_at = Column(DateTime, nullable=False, index=True)
+    ingested_at = Column(DateTime, default=datetime.utcnow)
+
+class NewsIngestState(Base):
+    __tablename__ = 'news_ingest_state'
+
+    provider = Column(String(20), primary_key=True)
+    last_published_at = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+engine = create_engine(DB_CONNECTION_STRING, pool_pre_ping=True, pool_recycle=3600)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def init_news_tables():
+    # Create the news tables if they do not exist
+    try:
+        Base.metadata.create_all(bind=engine)
+        return True, "News tables initialized successfully"
+    except Exception as e:
+        return False, f"Error initializing news tables: {str(e)}"
+
+# ================================================
+# NORMALIZATION
+# ================================================
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _normalize_url(url: str) -> str:
+    # Same article linked with/without tracking parameters or trailing slash should hash the same
+    return (url or '').split('?')[0].split('#')[0].rstrip('/').lower()
+
+def _normalize_title(title: str) -> str:
+    return ' '.join((title or '').lower().split())
+
+def _to_record(provider, title, summary, source, url, image_url, published_at):
+    title = (title or '').strip()
+    key = _normalize_url(url) or _normalize_title(title)
+    return {
+        'article_id': _hash(key),
+        'title_hash': _hash(_normalize_title(title)),
+        'provider': provider,
+        'title': title[:500],
+        'summary': summary,
+        'source': (source or '')[:100],
+        'url': (url or '')[:1000],
+        'image_url': (image_url or '')[:1000],
+        'published_at': published_at
+    }
+
+def _marketaux_records(articles):
+    records = []
+    for a in articles:
+        published_at = pd.to_datetime(a.get('published_at'), errors='coerce', utc=True)
+        if a.get('title') and not pd.isna(published_at):
+            records.append(_to_record('marketaux', a.get('title'), a.get('description') or a.get('snippet'),
+                                      a.get('source'), a.get('url'), a.get('image_url'),
+                                      published_at.tz_convert(None).to_pydatetime()))
+    return records
+
+def _alphavantage_records(articles):
+    records = []
+    for a in articles:
+        published_at = pd.to_datetime(a.get('time_published'), format='%Y%m%dT%H%M%S', errors='coerce')
+        if a.get('title') and not pd.isna(published_at):
+            records.append(_to_record('alphavantage', a.get('title'), a.get('summary'), a.get('source'),
+                                      a.get('url'), a.get('banner_image'), published_at.to_pydatetime()))
+    return records
+
+# Provider -> (fetch articles newer than a datetime, convert them to records)
+PROVIDERS = {
+    'marketaux': (lambda since: fetch_market_news_articles(50, since.strftime('%Y-%m-%dT%H:%M:%S')), _marketaux_records),
+    'alphavantage': (lambda since: fetch_global_market_news_articles(since.strftime('%Y%m%dT%H%M')), _alphavantage_records)
+}
+
+# ================================================
+# INGESTION
+# ================================================
+
+def ingest_news():
+    # Fetch only articles newer than the last one seen per provider and store the new ones
+    session = None
+    try:
+        session = SessionLocal()
+        states = {s.provider: s for s in session.query(NewsIngestState).all()}
+        inserted = 0
+        for provider, (fetch, to_records) in PROVIDERS.items():
+            state = states.get(provider)
+            since = state.last_published_at if state else datetime.utcnow() - timedelta(days=NEWS_INITIAL_LOOKBACK_DAYS)
+            records = [r for r in to_records(fetch(since)) if r['published_at'] > since]
+            if records:
+                # INSERT IGNORE skips articles already stored under the same URL or title hash
+                result = session.execute(insert(NewsArticle).prefix_with('IGNORE'), records)
+                inserted += max(result.rowcount, 0)
+                latest = max(r['published_at'] for r in records)
+                # Upsert, so the page's first ingest and the background ingester cannot both insert the
+                # provider's state row; GREATEST keeps the newest position when both store one
+                stmt = mysql_insert(NewsIngestState.__table__).values(provider=provider, last_published_at=latest, last_run_at=datetime.utcnow())
+                session.execute(stmt.on_duplicate_key_update(
+                    last_published_at=func.greatest(NewsIngestState.__table__.c.last_published_at, stmt.inserted.last_published_at),
+                    last_run_at=stmt.inserted.last_run_at
+                ))
+            session.commit()
+        return True, f"Ingested {inserted} new articles"
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error ingesting news: {str(e)}"
+    finally:
+        if session:
+            session.close()
+
+def run_ingester(interval_seconds=None):
+    # Ingest news forever, every interval_seconds
+    interval_seconds = interval_seconds or NEWS_INGEST_INTERVAL_SECONDS
+    init_news_tables()
+    while True:
+        success, message = ingest_news()
+        print(("" if success else "ERROR: ") + message)
+        time.sleep(interval_seconds)
+
+_ingester_thread = None
+_ingester_lock = threading.Lock()
+
+def start_background_ingester(interval_seconds=None):
+    # Start the ingester in a daemon thread (once per process)
+    global _ingester_thread
+    with _ingester_lock:
+        if _ingester_thread is None or not _ingester_thread.is_alive():
+            _ingester_thread = threading.Thread(target=run_ingester, args=(interval_seconds,), daemon=True, name="news-ingester")
+            _ingester_thread.start()
+    return _ingester_thread
+
+# ================================================
+# READING
+# ================================================
+
+NEWS_COLUMNS = ['title', 'summary', 'source', 'url', 'image_url', 'published_at', 'provider']
+
+def read_latest_news(limit=10) -> pd.DataFrame:
+    # Return the newest articles
+    return read_news_page(0, limit)[0]
+
+def read_news_page(page=0, per_page=10):
+    # Return (DataFrame of one page of articles, newest first, total article count)
+    session = None
+    try:
+        session = SessionLocal()
+        total = session.query(func.count(NewsArticle.article_id)).scalar() or 0
+        rows = session.query(*[getattr(NewsArticle, c) for c in NEWS_COLUMNS]).order_by(
+            NewsArticle.published_at.desc()
+        ).offset(page * per_page).limit(per_page).all()
+        return pd.DataFrame([tuple(r) for r in rows], columns=NEWS_COLUMNS), total
+    except Exception as e:
+        print(f"Error reading news: {str(e)}")
+        return pd.DataFrame(columns=NEWS_COLUMNS), 0
+    finally:
+        if session:
+            session.close()
+
+if __name__ == "__main__":
+    run_ingester()
@@ -0,0 +1,239 @@
+# File contains the Brinson performance attribution for the StockMarketApp project
+# Monthly portfolio returns are split by sector (from the symbol master) into allocation, selection and
+# interaction effects against a benchmark index (ATTRIBUTION_BENCHMARKS), whose sector returns come from the
+# NSE sectoral indexes in nifty_indexes_data. Holdings at each month start come from the transaction ledger
+# and stock returns from the month-end closes in bank_nifty_data; all months are computed at once as
+# months x sectors matrices (utils/calculations.brinson_attribution). Completed months are persisted in
+# portfolio_attribution, so later calls only compute the new months unless the ledger changed before them.
+import os
+import sys
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import Column, Integer, String, Date, DateTime, Double, text, bindparam, insert
+from sqlalchemy.orm import declarative_base
+from config.settings import ATTRIBUTION_BENCHMARKS, ATTRIBUTION_SECTOR_INDEXES
+from data.portfolio_data_processor import engine, SessionLocal, DEFAULT_PORTFOLIO_ID
+from data.portfolio_nav import _load_ledger, _ledger_fingerprint, _read_closes, _CLOSES_QUERY
+from data.symbol_master import get_symbol_index
+from utils.calculations import brinson_attribution, link_effects
+
+Base = declarative_base()  # Base class for SQLAlchemy models
+# ================================================
+# DATABASE MODELS
+# ================================================
+
+class PortfolioAttribution(Base):
+    # Effects of one sector in one month (period_end = last day of the month)
+    __tablename__ = 'portfolio_attribution'
+
+    portfolio_id = Column(Integer, primary_key=True)
+    benchmark = Column(String(50), primary_key=True)
+    period_end = Column(Date, primary_key=True)
+    sector = Column(String(100), primary_key=True)
+    portfolio_weight = Column(Double, nullable=False)
+    benchmark_weight = Column(Double, nullable=False)
+    portfolio_return = Column(Double)  # None when the portfolio did not hold the sector
+    benchmark_return = Column(Double, nullable=False)
+    allocation = Column(Double, nullable=False)
+    selection = Column(Double, nullable=False)
+    interaction = Column(Double, nullable=False)
+
+class PortfolioAttributionState(Base):
+    # One row per portfolio and benchmark: how far the cached months go and which ledger they were computed from
+    __tablename__ = 'portfolio_attribution_state'
+
+    portfolio_id = Column(Integer, primary_key=True)
+    benchmark = Column(String(50), primary_key=True)
+    cached_through = Column(Date, nullable=False)
+    ledger_fingerprint = Column(String(40), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def init_attribution_tables():
+    # Create the attribution tables if they do not exist
+    try:
+        Base.metadata.create_all(bind=engine)
+        return True, "Attribution tables initialized successfully"
+    except Exception as e:
+        return False, f"Error initializing attribution tables: {str(e)}"
+
+ATTRIBUTION_COLUMNS = ['period_end', 'sector', 'portfolio_weight', 'benchmark_weight', 'portfolio_return', 'benchmark_return',
+                       'allocation', 'selection', 'interaction']
+PERIOD_COLUMNS = ['period_end', 'portfolio_return', 'benchmark_return', 'allocation', 'selection', 'interaction']
+SECTOR_COLUMNS = ['sector', 'allocation', 'selection', 'interaction', 'total', 'portfolio_weight', 'benchmark_weight']
+
+# ================================================
+# INPUTS
+# ================================================
+
+_INDEX_LEVELS_QUERY = text(
+    "SELECT index_name, date_time AS date, last_price FROM nifty_indexes_data "
+    "WHERE index_name IN :names AND date_time BETWEEN :start AND :end"
+).bindparams(bindparam('names', expanding=True))
+
+def _at(series_by_day, boundaries) -> pd.DataFrame:
+    # Last known value of every column on or before each boundary (days x columns frame in, boundaries x columns out)
+    index = series_by_day.index.union(boundaries)
+    return series_by_day.reindex(index).ffill().loc[boundaries]
+
+def _sector_indexes(benchmark):
+    # Sectoral index per benchmark sector; a one-sector benchmark (e.g. NIFTY BANK) is its own sector index
+    sectors = ATTRIBUTION_BENCHMARKS[benchmark]
+    if len(sectors) == 1:
+        return {sector: benchmark for sector in sectors}
+    return dict(ATTRIBUTION_SECTOR_INDEXES)
+
+# ================================================
+# MONTHLY ATTRIBUTION
+# ================================================
+
+def _compute(session, ledger, boundaries, benchmark) -> pd.DataFrame:
+    # Attribution rows of the months between consecutive boundaries (month ends, the last one may be today)
+    # Holdings are taken as of each month start and held through the month (trades inside the month count from the next one)
+    symbols = sorted(ledger['symbol'].unique())
+    start, end = boundaries[0], boundaries[-1]
+    positions = _at(ledger.pivot_table(index='date', columns='symbol', values='quantity', aggfunc='sum').cumsum(), boundaries[:-1]).fillna(0)
+    closes = _read_closes(session, _CLOSES_QUERY, symbols=symbols, start=(start - timedelta(days=31)).date(), end=end.date())
+    closes['close'] = closes['close'].astype(float)
+    prices = _at(closes.pivot_table(index=pd.to_datetime(closes['date']), columns='symbol', values='close', aggfunc='last'), boundaries)
+    prices = prices.reindex(columns=symbols).to_numpy()
+    stock_returns = prices[1:] / prices[:-1] - 1
+    values = positions.reindex(columns=symbols).to_numpy() * prices[:-1]  # Market value at each month start
+
+    # Sector membership as a symbols x sectors matrix
+    master = get_symbol_index()
+    symbol_sectors = [(master.get(symbol) or {}).get('sector') or 'Other' for symbol in symbols]
+    benchmark_weights = pd.Series(ATTRIBUTION_BENCHMARKS[benchmark], dtype='float64')
+    sectors = sorted(set(benchmark_weights.index) | set(symbol_sectors))
+    membership = (np.array(symbol_sectors)[:, None] == np.array(sectors)[None, :]).astype(float)
+    sector_values = np.nan_to_num(values) @ membership
+    totals = sector_values.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        portfolio_weights = sector_values / totals[:, None]
+        portfolio_returns = np.where(sector_values > 0, np.nan_to_num(values * stock_returns) @ membership / sector_values, np.nan)
+    wb = benchmark_weights.reindex(sectors).fillna(0).to_numpy()
+    wb = wb / wb.sum()
+
+    # Sector returns of the benchmark; sectors without a sectoral index earn the benchmark's own return
+    indexes = _sector_indexes(benchmark)
+    rows = session.execute(_INDEX_LEVELS_QUERY, {'names': sorted(set(indexes.values()) | {benchmark}),
+                                                 'start': (start - timedelta(days=31)).date(), 'end': end.date()}).all()
+    levels = pd.DataFrame([tuple(r) for r in rows], columns=['index_name', 'date', 'last_price'])
+    levels = _at(levels.pivot_table(index=pd.to_datetime(levels['date']), columns='index_name', values='last_price', aggfunc='last').astype(float), boundaries)
+    index_returns = (levels.iloc[1:].to_numpy() / levels.iloc[:-1].to_numpy() - 1)
+    index_returns = pd.DataFrame(index_returns, columns=levels.columns)
+    if benchmark not in index_returns:
+        raise ValueError(f"No {benchmark} history in nifty_indexes_data")
+    own = index_returns[benchmark].to_numpy()
+    benchmark_returns = np.column_stack([
+        index_returns[indexes[sector]].fillna(index_returns[benchmark]).to_numpy() if indexes.get(sector) in index_returns else own
+        for sector in sectors
+    ])
+
+    # Months without holdings or without benchmark levels have nothing to attribute
+    valid = (totals > 0) & np.isfinite(own)
+    allocation, selection, interaction, _, _ = brinson_attribution(portfolio_weights[valid], portfolio_returns[valid], wb, benchmark_returns[valid])
+    months = np.asarray(boundaries[1:])[valid]
+    shape = allocation.shape
+    return pd.DataFrame({
+        'period_end': np.repeat(months, shape[1]),
+        'sector': np.tile(sectors, shape[0]),
+        'portfolio_weight': portfolio_weights[valid].ravel(),
+        'benchmark_weight': np.tile(wb, shape[0]),
+        'portfolio_return': portfolio_returns[valid].ravel(),
+        'benchmark_return': benchmark_returns[valid].ravel(),
+        'allocation': allocation.ravel(),
+        'selection': selection.ravel(),
+        'interaction': interaction.ravel()
+    })
+
+def _summarise(rows, benchmark):
+    # Monthly totals, Carino-linked effects per sector and the compounded returns of all months
+    if rows.empty:
+        return {'benchmark': benchmark, 'periods': pd.DataFrame(columns=PERIOD_COLUMNS), 'sectors': pd.DataFrame(columns=SECTOR_COLUMNS),
+                'portfolio_return': 0.0, 'benchmark_return': 0.0, 'months': 0}
+    rows = rows.assign(filled_return=rows['portfolio_return'].fillna(rows['benchmark_return']))
+    rows['portfolio_contribution'] = rows['portfolio_weight'] * rows['filled_return']
+    rows['benchmark_contribution'] = rows['benchmark_weight'] * rows['benchmark_return']
+    periods = rows.groupby('period_end')[['portfolio_contribution', 'benchmark_contribution', 'allocation', 'selection', 'interaction']].sum()
+    periods = periods.rename(columns={'portfolio_contribution': 'portfolio_return', 'benchmark_contribution': 'benchmark_return'})
+    effects = {}
+    for effect in ('allocation', 'selection', 'interaction'):
+        matrix = rows.pivot_table(index='period_end', columns='sector', values=effect, aggfunc='sum').reindex(periods.index).fillna(0)
+        effects[effect] = pd.Series(link_effects(matrix.to_numpy(), periods['portfolio_return'], periods['benchmark_return']), index=matrix.columns)
+    sectors = pd.DataFrame(effects)
+    sectors['total'] = sectors.sum(axis=1)
+    sectors['portfolio_weight'] = rows.groupby('sector')['portfolio_weight'].mean()
+    sectors['benchmark_weight'] = rows.groupby('sector')['benchmark_weight'].mean()
+    return {
+        'benchmark': benchmark,
+        'periods': periods.reset_index()[PERIOD_COLUMNS],
+        'sectors': sectors.rename_axis('sector').reset_index()[SECTOR_COLUMNS].sort_values('total', ascending=False, ignore_index=True),
+        'portfolio_return': float(np.prod(1 + periods['portfolio_return']) - 1),
+        'benchmark_return': float(np.prod(1 + periods['benchmark_return']) - 1),
+        'months': len(periods)
+    }
+
+def get_portfolio_attribution(portfolio_id=DEFAULT_PORTFOLIO_ID, benchmark='NIFTY 50', refresh=False):
+    # Brinson attribution of a portfolio against a benchmark from its first month until today;
+    # returns (True, dict) or (False, message)
+    # dict: periods (DataFrame of month, portfolio_return, benchmark_return, allocation, selection, interaction),
+    # sectors (DataFrame of Carino-linked effects per sector, adding up to the compounded excess return),
+    # portfolio_return, benchmark_return (compounded) and months. Completed months are cached in
+    # portfolio_attribution; refresh=True recomputes everything (e.g. after closes or index levels were backfilled)
+    if benchmark not in ATTRIBUTION_BENCHMARKS:
+        return False, f"Unknown benchmark: {benchmark}"
+    session = None
+    try:
+        session = SessionLocal()
+        ledger = _load_ledger(session, portfolio_id)
+        today = pd.Timestamp(date.today())
+        boundaries = pd.date_range(ledger['date'].min(), today, freq='ME') if not ledger.empty else pd.DatetimeIndex([])
+        if len(boundaries) == 0:
+            return True, _summarise(pd.DataFrame(columns=ATTRIBUTION_COLUMNS), benchmark)
+        if boundaries[-1] < today:
+            boundaries = boundaries.append(pd.DatetimeIndex([today]))
+
+        state = session.get(PortfolioAttributionState, (portfolio_id, benchmark))
+        cache = session.query(PortfolioAttribution).filter(PortfolioAttribution.portfolio_id == portfolio_id,
+                                                           PortfolioAttribution.benchmark == benchmark)
+        if state and not refresh and state.ledger_fingerprint == _ledger_fingerprint(ledger, state.cached_through):
+            boundaries = boundaries[boundaries >= pd.Timestamp(state.cached_through)]
+        else:
+            cache.delete(synchronize_session=False)
+
+        latest = pd.DataFrame(columns=ATTRIBUTION_COLUMNS)
+        if len(boundaries) > 1:
+            latest = _compute(session, ledger, boundaries, benchmark)
+            # The running month can still change, so only completed months are stored
+            completed = latest[latest['period_end'] < today]
+            if not completed.empty:
+                session.execute(insert(PortfolioAttribution), [
+                    dict(row, portfolio_id=portfolio_id, benchmark=benchmark, period_end=row['period_end'].date(),
+                         portfolio_return=None if pd.isna(row['portfolio_return']) else row['portfolio_return'])
+                    for row in completed.to_dict('records')
+                ])
+            through = boundaries[boundaries < today][-1].date()
+            if state is None:
+                session.add(PortfolioAttributionState(portfolio_id=portfolio_id, benchmark=benchmark, cached_through=through,
+                                                      ledger_fingerprint=_ledger_fingerprint(ledger, through)))
+            else:
+                state.cached_through = through
+                state.ledger_fingerprint = _ledger_fingerprint(ledger, through)
+            session.commit()
+            latest = latest[latest['period_end'] >= today]
+
+        rows = cache.with_entities(*[getattr(PortfolioAttribution, column) for column in ATTRIBUTION_COLUMNS]).order_by(PortfolioAttribution.period_end).all()
+        attribution = pd.DataFrame([tuple(r) for r in rows], columns=ATTRIBUTION_COLUMNS)
+        attribution['period_end'] = pd.to_datetime(attribution['period_end'])
+        if not latest.empty:
+            attribution = pd.concat([attribution, latest], ignore_index=True)
+        return True, _summarise(attribution.astype({column: 'float64' for column in ATTRIBUTION_COLUMNS[2:]}), benchmark)
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error computing performance attribution: {str(e)}"
+    finally:
+        if session:
+            session.close()
@@ -6,15 +6,22 @@ from mysql.connector import Error
 import sys
 import os
 import json
+import threading
+import numpy as np
 import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # from config.database_config import DB_CONFIG  
 from config.database_config import DB_CONNECTION_STRING
-from sqlalchemy import create_engine, func, MetaData, Table, Column, Integer, String, Float, Double, Date, BigInteger, UniqueConstraint, JSON, DECIMAL, DateTime, Enum, text
-from sqlalchemy.dialects.mysql import DOUBLE
+from config.settings import PRICE_FEED_INDEX, PRICE_REFRESH_MIN_SECONDS, PRICE_REFRESH_LOCK_SECONDS, TRANSACTION_PAGE_SIZE
+from data.symbol_master import get_symbol_index, get_symbol_list
+from data import event_bus
+from utils.calculations import xirr
+from sqlalchemy import create_engine, func, MetaData, Table, Column, Integer, String, Float, Double, Date, BigInteger, UniqueConstraint, JSON, DECIMAL, DateTime, Enum, Index, text, insert, update, delete, select, literal, or_, and_
+from sqlalchemy.dialects.mysql import DOUBLE, insert as mysql_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 import enum
 
 Base = declarative_base()  # Base class for SQLAlchemy models
@@ -25,18 +32,82 @@ class TransactionType(enum.Enum):
     BUY = "BUY"
     SELL = "SELL"
 
+DEFAULT_PORTFOLIO_ID = 1  # Portfolio that data recorded before portfolios existed belongs to
+
+class Portfolio(Base):
+    # One investor's portfolio; ledger, lots and holdings are partitioned by portfolio_id, prices are shared
+    __tablename__ = 'portfolios'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False, unique=True)
+    owner = Column(String(100))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class LedgerEventType(enum.Enum):
+    ADD = "ADD"  # A transaction was recorded
+    REVERSAL = "REVERSAL"  # A transaction was deleted; the event repeats the reversed transaction
+    PRICE = "PRICE"  # A stock's current price was set (shared by all portfolios)
+
+class LedgerEvent(Base):
+    # Append-only log of every change to the books (rows are never updated or deleted), the audit trail
+    # that point-in-time views are rebuilt from (data/portfolio_ledger.py)
+    __tablename__ = 'ledger_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(Enum(LedgerEventType), nullable=False)
+    portfolio_id = Column(Integer)  # None for price events
+    transaction_id = Column(Integer)
+    stock_symbol = Column(String(20), nullable=False)
+    stock_name = Column(String(100))
+    effective_date = Column(Date, nullable=False)  # Trade date of the (reversed) transaction, or the day of the price
+    transaction_type = Column(Enum(TransactionType))
+    quantity = Column(Integer)
+    unit_price = Column(DECIMAL(10, 2), nullable=False)  # Trade price, or the new current price
+    recorded_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_ledger_events_portfolio_date', 'portfolio_id', 'effective_date'),
+        Index('idx_ledger_events_type_symbol_date', 'event_type', 'stock_symbol', 'effective_date'),
+    )
+
+class LedgerSnapshot(Base):
+    # A portfolio's books at the end of a day (open FIFO lots and realized P&L per stock as JSON), so the
+    # books on a later day are this state plus the events after it; writes drop the snapshots they make stale
+    __tablename__ = 'ledger_snapshots'
+
+    portfolio_id = Column(Integer, primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+    state = Column(JSON, nullable=False)
+    events = Column(Integer, nullable=False)  # Transactions replayed into the state
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class DataVersion(Base):
+    # Version counter per change topic (the event_bus topics); every write increments it in its own DB
+    # transaction and returns the new value, so the writer's next read can ask for data at least that new
+    __tablename__ = 'data_versions'
+
+    topic = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
 class Transaction(Base):
     __tablename__ = 'transactions'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    stock_symbol = Column(String(20), nullable=False, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    stock_symbol = Column(String(20), nullable=False)
     stock_name = Column(String(100), nullable=False)
-    transaction_date = Column(Date, nullable=False, index=True)
+    transaction_date = Column(Date, nullable=False)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(DECIMAL(10, 2), nullable=False)
     transaction_type = Column(Enum(TransactionType), default=TransactionType.BUY)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
+    # Every per-portfolio read starts with portfolio_id, so it only touches that portfolio's index range
+    __table_args__ = (
+        Index('idx_transactions_portfolio_symbol', 'portfolio_id', 'stock_symbol', 'transaction_date'),
+        Index('idx_transactions_portfolio_date', 'portfolio_id', 'transaction_date'),
+    )
+
 class CurrentPrice(Base):
     __tablename__ = 'current_prices'
     
@@ -45,6 +116,51 @@ class CurrentPrice(Base):
     current_price = Column(DECIMAL(10, 2), nullable=False)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class Lot(Base):
+    # One lot per BUY transaction; SELLs consume remaining_quantity oldest lot first (FIFO)
+    __tablename__ = 'lots'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    transaction_id = Column(Integer, nullable=False, unique=True)  # BUY transaction that opened the lot
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    stock_symbol = Column(String(20), nullable=False)
+    stock_name = Column(String(100), nullable=False)
+    acquired_date = Column(Date, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    remaining_quantity = Column(Integer, nullable=False)
+    unit_price = Column(DECIMAL(10, 2), nullable=False)
+
+    __table_args__ = (Index('idx_lots_fifo', 'portfolio_id', 'stock_symbol', 'acquired_date', 'id'),)
+
+class LotMatch(Base):
+    # Part of a SELL matched against one lot, with the P&L it realized
+    __tablename__ = 'lot_matches'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sell_transaction_id = Column(Integer, nullable=False, index=True)
+    lot_id = Column(Integer, nullable=False, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    stock_symbol = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    buy_price = Column(DECIMAL(10, 2), nullable=False)
+    sell_price = Column(DECIMAL(10, 2), nullable=False)
+    sell_date = Column(Date, nullable=False)
+    realized_pl = Column(DECIMAL(14, 2), nullable=False)
+
+    __table_args__ = (Index('idx_lot_matches_portfolio_symbol', 'portfolio_id', 'stock_symbol'),)
+
+class Holding(Base):
+    # Current position per portfolio and stock, kept up to date on every write so reads are a primary-key range scan
+    __tablename__ = 'holdings'
+
+    portfolio_id = Column(Integer, primary_key=True, default=DEFAULT_PORTFOLIO_ID)
+    stock_symbol = Column(String(20), primary_key=True)
+    stock_name = Column(String(100), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    total_cost = Column(DECIMAL(14, 2), nullable=False, default=0)  # FIFO cost of the shares still held
+    realized_pl = Column(DECIMAL(14, 2), nullable=False, default=0)  # Kept after the position is closed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # ================================================
 # DATABASE CONNECTION
 # ================================================
@@ -69,6 +185,29 @@ def init_database():
     # Initialize database tables
     try:
         Base.metadata.create_all(bind=engine)
+        # Transactions recorded before lot accounting existed get their lots and holdings built once
+        session = get_db_session()
+        try:
+            if session.get(Portfolio, DEFAULT_PORTFOLIO_ID) is None:
+                session.add(Portfolio(id=DEFAULT_PORTFOLIO_ID, name="Default"))
+                session.commit()
+            needs_backfill = session.query(func.count(Holding.stock_symbol)).scalar() == 0 and session.query(func.count(Transaction.id)).scalar() > 0
+            # Transactions recorded before the event log existed become its first events
+            if session.query(LedgerEvent.id).first() is None:
+                columns = ['event_type', 'portfolio_id', 'transaction_id', 'stock_symbol', 'stock_name', 'effective_date',
+                           'transaction_type', 'quantity', 'unit_price', 'recorded_at']
+                session.execute(insert(LedgerEvent).from_select(columns, select(
+                    literal(LedgerEventType.ADD, LedgerEvent.event_type.type), Transaction.portfolio_id, Transaction.id,
+                    Transaction.stock_symbol, Transaction.stock_name, Transaction.transaction_date, Transaction.transaction_type,
+                    Transaction.quantity, Transaction.unit_price, Transaction.created_at
+                ).order_by(Transaction.id)))
+                session.commit()
+        finally:
+            session.close()
+        if needs_backfill:
+            success, message = rebuild_lot_accounting()
+            if not success:
+                return False, message
         return True, "Database initialized successfully"
     except Exception as e:
         return False, f"Error initializing database: {str(e)}"
@@ -77,6 +216,96 @@ def get_db_session():
     # Get database session
     return SessionLocal()
 
+# ================================================
+# LEDGER EVENT LOG
+# ================================================
+
+_TRANSACTION_EVENT_FIELDS = ('portfolio_id', 'stock_symbol', 'stock_name', 'transaction_type', 'quantity', 'unit_price')
+
+def _transaction_event(event_type, row):
+    # Event for a ledger row given as a dict of its columns (id, transaction_date, portfolio_id, ...)
+    event = {field: row[field] for field in _TRANSACTION_EVENT_FIELDS}
+    event.update(event_type=event_type, transaction_id=row['id'], effective_date=row['transaction_date'])
+    return event
+
+def _transaction_row(transaction):
+    return {column.name: getattr(transaction, column.name) for column in Transaction.__table__.columns}
+
+def _price_event(stock_symbol, stock_name, price):
+    return {'event_type': LedgerEventType.PRICE, 'portfolio_id': None, 'transaction_id': None, 'stock_symbol': stock_symbol,
+            'stock_name': stock_name, 'effective_date': date.today(), 'transaction_type': None, 'quantity': None, 'unit_price': price}
+
+def _record_events(session, events):
+    # Append events (dicts of LedgerEvent columns) inside the caller's DB transaction and drop the snapshots
+    # they make stale: a snapshot covers its day and everything before it
+    if not events:
+        return
+    session.execute(insert(LedgerEvent), events)
+    earliest = {}
+    for event in events:
+        if event['portfolio_id'] is not None:
+            day = earliest.get(event['portfolio_id'])
+            earliest[event['portfolio_id']] = event['effective_date'] if day is None else min(day, event['effective_date'])
+    for portfolio_id, day in earliest.items():
+        session.query(LedgerSnapshot).filter(
+            LedgerSnapshot.portfolio_id == portfolio_id,
+            LedgerSnapshot.snapshot_date >= day
+        ).delete(synchronize_session=False)
+
+# ================================================
+# DATA VERSIONS
+# ================================================
+
+def _read_version(session, topic):
+    return session.query(DataVersion.version).filter(DataVersion.topic == topic).scalar() or 0
+
+def _bump_version(session, topic):
+    # Increment a topic's version inside the caller's DB transaction and return the new value;
+    # one upsert creates or bumps the row, so concurrent first writers cannot collide on the primary key,
+    # and the row lock it takes orders them, so versions only ever increase
+    stmt = mysql_insert(DataVersion.__table__).values(topic=topic, version=1)
+    session.execute(stmt.on_duplicate_key_update(version=DataVersion.__table__.c.version + 1))
+    return _read_version(session, topic)
+
+# ================================================
+# PORTFOLIOS
+# ================================================
+
+def get_portfolios():
+    # All portfolios as (True, [{'id', 'name', 'owner'}]) or (False, message)
+    session = None
+    try:
+        session = get_db_session()
+        portfolios = session.query(Portfolio).order_by(Portfolio.id).all()
+        return True, [{'id': p.id, 'name': p.name, 'owner': p.owner} for p in portfolios]
+    except Exception as e:
+        return False, f"Error fetching portfolios: {str(e)}"
+    finally:
+        if session:
+            session.close()
+
+def create_portfolio(name, owner=None):
+    # Create a portfolio; returns (True, portfolio id) or (False, message)
+    name = (name or "").strip()
+    if not name:
+        return False, "Portfolio name is required"
+    session = None
+    try:
+        session = get_db_session()
+        if session.query(Portfolio.id).filter(Portfolio.name == name).first():
+            return False, f"Portfolio '{name}' already exists"
+        portfolio = Portfolio(name=name, owner=owner)
+        session.add(portfolio)
+        session.commit()
+        return True, portfolio.id
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error creating portfolio: {str(e)}"
+    finally:
+        if session:
+            session.close()
+
 # ================================================
 # STOCK DATA
 # ================================================
@@ -116,8 +345,12 @@ DEFAULT_PRICES = {
 }
 
 def get_stock_list():
-    # Return list of available stocks
-    return STOCK_LIST
+    # Return list of available stocks from the offline symbol master
+    return get_symbol_list()
+
+def search_stocks(query, limit=20):
+    # Search the symbol master by symbol or company name, returns (symbol, name) tuples
+    return [(r['symbol'], r['name']) for r in get_symbol_index().search(query, limit)]
 
 # ================================================
 # VALIDATION FUNCTIONS
@@ -132,19 +365,219 @@ def validate_transaction(stock_symbol, quantity, unit_price):
     if unit_price <= 0:
         errors.append("Unit price must be greater than 0")
     
-    # Check if stock exists in our list
-    valid_symbols = [symbol for symbol, _ in STOCK_LIST]
-    if stock_symbol not in valid_symbols:
+    # Check if stock exists in the symbol master (in-memory lookup)
+    if stock_symbol not in get_symbol_index():
         errors.append("Invalid stock symbol")
     
     return len(errors) == 0, errors
 
+# ================================================
+# LOT ACCOUNTING (FIFO)
+# ================================================
+# Every BUY opens a lot; every SELL is matched against the open lots of that stock, oldest first.
+# Lots, matches and the holdings row are updated in the same database transaction as the ledger
+# row, so holdings, average cost and realized P&L never need a replay of the full history.
+# A back-dated row re-matches the SELLs after it in date order, so the tables always equal a
+# date-ordered FIFO replay of the ledger (data/portfolio_ledger.py, reconcile_holdings).
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+def match_fifo(open_lots, quantity):
+    # Match a SELL quantity against open lots given oldest first as (lot_id, remaining_quantity)
+    # Returns [(lot_id, matched_quantity)], raises ValueError if the lots do not cover the quantity
+    matches = []
+    for lot_id, remaining in open_lots:
+        if quantity <= 0:
+            break
+        matched = min(remaining, quantity)
+        if matched > 0:
+            matches.append((lot_id, matched))
+            quantity -= matched
+    if quantity > 0:
+        raise ValueError(f"short by {quantity} shares")
+    return matches
+
+def _oversell_reason(symbol, quantity, sell_date, held, later=None):
+    # Why a date-ordered FIFO replay goes short: the SELL itself exceeds the shares held that day, or (later given as
+    # (quantity, date, shares held before it)) a SELL already on the books after it would then exceed its holding
+    if later is None:
+        return f"Cannot sell {quantity} shares of {symbol}: only {held} held on {sell_date}"
+    return (f"Cannot sell {quantity} shares of {symbol} on {sell_date}: the later sale of {later[0]} shares on {later[1]} "
+            f"would then exceed the {later[2]} shares held that day")
+
+def _open_lot(session, transaction):
+    session.add(Lot(
+        transaction_id=transaction.id,
+        portfolio_id=transaction.portfolio_id,
+        stock_symbol=transaction.stock_symbol,
+        stock_name=transaction.stock_name,
+        acquired_date=transaction.transaction_date,
+        quantity=transaction.quantity,
+        remaining_quantity=transaction.quantity,
+        unit_price=transaction.unit_price
+    ))
+
+def _sells_after(session, transaction):
+    # SELLs of the same stock that come after a transaction in ledger order, oldest first
+    key = _ledger_order(transaction)
+    sells = session.query(Transaction).filter(
+        Transaction.portfolio_id == transaction.portfolio_id,
+        Transaction.stock_symbol == transaction.stock_symbol,
+        Transaction.transaction_type == TransactionType.SELL,
+        Transaction.transaction_date >= transaction.transaction_date
+    ).all()
+    return sorted((sell for sell in sells if _ledger_order(sell) > key), key=_ledger_order)
+
+def _match_sells(session, holding, sells):
+    # Match SELLs (oldest first) against the open lots bought on or before their dates, undoing their earlier matches
+    # first, so after a back-dated row the lots and realized P&L are those of a date-ordered FIFO replay
+    # Locks the lots so concurrent sells queue up; raises ValueError when the replay goes short
+    session.flush()  # Lots and matches changed in this transaction must be visible to the queries below
+    first = sells[0]
+    previous = session.query(LotMatch).filter(LotMatch.sell_transaction_id.in_([sell.id for sell in sells])).all()
+    lots = session.query(Lot).filter(
+        Lot.portfolio_id == first.portfolio_id,
+        Lot.stock_symbol == first.stock_symbol,
+        or_(Lot.remaining_quantity > 0, Lot.id.in_([match.lot_id for match in previous]))
+    ).order_by(Lot.acquired_date, Lot.id).with_for_update().all()
+    lots_by_id = {lot.id: lot for lot in lots}
+    for match in previous:
+        lots_by_id[match.lot_id].remaining_quantity += match.quantity
+        holding.total_cost += match.quantity * match.buy_price
+        holding.realized_pl -= match.realized_pl
+        session.delete(match)
+    for sell in sells:
+        eligible = [lot for lot in lots if lot.remaining_quantity > 0 and lot.acquired_date <= sell.transaction_date]
+        try:
+            matches = match_fifo([(lot.id, lot.remaining_quantity) for lot in eligible], sell.quantity)
+        except ValueError:
+            held = sum(lot.remaining_quantity for lot in eligible)
+            later = None if sell is first else (sell.quantity, sell.transaction_date, held)
+            raise ValueError(_oversell_reason(first.stock_symbol, first.quantity, first.transaction_date,
+                                              held, later))
+        sell_price = _money(sell.unit_price)
+        for lot_id, quantity in matches:
+            lot = lots_by_id[lot_id]
+            lot.remaining_quantity -= quantity
+            buy_price = _money(lot.unit_price)
+            holding.total_cost -= quantity * buy_price
+            holding.realized_pl += quantity * (sell_price - buy_price)
+            session.add(LotMatch(
+                sell_transaction_id=sell.id,
+                lot_id=lot.id,
+                portfolio_id=sell.portfolio_id,
+                stock_symbol=sell.stock_symbol,
+                quantity=quantity,
+                buy_price=buy_price,
+                sell_price=sell_price,
+                sell_date=sell.transaction_date,
+                realized_pl=quantity * (sell_price - buy_price)
+            ))
+
+def _lock_holding(session, portfolio_id, stock_symbol, stock_name):
+    # Holdings row of a stock, locked for the rest of the database transaction (created if missing)
+    holding = session.query(Holding).filter(
+        Holding.portfolio_id == portfolio_id,
+        Holding.stock_symbol == stock_symbol
+    ).with_for_update().first()
+    if holding is None:
+        holding = Holding(portfolio_id=portfolio_id, stock_symbol=stock_symbol, stock_name=stock_name, quantity=0,
+                          total_cost=Decimal('0'), realized_pl=Decimal('0'))
+        session.add(holding)
+    return holding
+
+def _book_transaction(session, transaction, in_order=False):
+    # Book a new ledger row (already flushed, so it has an id) into the lots and the holdings row
+    # The SELLs after it in ledger order are matched again, unless rows are booked in ledger order (in_order, a rebuild)
+    holding = _lock_holding(session, transaction.portfolio_id, transaction.stock_symbol, transaction.stock_name)
+    later = [] if in_order else _sells_after(session, transaction)
+    if transaction.transaction_type == TransactionType.SELL:
+        holding.quantity -= transaction.quantity
+        _match_sells(session, holding, [transaction] + later)
+    else:
+        _open_lot(session, transaction)
+        holding.quantity += transaction.quantity
+        holding.total_cost += transaction.quantity * _money(transaction.unit_price)
+        if later:
+            _match_sells(session, holding, later)
+
+def _unbook_transaction(session, transaction):
+    # Undo a ledger row's effect on the lots and the holdings row (the SELLs after a deleted SELL are matched again);
+    # raises ValueError if shares of a BUY lot were already sold
+    holding = _lock_holding(session, transaction.portfolio_id, transaction.stock_symbol, transaction.stock_name)
+    if transaction.transaction_type == TransactionType.SELL:
+        matches = session.query(LotMatch).filter(LotMatch.sell_transaction_id == transaction.id).all()
+        if matches:
+            lots = {lot.id: lot for lot in session.query(Lot).filter(
+                Lot.id.in_([m.lot_id for m in matches])
+            ).with_for_update().all()}
+            for match in matches:
+                lots[match.lot_id].remaining_quantity += match.quantity
+                holding.quantity += match.quantity
+                holding.total_cost += match.quantity * match.buy_price
+                holding.realized_pl -= match.realized_pl
+                session.delete(match)
+        later = _sells_after(session, transaction)
+        if later:
+            _match_sells(session, holding, later)
+    else:
+        lot = session.query(Lot).filter(Lot.transaction_id == transaction.id).with_for_update().first()
+        if lot:
+            if lot.remaining_quantity < lot.quantity:
+                raise ValueError(f"{lot.quantity - lot.remaining_quantity} shares of this purchase were already sold; "
+                                 f"delete those SELL transactions first")
+            holding.quantity -= lot.quantity
+            holding.total_cost -= lot.quantity * lot.unit_price
+            session.delete(lot)
+
+def _ledger_order(transaction):
+    # Oldest first; on the same day purchases are booked before sales
+    return (transaction.transaction_date, transaction.transaction_type == TransactionType.SELL, transaction.id)
+
+def rebuild_lot_accounting(portfolio_id=None):
+    # Rebuild lots, matches and holdings from the ledger (backfill, repair, or after back-dated edits)
+    # for one portfolio, or for all portfolios when portfolio_id is None
+    session = None
+    try:
+        session = get_db_session()
+        queries = [session.query(model) for model in (LotMatch, Lot, Holding, Transaction)]
+        if portfolio_id is not None:
+            queries = [query.filter(model.portfolio_id == portfolio_id)
+                       for query, model in zip(queries, (LotMatch, Lot, Holding, Transaction))]
+        for query in queries[:3]:
+            query.delete(synchronize_session=False)
+        transactions = sorted(queries[3].all(), key=_ledger_order)
+        for transaction in transactions:
+            try:
+                _book_transaction(session, transaction, in_order=True)
+            except ValueError as e:
+                session.rollback()
+                return False, f"Error rebuilding lots at transaction #{transaction.id}: {str(e)}"
+            session.flush()
+        rebuilt = {portfolio_id} if portfolio_id is not None else {t.portfolio_id for t in transactions}
+        for rebuilt_id in rebuilt:
+            _bump_version(session, event_bus.transactions_topic(rebuilt_id))
+        session.commit()
+        for rebuilt_id in rebuilt:
+            event_bus.publish(event_bus.transactions_topic(rebuilt_id))
+        return True, f"Rebuilt lots from {len(transactions)} transactions"
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error rebuilding lots: {str(e)}"
+    finally:
+        if session:
+            session.close()
+
 # ================================================
 # TRANSACTION CRUD OPERATIONS
 # ================================================
 
-def add_transaction(stock_symbol, stock_name, transaction_date, quantity, unit_price):
-    # Add transaction to the database
+def add_transaction(stock_symbol, stock_name, transaction_date, quantity, unit_price, transaction_type=TransactionType.BUY,
+                    portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Add transaction to a portfolio and book it into that portfolio's FIFO lots
+    # Returns (True, {'message', 'version'}) or (False, message); version is the portfolio's new transactions version
     # Validate first
     valid, errors = validate_transaction(stock_symbol, quantity, unit_price)
     if not valid:
@@ -153,18 +586,27 @@ def add_transaction(stock_symbol, stock_name, transaction_date, quantity, unit_p
     session = None
     try:
         session = get_db_session()
+        if session.get(Portfolio, portfolio_id) is None:
+            return False, f"Portfolio #{portfolio_id} not found"
         
         # Create the transaction
         new_transaction = Transaction(
+            portfolio_id=portfolio_id,
             stock_symbol=stock_symbol,
             stock_name=stock_name,
             transaction_date=transaction_date,
             quantity=quantity,
             unit_price=unit_price,
-            transaction_type=TransactionType.BUY
+            transaction_type=TransactionType(transaction_type)
         )
         
         session.add(new_transaction)
+        session.flush()  # Assigns the id the lot (or lot matches) refer to
+        try:
+            _book_transaction(session, new_transaction)
+        except ValueError as e:
+            session.rollback()
+            return False, str(e)
         
         # ⭐ CRITICAL FIX: Ensure current_price exists for this stock
         existing_price = session.query(CurrentPrice).filter(
@@ -179,14 +621,21 @@ def add_transaction(stock_symbol, stock_name, transaction_date, quantity, unit_p
                 current_price=unit_price  # Use transaction price as initial current price
             )
             session.add(new_price)
+            _record_events(session, [_price_event(stock_symbol, stock_name, unit_price)])
+            _bump_version(session, event_bus.PRICES)
             print(f"Created new current_price entry for {stock_symbol}")
+        _record_events(session, [_transaction_event(LedgerEventType.ADD, _transaction_row(new_transaction))])
+        version = _bump_version(session, event_bus.transactions_topic(portfolio_id))
         
         # Commit both transaction and price (if new)
         session.commit()
+        event_bus.publish(event_bus.transactions_topic(portfolio_id), [stock_symbol])
+        if not existing_price:
+            event_bus.publish(event_bus.PRICES, [stock_symbol])
         
         # Return transaction ID for reference
         transaction_id = new_transaction.id
-        return True, f"Transaction #{transaction_id} added successfully"
+        return True, {'message': f"Transaction #{transaction_id} added successfully", 'version': version}
     
     except Exception as e:
         if session:
@@ -198,6 +647,204 @@ def add_transaction(stock_symbol, stock_name, transaction_date, quantity, unit_p
             session.close()
 
 
+BULK_INSERT_BATCH_SIZE = 1000  # Rows per multi-row INSERT statement
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _insert_with_ids(session, model, rows, batch_size):
+    # Insert rows with multi-row INSERTs and store the id InnoDB assigned to each in its dict
+    # One multi-row INSERT ... VALUES is a "simple insert", which InnoDB gives consecutive auto-increment ids in every
+    # innodb_autoinc_lock_mode (with the default auto_increment_increment of 1), starting at the LAST_INSERT_ID() it reports
+    for chunk in _chunks(rows, batch_size):
+        first_id = session.execute(insert(model).values(chunk)).lastrowid
+        for offset, row in enumerate(chunk):
+            row['id'] = first_id + offset
+
+def add_transactions_bulk(records, portfolio_id=DEFAULT_PORTFOLIO_ID, batch_size=BULK_INSERT_BATCH_SIZE):
+    # Add many validated transactions to a portfolio in ONE database transaction using multi-row INSERTs
+    # records: dicts with row, stock_symbol, stock_name, transaction_date, quantity, unit_price, transaction_type
+    # Rows are merged in ledger order with the stock's transactions from the first imported date on; a SELL is rejected
+    # when it, or a SELL already on the books after it, would go short. FIFO matching runs in memory over the locked
+    # lots, and existing SELLs after a back-dated row are matched again
+    # Returns (True, {'imported': count, 'rejects': [(row, reason), ...], 'version'}) or (False, message)
+    # version is the portfolio's new transactions version (None when nothing was written)
+    if not records:
+        return True, {'imported': 0, 'rejects': [], 'version': None}
+    
+    session = None
+    try:
+        session = get_db_session()
+        if session.get(Portfolio, portfolio_id) is None:
+            return False, f"Portfolio #{portfolio_id} not found"
+        symbols = sorted({r['stock_symbol'] for r in records})
+        
+        holdings = {h.stock_symbol: h for h in session.query(Holding).filter(
+            Holding.portfolio_id == portfolio_id,
+            Holding.stock_symbol.in_(symbols)
+        ).with_for_update().all()}
+        
+        # Transactions already on the books from each stock's first imported date on (only back-dated imports have any)
+        first_dates = {}
+        for r in records:
+            first_dates[r['stock_symbol']] = min(r['transaction_date'], first_dates.get(r['stock_symbol'], r['transaction_date']))
+        existing = {}
+        for t in session.query(Transaction).filter(
+            Transaction.portfolio_id == portfolio_id,
+            or_(*(and_(Transaction.stock_symbol == symbol, Transaction.transaction_date >= first_date)
+                  for symbol, first_date in first_dates.items()))
+        ).all():
+            existing.setdefault(t.stock_symbol, []).append(t)
+        
+        # Accept or reject the SELLs from share counts alone: in ledger order (existing rows before imported ones on
+        # the same day and side) the holding after every row must stay >= 0; imported BUYs count from the start
+        is_sell = lambda r: r['transaction_type'] == TransactionType.SELL.value
+        rows_by_symbol = {}
+        for r in records:
+            rows_by_symbol.setdefault(r['stock_symbol'], []).append(r)
+        accepted, rejects = [], []
+        for symbol, rows in rows_by_symbol.items():
+            events = sorted([((t.transaction_date, t.transaction_type == TransactionType.SELL, 0, t.id), t) for t in existing.get(symbol, [])]
+                            + [((r['transaction_date'], is_sell(r), 1, r['row']), r) for r in rows], key=lambda event: event[0])
+            deltas = np.array([(-item.quantity if item.transaction_type == TransactionType.SELL else item.quantity)
+                               if isinstance(item, Transaction) else (0 if is_sell(item) else item['quantity'])
+                               for _, item in events], dtype=np.int64)
+            existing_total = sum(-t.quantity if t.transaction_type == TransactionType.SELL else t.quantity for t in existing.get(symbol, []))
+            after = (holdings[symbol].quantity if symbol in holdings else 0) - existing_total + np.cumsum(deltas)
+            for i, (_, item) in enumerate(events):
+                if isinstance(item, Transaction):
+                    continue
+                if not is_sell(item):
+                    accepted.append(item)
+                    continue
+                quantity = item['quantity']
+                short = np.flatnonzero(after[i:] < quantity)
+                if short.size == 0:
+                    after[i:] -= quantity
+                    accepted.append(item)
+                    continue
+                later = None
+                if short[0] > 0:
+                    sale = events[i + short[0]][1]
+                    later = (sale.quantity, sale.transaction_date, int(after[i + short[0]]) + sale.quantity - quantity)
+                rejects.append((item['row'], _oversell_reason(symbol, quantity, item['transaction_date'], int(after[i]), later)))
+        accepted.sort(key=lambda r: (r['transaction_date'], is_sell(r), r['row']))
+        rejects.sort()
+        
+        now = datetime.utcnow()
+        transaction_rows = [{
+            'portfolio_id': portfolio_id, 'stock_symbol': r['stock_symbol'], 'stock_name': r['stock_name'],
+            'transaction_date': r['transaction_date'], 'quantity': r['quantity'], 'unit_price': _money(r['unit_price']),
+            'transaction_type': TransactionType(r['transaction_type']), 'created_at': now
+        } for r in accepted]
+        _insert_with_ids(session, Transaction, transaction_rows, batch_size)
+        lot_rows = [{
+            'transaction_id': row['id'], 'portfolio_id': portfolio_id, 'stock_symbol': row['stock_symbol'],
+            'stock_name': row['stock_name'], 'acquired_date': row['transaction_date'], 'quantity': row['quantity'],
+            'remaining_quantity': row['quantity'], 'unit_price': row['unit_price']
+        } for row in transaction_rows if row['transaction_type'] == TransactionType.BUY]
+        _insert_with_ids(session, Lot, lot_rows, batch_size)
+        
+        # Undo the matches of the existing SELLs, then match them and the imported SELLs again in ledger order
+        positions = {symbol: [0, Decimal('0'), Decimal('0')] for symbol in symbols}  # symbol -> [quantity, total_cost, realized_pl] changes
+        resold = [t for ts in existing.values() for t in ts if t.transaction_type == TransactionType.SELL]
+        previous = []
+        for chunk in _chunks([t.id for t in resold], batch_size):
+            previous += session.query(LotMatch).filter(LotMatch.sell_transaction_id.in_(chunk)).all()
+            session.execute(delete(LotMatch).where(LotMatch.sell_transaction_id.in_(chunk)))
+        lots = {}
+        for lot in session.query(Lot).filter(
+            Lot.portfolio_id == portfolio_id,
+            Lot.stock_symbol.in_(symbols),
+            or_(Lot.remaining_quantity > 0, Lot.id.in_({match.lot_id for match in previous}))
+        ).with_for_update().all():
+            lots[lot.id] = {'id': lot.id, 'stock_symbol': lot.stock_symbol, 'acquired_date': lot.acquired_date, 'remaining_quantity': lot.remaining_quantity,
+                            'stored_quantity': lot.remaining_quantity, 'unit_price': _money(lot.unit_price), 'new': False}
+        for row in lot_rows:
+            lots[row['id']] = dict(row, new=True)
+        for match in previous:
+            lots[match.lot_id]['remaining_quantity'] += match.quantity
+            positions[match.stock_symbol][1] += match.quantity * match.buy_price
+            positions[match.stock_symbol][2] -= match.realized_pl
+        lots_by_symbol = {}
+        for lot in sorted(lots.values(), key=lambda lot: (lot['acquired_date'], lot['id'])):
+            lots_by_symbol.setdefault(lot['stock_symbol'], []).append(lot)
+        sells = [{'id': t.id, 'stock_symbol': t.stock_symbol, 'transaction_date': t.transaction_date, 'quantity': t.quantity,
+                  'unit_price': _money(t.unit_price)} for t in resold]
+        sells += [row for row in transaction_rows if row['transaction_type'] == TransactionType.SELL]
+        for row in transaction_rows:
+            position = positions[row['stock_symbol']]
+            if row['transaction_type'] == TransactionType.SELL:
+                position[0] -= row['quantity']
+            else:
+                position[0] += row['quantity']
+                position[1] += row['quantity'] * row['unit_price']
+        
+        match_rows = []
+        for sell in sorted(sells, key=lambda sell: (sell['transaction_date'], sell['id'])):
+            symbol, price = sell['stock_symbol'], sell['unit_price']
+            position = positions[symbol]
+            eligible = [lot for lot in lots_by_symbol.get(symbol, [])
+                        if lot['remaining_quantity'] > 0 and lot['acquired_date'] <= sell['transaction_date']]
+            for index, matched in match_fifo([(i, lot['remaining_quantity']) for i, lot in enumerate(eligible)], sell['quantity']):
+                lot = eligible[index]
+                lot['remaining_quantity'] -= matched
+                match_rows.append({
+                    'sell_transaction_id': sell['id'], 'lot_id': lot['id'], 'portfolio_id': portfolio_id, 'stock_symbol': symbol,
+                    'quantity': matched, 'buy_price': lot['unit_price'], 'sell_price': price,
+                    'sell_date': sell['transaction_date'], 'realized_pl': matched * (price - lot['unit_price'])
+                })
+                position[1] -= matched * lot['unit_price']
+                position[2] += matched * (price - lot['unit_price'])
+        for chunk in _chunks(match_rows, batch_size):
+            session.execute(insert(LotMatch), chunk)
+        changed_lots = [{'id': lot['id'], 'remaining_quantity': lot['remaining_quantity']} for lot in lots.values()
+                        if lot['new'] and lot['remaining_quantity'] != lot['quantity']
+                        or not lot['new'] and lot['remaining_quantity'] != lot['stored_quantity']]
+        if changed_lots:
+            session.execute(update(Lot), changed_lots)
+        
+        # Fold the per-stock changes into the holdings rows
+        names = {r['stock_symbol']: r['stock_name'] for r in records}
+        new_holdings = []
+        for symbol, (quantity, cost, realized) in positions.items():
+            if symbol in holdings:
+                holdings[symbol].quantity += quantity
+                holdings[symbol].total_cost += cost
+                holdings[symbol].realized_pl += realized
+            elif quantity or cost or realized:
+                new_holdings.append({'portfolio_id': portfolio_id, 'stock_symbol': symbol, 'stock_name': names[symbol], 'quantity': quantity,
+                                     'total_cost': cost, 'realized_pl': realized})
+        if new_holdings:
+            session.execute(insert(Holding), new_holdings)
+        
+        # Ensure current_price exists for every imported stock (last imported price as the initial price)
+        priced = {p for (p,) in session.query(CurrentPrice.stock_symbol).filter(CurrentPrice.stock_symbol.in_(symbols)).all()}
+        last_prices = {row['stock_symbol']: row for row in transaction_rows}
+        new_prices = [{'stock_symbol': symbol, 'stock_name': row['stock_name'], 'current_price': row['unit_price']}
+                      for symbol, row in last_prices.items() if symbol not in priced]
+        if new_prices:
+            session.execute(insert(CurrentPrice), new_prices)
+            _record_events(session, [_price_event(row['stock_symbol'], row['stock_name'], row['current_price']) for row in new_prices])
+            _bump_version(session, event_bus.PRICES)
+        _record_events(session, [_transaction_event(LedgerEventType.ADD, row) for row in transaction_rows])
+        version = _bump_version(session, event_bus.transactions_topic(portfolio_id))
+        
+        session.commit()
+        event_bus.publish(event_bus.transactions_topic(portfolio_id), sorted({row['stock_symbol'] for row in transaction_rows}))
+        event_bus.publish(event_bus.PRICES, [row['stock_symbol'] for row in new_prices])
+        return True, {'imported': len(transaction_rows), 'rejects': rejects, 'version': version}
+    
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error importing transactions: {str(e)}"
+    
+    finally:
+        if session:
+            session.close()
+
 # Also add this helper function to sync missing prices
 def sync_missing_prices():
     # Sync missing current prices for stocks in transactions
@@ -235,7 +882,10 @@ def sync_missing_prices():
         
         if new_prices:
             session.bulk_save_objects(new_prices)
+            _record_events(session, [_price_event(price.stock_symbol, price.stock_name, price.current_price) for price in new_prices])
+            _bump_version(session, event_bus.PRICES)
             session.commit()
+            event_bus.publish(event_bus.PRICES, [price.stock_symbol for price in new_prices])
             return True, f"Synced {len(new_prices)} missing price entries"
         else:
             return True, "All prices are already synced"
@@ -249,12 +899,14 @@ def sync_missing_prices():
         if session:
             session.close()
 
-def get_all_transactions():
-    # Fetch all transactions from database
+def get_all_transactions(portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Fetch all transactions of a portfolio (newest first, read along idx_transactions_portfolio_date)
     session = None
     try:
         session = get_db_session()
-        transactions = session.query(Transaction).order_by(
+        transactions = session.query(Transaction).filter(
+            Transaction.portfolio_id == portfolio_id
+        ).order_by(
             Transaction.transaction_date.desc(),
             Transaction.created_at.desc()
         ).all()
@@ -266,6 +918,7 @@ def get_all_transactions():
             'transaction_date': t.transaction_date,
             'quantity': t.quantity,
             'unit_price': float(t.unit_price),
+            'transaction_type': (t.transaction_type or TransactionType.BUY).value,
             'created_at': t.created_at
         } for t in transactions]
         
@@ -278,19 +931,76 @@ def get_all_transactions():
         if session:
             session.close()
 
-def delete_transaction(transaction_id):
-    # Delete transaction by ID
+def get_transactions_page(portfolio_id=DEFAULT_PORTFOLIO_ID, after=None, limit=TRANSACTION_PAGE_SIZE,
+                          stock_symbol=None, start_date=None, end_date=None):
+    # One page of a portfolio's transactions, newest first; returns (True, (rows, next_cursor)) or (False, message)
+    # after: the cursor returned with the previous page, a (transaction_date, id) pair; None for the first page
+    # The page is read in index order from idx_transactions_portfolio_date, or idx_transactions_portfolio_symbol
+    # when filtering by stock (InnoDB stores the id in both), and seeks past the cursor instead of
+    # using OFFSET, so every page costs the same however long the ledger is
+    session = None
+    try:
+        session = get_db_session()
+        query = session.query(
+            Transaction.id, Transaction.stock_symbol, Transaction.stock_name, Transaction.transaction_date,
+            Transaction.quantity, Transaction.unit_price, Transaction.transaction_type
+        ).filter(Transaction.portfolio_id == portfolio_id)
+        if stock_symbol:
+            query = query.filter(Transaction.stock_symbol == stock_symbol.strip().upper())
+        if start_date:
+            query = query.filter(Transaction.transaction_date >= start_date)
+        if end_date:
+            query = query.filter(Transaction.transaction_date <= end_date)
+        if after:
+            after_date, after_id = after
+            query = query.filter((Transaction.transaction_date < after_date) |
+                                 ((Transaction.transaction_date == after_date) & (Transaction.id < after_id)))
+        # One extra row tells whether there is a next page
+        rows = query.order_by(Transaction.transaction_date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+
+        result = [{
+            'id': r.id,
+            'stock_symbol': r.stock_symbol,
+            'stock_name': r.stock_name,
+            'transaction_date': r.transaction_date,
+            'quantity': r.quantity,
+            'unit_price': float(r.unit_price),
+            'transaction_type': (r.transaction_type or TransactionType.BUY).value
+        } for r in rows[:limit]]
+        next_cursor = (result[-1]['transaction_date'], result[-1]['id']) if len(rows) > limit else None
+        return True, (result, next_cursor)
+
+    except Exception as e:
+        return False, f"Error fetching transactions: {str(e)}"
+
+    finally:
+        if session:
+            session.close()
+
+def delete_transaction(transaction_id, portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Delete a transaction by ID (only from the given portfolio)
+    # Returns (True, {'message', 'version'}) or (False, message); version is the portfolio's new transactions version
     session = None
     try:
         session = get_db_session()
         transaction = session.query(Transaction).filter(
-            Transaction.id == transaction_id
+            Transaction.id == transaction_id,
+            Transaction.portfolio_id == portfolio_id
         ).first()
         
         if transaction:
+            try:
+                _unbook_transaction(session, transaction)
+            except ValueError as e:
+                session.rollback()
+                return False, f"Cannot delete transaction: {str(e)}"
+            symbol = transaction.stock_symbol
+            _record_events(session, [_transaction_event(LedgerEventType.REVERSAL, _transaction_row(transaction))])
             session.delete(transaction)
+            version = _bump_version(session, event_bus.transactions_topic(portfolio_id))
             session.commit()
-            return True, "Transaction deleted successfully"
+            event_bus.publish(event_bus.transactions_topic(portfolio_id), [symbol])
+            return True, {'message': "Transaction deleted successfully", 'version': version}
         else:
             return False, "Transaction not found"
     
@@ -307,58 +1017,46 @@ def delete_transaction(transaction_id):
 # PORTFOLIO OPERATIONS
 # ================================================
 
-def get_portfolio_summary():
-    # Calculate portfolio summary
+def get_portfolio_summary(portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Calculate portfolio summary from the holdings table (one row per stock, maintained on write)
     session = None
     try:
         session = get_db_session()
         
-        # Group by stock and calculate average buy price
+        # Holdings with their current price in ONE query (primary-key join, no GROUP BY over the ledger)
         holdings = session.query(
-            Transaction.stock_symbol,
-            Transaction.stock_name,
-            func.sum(Transaction.quantity).label('quantity'),
-            func.sum(Transaction.quantity * Transaction.unit_price).label('total_cost')
+            Holding.stock_symbol,
+            Holding.stock_name,
+            Holding.quantity,
+            Holding.total_cost,
+            Holding.realized_pl,
+            CurrentPrice.current_price
+        ).outerjoin(
+            CurrentPrice, CurrentPrice.stock_symbol == Holding.stock_symbol
         ).filter(
-            Transaction.transaction_type == TransactionType.BUY
-        ).group_by(
-            Transaction.stock_symbol,
-            Transaction.stock_name
-        ).all()
-        
-        if not holdings:
-            return True, []
-        
-        # Get all current prices in ONE query (OPTIMIZATION)
-        symbols = [h.stock_symbol for h in holdings]
-        prices = session.query(CurrentPrice).filter(
-            CurrentPrice.stock_symbol.in_(symbols)
-        ).all()
-        
-        # Create price lookup dictionary for O(1) access
-        price_dict = {p.stock_symbol: float(p.current_price) for p in prices}
+            Holding.portfolio_id == portfolio_id,
+            Holding.quantity > 0
+        ).order_by(Holding.stock_symbol).all()
         
         result = []
         for holding in holdings:
-            # Convert to int to ensure it's not zero
             quantity = int(holding.quantity)
             
-            if quantity <= 0:
-                continue
-            
             # CRITICAL FIX: Convert both to float before division
             total_cost = float(holding.total_cost)
             avg_price = total_cost / quantity
             
             # Get current price, fallback to avg_price if not found
-            current_price = price_dict.get(holding.stock_symbol, avg_price)
+            current_price = float(holding.current_price) if holding.current_price is not None else avg_price
             
             result.append({
                 'stock_symbol': holding.stock_symbol,
                 'stock_name': holding.stock_name,
                 'quantity': quantity,
                 'avg_buy_price': round(avg_price, 2),
-                'current_price': round(current_price, 2)
+                'current_price': round(current_price, 2),
+                'unrealized_pl': round(quantity * (current_price - avg_price), 2),
+                'realized_pl': round(float(holding.realized_pl), 2)
             })
         
         return True, result
@@ -374,6 +1072,80 @@ def get_portfolio_summary():
         if session:
             session.close()
 
+def get_realized_pl(portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Realized P&L per stock from matched sells, including positions that are fully closed
+    session = None
+    try:
+        session = get_db_session()
+        rows = session.query(Holding.stock_symbol, Holding.realized_pl).filter(
+            Holding.portfolio_id == portfolio_id,
+            Holding.realized_pl != 0
+        ).all()
+        return True, {symbol: round(float(pl), 2) for symbol, pl in rows}
+    except Exception as e:
+        return False, f"Error fetching realized P&L: {str(e)}"
+    finally:
+        if session:
+            session.close()
+
+def _replay_ledger(transactions):
+    # Expected holdings per (portfolio_id, symbol) from a full FIFO replay of the ledger, computed in memory
+    expected = {}
+    open_lots = {}  # (portfolio_id, symbol) -> [[remaining, unit_price], ...] oldest first
+    for t in sorted(transactions, key=_ledger_order):
+        key = (t.portfolio_id, t.stock_symbol)
+        position = expected.setdefault(key, {'quantity': 0, 'total_cost': Decimal('0'), 'realized_pl': Decimal('0')})
+        lots = open_lots.setdefault(key, [])
+        price = _money(t.unit_price)
+        if t.transaction_type == TransactionType.SELL:
+            for index, matched in match_fifo([(i, lot[0]) for i, lot in enumerate(lots)], t.quantity):
+                lots[index][0] -= matched
+                position['total_cost'] -= matched * lots[index][1]
+                position['realized_pl'] += matched * (price - lots[index][1])
+            position['quantity'] -= t.quantity
+        else:
+            lots.append([t.quantity, price])
+            position['quantity'] += t.quantity
+            position['total_cost'] += t.quantity * price
+    return expected
+
+def reconcile_holdings(fix=False, portfolio_id=None):
+    # Verify the holdings table against the transaction ledger (one portfolio, or all when portfolio_id is None);
+    # with fix=True rebuild it on a mismatch. Returns (success, list of mismatch descriptions)
+    session = None
+    try:
+        session = get_db_session()
+        transactions = session.query(Transaction)
+        holdings = session.query(Holding)
+        if portfolio_id is not None:
+            transactions = transactions.filter(Transaction.portfolio_id == portfolio_id)
+            holdings = holdings.filter(Holding.portfolio_id == portfolio_id)
+        try:
+            expected = _replay_ledger(transactions.all())
+        except ValueError as e:
+            return False, [f"Ledger sells more shares than it holds: {str(e)}"]
+        actual = {(h.portfolio_id, h.stock_symbol): h for h in holdings.all()}
+    except Exception as e:
+        return False, [f"Error reconciling holdings: {str(e)}"]
+    finally:
+        if session:
+            session.close()
+    
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, {'quantity': 0, 'total_cost': Decimal('0'), 'realized_pl': Decimal('0')})
+        have = actual.get(key)
+        for field in ('quantity', 'total_cost', 'realized_pl'):
+            value = getattr(have, field) if have is not None else 0
+            if value != want[field]:
+                mismatches.append(f"portfolio #{key[0]} {key[1]}: {field} is {value}, ledger says {want[field]}")
+    
+    if mismatches and fix:
+        success, message = rebuild_lot_accounting(portfolio_id)
+        mismatches.append(message)
+        return success, mismatches
+    return len(mismatches) == 0, mismatches
+
 def calculate_portfolio_metrics(portfolio_data):
     # Calculate portfolio performance metrics
     default_metrics = {
@@ -381,6 +1153,8 @@ def calculate_portfolio_metrics(portfolio_data):
         'current_value': 0.0,
         'net_pl': 0.0,
         'pl_percent': 0.0,
+        'unrealized_pl': 0.0,
+        'realized_pl': 0.0,
         'total_stocks': 0
     }
     
@@ -400,18 +1174,76 @@ def calculate_portfolio_metrics(portfolio_data):
         
         net_pl = current_value - total_investment
         pl_percent = (net_pl / total_investment * 100) if total_investment > 0 else 0.0
+        # Realized P&L of the stocks still held (closed positions come from get_realized_pl)
+        realized_pl = sum([holding.get('realized_pl', 0.0) for holding in portfolio_data])
         
         return {
             'total_investment': round(total_investment, 2),
             'current_value': round(current_value, 2),
             'net_pl': round(net_pl, 2),
             'pl_percent': round(pl_percent, 2),
+            'unrealized_pl': round(net_pl, 2),
+            'realized_pl': round(realized_pl, 2),
             'total_stocks': len(portfolio_data)
         }
     except Exception as e:
         print(f"Error calculating metrics: {str(e)}")
         return default_metrics
 
+def _compute_xirr(portfolio_id):
+    # XIRR of every stock ever traded in the portfolio and of the whole portfolio, solved together
+    session = get_db_session()
+    try:
+        rows = session.query(Transaction.stock_symbol, Transaction.transaction_date, Transaction.quantity,
+                             Transaction.unit_price, Transaction.transaction_type).filter(
+            Transaction.portfolio_id == portfolio_id
+        ).all()
+    finally:
+        session.close()
+    success, holdings = get_portfolio_summary(portfolio_id)
+    if not success:
+        raise RuntimeError(holdings)
+    if not rows:
+        return {'portfolio': None, 'holdings': {}}
+
+    # Purchases are money paid in (negative), sales and today's market value are money taken out (positive)
+    flows = pd.DataFrame([tuple(r) for r in rows], columns=['symbol', 'date', 'quantity', 'price', 'type'])
+    flows['amount'] = (flows['quantity'] * flows['price'].astype(float)).where(flows['type'] == TransactionType.SELL,
+                                                                               -flows['quantity'] * flows['price'].astype(float))
+    today = pd.DataFrame({'symbol': [h['stock_symbol'] for h in holdings], 'date': datetime.now().date(),
+                          'amount': [h['quantity'] * h['current_price'] for h in holdings]})
+    flows = pd.concat([flows[['symbol', 'date', 'amount']], today], ignore_index=True)
+    flows['date'] = pd.to_datetime(flows['date'])
+
+    matrix = flows.pivot_table(index='symbol', columns='date', values='amount', aggfunc='sum', fill_value=0.0)
+    years = ((matrix.columns - matrix.columns[0]).days / 365.0).to_numpy()
+    amounts = np.vstack([matrix.to_numpy(), matrix.to_numpy().sum(axis=0)])  # Last row: the whole portfolio
+    rates = xirr(amounts, years)
+    as_percent = lambda rate: None if np.isnan(rate) else round(float(rate) * 100, 2)
+    return {
+        'portfolio': as_percent(rates[-1]),
+        'holdings': {symbol: as_percent(rate) for symbol, rate in zip(matrix.index, rates[:-1])}
+    }
+
+def get_portfolio_xirr(portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Money-weighted annual return (XIRR, in %) of the portfolio and of each stock; returns (True, dict) or (False, message)
+    # dict: {'portfolio': rate or None, 'holdings': {symbol: rate or None}}; None when the cash flows have no solution
+    # Cached until the next transaction of the portfolio or a price change of one of its stocks
+    errors = []
+    def load():
+        try:
+            return _compute_xirr(portfolio_id)
+        except Exception as e:
+            errors.append(str(e))
+            return None
+    result = event_bus.cached(f'portfolio_xirr:{portfolio_id}:{datetime.now().date()}', load, {
+        event_bus.transactions_topic(portfolio_id): None,
+        event_bus.PRICES: lambda result: list(result['holdings'])
+    })
+    if result is None:
+        return False, f"Error calculating XIRR: {errors[0] if errors else 'unknown error'}"
+    return True, result
+
 # ================================================
 # PRICE MANAGEMENT 
 # ================================================
@@ -449,59 +1281,125 @@ def initialize_default_prices():
         if session:
             session.close()
 
-def update_current_prices():
-    # Update current prices with simulated data (OPTIMIZED)
+def _fetch_quotes(session):
+    # Latest price per symbol in one batched call: live NSE quotes for the whole index,
+    # falling back to the stored nifty50_stock_quotes_data table when NSE is unreachable
+    try:
+        from data.ingest_pipeline import DATASETS, transform, _nse_call, _nse_tools
+        raw = _nse_call(f"nse:stock_quote_in_index:{PRICE_FEED_INDEX}", _nse_tools('get_stock_quote_in_index'),
+                        index=PRICE_FEED_INDEX, include_index=False)
+        quotes = transform(pd.DataFrame(raw), DATASETS['nifty50_stock_quotes'])
+        source = "NSE"
+    except Exception as e:
+        print(f"Live quotes unavailable, using stored NIFTY 50 quotes: {e}")
+        rows = session.execute(text("SELECT symbol, last_price FROM nifty50_stock_quotes_data")).all()
+        quotes = pd.DataFrame([tuple(r) for r in rows], columns=['symbol', 'last_price'])
+        source = "stored quotes"
+    quotes = quotes.dropna(subset=['symbol', 'last_price'])
+    quotes = quotes[quotes['last_price'].astype(float) > 0]
+    return {symbol: _money(price) for symbol, price in zip(quotes['symbol'], quotes['last_price'])}, source
+
+def _refresh_prices():
+    # Refresh the stale current prices from the quote feed with one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+    # Prices updated within PRICE_REFRESH_MIN_SECONDS are left alone, and when none is stale the feed is not called
     session = None
     try:
-        import random
-        
         session = get_db_session()
-        
-        # Get all existing prices in one query
-        existing_prices = {
-            p.stock_symbol: p 
-            for p in session.query(CurrentPrice).all()
-        }
-        
-        new_prices = []
-        updates_count = 0
-        
-        for symbol, name in STOCK_LIST:
-            if symbol in existing_prices:
-                # Update with slight random change (simulating market movement)
-                change_percent = random.uniform(-0.02, 0.02)
-                new_price = float(existing_prices[symbol].current_price) * (1 + change_percent)
-                existing_prices[symbol].current_price = round(new_price, 2)
-                existing_prices[symbol].last_updated = datetime.utcnow()
-                updates_count += 1
-            else:
-                # Insert default prices for stocks not in database
-                new_prices.append(
-                    CurrentPrice(
-                        stock_symbol=symbol,
-                        stock_name=name,
-                        current_price=DEFAULT_PRICES.get(symbol, 1000.00)
-                    )
-                )
-        
-        # Batch insert new prices
-        if new_prices:
-            session.bulk_save_objects(new_prices)
-        
+        now = datetime.utcnow()
+        fresh_since = now - timedelta(seconds=PRICE_REFRESH_MIN_SECONDS)
+        stored = session.query(CurrentPrice.stock_symbol, CurrentPrice.stock_name, CurrentPrice.current_price, CurrentPrice.last_updated).all()
+        existing = {symbol: (name, price) for symbol, name, price, updated in stored if updated is None or updated < fresh_since}
+        known = {row.stock_symbol for row in stored}
+        new_stocks = [(symbol, name) for symbol, name in STOCK_LIST if symbol not in known]
+        if not existing and not new_stocks:
+            return True, {'message': f"Prices are up to date (refreshed within the last {PRICE_REFRESH_MIN_SECONDS} seconds)",
+                          'version': _read_version(session, event_bus.PRICES)}
+        quotes, source = _fetch_quotes(session)
+
+        rows = []
+        changed = []
+        for symbol, (name, price) in existing.items():
+            if symbol in quotes:
+                rows.append({'stock_symbol': symbol, 'stock_name': name, 'current_price': quotes[symbol], 'last_updated': now})
+                if quotes[symbol] != price:
+                    changed.append(symbol)
+        # Default stocks not yet in the table
+        for symbol, name in new_stocks:
+            price = quotes.get(symbol, _money(DEFAULT_PRICES.get(symbol, 1000.00)))
+            rows.append({'stock_symbol': symbol, 'stock_name': name, 'current_price': price, 'last_updated': now})
+            changed.append(symbol)
+
+        if rows:
+            stmt = mysql_insert(CurrentPrice.__table__).values(rows)
+            session.execute(stmt.on_duplicate_key_update(current_price=stmt.inserted.current_price,
+                                                         last_updated=stmt.inserted.last_updated))
+        _record_events(session, [_price_event(row['stock_symbol'], row['stock_name'], row['current_price'])
+                                 for row in rows if row['stock_symbol'] in changed])
+        version = _bump_version(session, event_bus.PRICES) if changed else _read_version(session, event_bus.PRICES)
         session.commit()
-        
-        total_updates = updates_count + len(new_prices)
-        return True, f"Prices updated successfully ({total_updates} stocks)"
-    
+        event_bus.publish(event_bus.PRICES, changed)  # Only caches that depend on these symbols are refreshed
+        missing = len(existing) - sum(1 for symbol in existing if symbol in quotes)
+        message = f"Prices updated from {source}: {len(changed)} changed, {len(rows) - len(changed)} unchanged"
+        if missing:
+            message += f", {missing} without a quote"
+        return True, {'message': message, 'version': version}
+
     except Exception as e:
         if session:
             session.rollback()
         return False, f"Error updating prices: {str(e)}"
-    
+
     finally:
         if session:
             session.close()
 
+PRICE_REFRESH_LOCK = 'stock_market_db.current_prices.refresh'  # MySQL advisory lock name, shared by every process
+
+def _refresh_prices_locked():
+    # Run the refresh while holding the MySQL advisory lock, so app workers and scripts refresh one at a time
+    # and no read-modify-write of current_prices is lost; a process that waited for the lock finds the
+    # prices fresh and skips the feed call. The lock lives on its own connection, the session commits separately.
+    connection = None
+    try:
+        connection = engine.connect()
+        acquired = connection.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                                      {'name': PRICE_REFRESH_LOCK, 'timeout': PRICE_REFRESH_LOCK_SECONDS}).scalar()
+        if acquired != 1:
+            return False, "Another price refresh is still running, please try again shortly"
+        try:
+            return _refresh_prices()
+        finally:
+            connection.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': PRICE_REFRESH_LOCK})
+    except Exception as e:
+        return False, f"Error updating prices: {str(e)}"
+    finally:
+        if connection:
+            connection.close()
+
+_price_refresh = None  # {'done': Event, 'result': (success, message)} of the refresh running in this process
+_price_refresh_lock = threading.Lock()
+
+def update_current_prices():
+    # Refresh current prices from the quote feed; returns (True, {'message', 'version'}) or (False, message)
+    # message gives the number of changed prices, version is the new prices version
+    # Callers arriving while a refresh runs in this process wait for it and share its result (single flight)
+    global _price_refresh
+    with _price_refresh_lock:
+        flight = _price_refresh
+        leader = flight is None
+        if leader:
+            flight = _price_refresh = {'done': threading.Event(), 'result': None}
+    if not leader:
+        flight['done'].wait()
+        return flight['result']
+    try:
+        flight['result'] = _refresh_prices_locked()
+    finally:
+        with _price_refresh_lock:
+            _price_refresh = None
+        flight['done'].set()
+    return flight['result']
+
 def get_last_price_update():
     # Get timestamp of last price update
     session = None
@@ -540,8 +1438,10 @@ def get_database_stats():
         total_transactions = session.query(func.count(Transaction.id)).scalar()
         total_stocks = session.query(func.count(func.distinct(Transaction.stock_symbol))).scalar()
         total_prices = session.query(func.count(CurrentPrice.stock_symbol)).scalar()
+        total_portfolios = session.query(func.count(Portfolio.id)).scalar()
         
         return {
+            'total_portfolios': total_portfolios or 0,
             'total_transactions': total_transactions or 0,
             'total_stocks': total_stocks or 0,
             'total_prices': total_prices or 0,
@@ -549,6 +1449,7 @@ def get_database_stats():
         }
     except Exception as e:
         return {
+            'total_portfolios': 0,
             'total_transactions': 0,
             'total_stocks': 0,
             'total_prices': 0,
@@ -0,0 +1,180 @@
+# File contains the point-in-time (as-of date) portfolio view for the StockMarketApp project
+# The books on any day are rebuilt from the append-only ledger event log (ledger_events, written by
+# data/portfolio_data_processor.py together with every change): the nearest snapshot on or before that
+# day is loaded and only the transactions after it are replayed with FIFO matching. Month-end states
+# reached during a replay are saved as new snapshots, so later views replay about a month of events at most.
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from config.settings import LEDGER_SNAPSHOT_MIN_EVENTS
+from data.portfolio_data_processor import (SessionLocal, LedgerEvent, LedgerEventType, LedgerSnapshot, TransactionType,
+                                           DEFAULT_PORTFOLIO_ID, match_fifo, _money)
+from data import event_bus
+
+# ================================================
+# BOOKS STATE
+# ================================================
+# state: {symbol: {'name', 'lots': [[remaining quantity, unit price], ...] oldest first, 'realized', 'last_price'}}
+
+def _encode(state):
+    # JSON form of a state (Decimals as strings)
+    return {symbol: {'name': p['name'], 'lots': [[quantity, str(price)] for quantity, price in p['lots']],
+                     'realized': str(p['realized']), 'last_price': str(p['last_price'])}
+            for symbol, p in state.items()}
+
+def _decode(data):
+    return {symbol: {'name': p['name'], 'lots': [[quantity, Decimal(price)] for quantity, price in p['lots']],
+                     'realized': Decimal(p['realized']), 'last_price': Decimal(p['last_price'])}
+            for symbol, p in data.items()}
+
+def _apply(state, event):
+    # Book one transaction event into the state (same FIFO rules as the lots tables)
+    position = state.setdefault(event.stock_symbol, {'name': event.stock_name, 'lots': [], 'realized': Decimal('0'), 'last_price': Decimal('0')})
+    price = _money(event.unit_price)
+    if event.transaction_type == TransactionType.SELL:
+        lots = position['lots']
+        for index, matched in match_fifo([(i, lot[0]) for i, lot in enumerate(lots)], event.quantity):
+            lots[index][0] -= matched
+            position['realized'] += matched * (price - lots[index][1])
+        position['lots'] = [lot for lot in lots if lot[0] > 0]
+    else:
+        position['lots'].append([event.quantity, price])
+    position['last_price'] = price
+
+def _event_order(event):
+    # Oldest first; on the same day purchases are booked before sales (as in the lots tables)
+    return (event.effective_date, event.transaction_type == TransactionType.SELL, event.transaction_id)
+
+# ================================================
+# REPLAY
+# ================================================
+
+def _save_snapshots(portfolio_id, snapshots, last_event_id):
+    # Store month-end states; skipped when a write since the replay touched those days (its snapshot would be stale)
+    session = SessionLocal()
+    try:
+        for snapshot_date, state, events in snapshots:
+            stale = session.query(LedgerEvent.id).filter(
+                LedgerEvent.portfolio_id == portfolio_id,
+                LedgerEvent.effective_date <= snapshot_date,
+                LedgerEvent.id > last_event_id
+            ).first()
+            if stale:
+                break
+            session.add(LedgerSnapshot(portfolio_id=portfolio_id, snapshot_date=snapshot_date, state=_encode(state), events=events))
+        session.commit()
+    except IntegrityError:
+        session.rollback()  # Another process saved the same snapshot
+    finally:
+        session.close()
+
+def _replay(session, portfolio_id, as_of):
+    # The books at the end of as_of: (state, snapshot date or None, number of events replayed)
+    last_event_id = session.query(func.max(LedgerEvent.id)).scalar() or 0
+    snapshot = session.query(LedgerSnapshot).filter(
+        LedgerSnapshot.portfolio_id == portfolio_id,
+        LedgerSnapshot.snapshot_date <= as_of
+    ).order_by(LedgerSnapshot.snapshot_date.desc()).first()
+    state = _decode(snapshot.state) if snapshot else {}
+    events = session.query(LedgerEvent).filter(
+        LedgerEvent.portfolio_id == portfolio_id,
+        LedgerEvent.event_type.in_([LedgerEventType.ADD, LedgerEventType.REVERSAL]),
+        LedgerEvent.effective_date <= as_of
+    )
+    if snapshot:
+        events = events.filter(LedgerEvent.effective_date > snapshot.snapshot_date)
+    # A reversal carries the date of the transaction it deletes, so both are in the same tail; it cancels the latest
+    # ADD of that transaction id before it (in log order), so an ADD that reuses the id of a deleted row stays live
+    adds = {}  # transaction id -> its live ADD event
+    for e in events.order_by(LedgerEvent.id).all():
+        if e.event_type == LedgerEventType.REVERSAL:
+            adds.pop(e.transaction_id, None)
+        else:
+            adds[e.transaction_id] = e
+    live = sorted(adds.values(), key=_event_order)
+
+    # Month ends passed on the way become snapshots once enough events were replayed since the last one
+    month_ends = pd.date_range(live[0].effective_date, min(as_of, date.today()), freq='ME').date if live else []
+    new_snapshots, pending, total = [], 0, snapshot.events if snapshot else 0
+    month_index = 0
+    for event in live + [None]:
+        while month_index < len(month_ends) and (event is None or month_ends[month_index] < event.effective_date):
+            if pending >= LEDGER_SNAPSHOT_MIN_EVENTS:
+                new_snapshots.append((month_ends[month_index], _decode(_encode(state)), total))
+                pending = 0
+            month_index += 1
+        if event is not None:
+            _apply(state, event)
+            pending += 1
+            total += 1
+    if new_snapshots:
+        _save_snapshots(portfolio_id, new_snapshots, last_event_id)
+    return state, snapshot.snapshot_date if snapshot else None, len(live)
+
+_PRICE_QUERY_CHUNK = 500
+
+def _prices_as_of(session, symbols, as_of):
+    # Last price event per stock on or before as_of
+    prices = {}
+    for start in range(0, len(symbols), _PRICE_QUERY_CHUNK):
+        chunk = symbols[start:start + _PRICE_QUERY_CHUNK]
+        latest = session.query(func.max(LedgerEvent.id)).filter(
+            LedgerEvent.event_type == LedgerEventType.PRICE,
+            LedgerEvent.stock_symbol.in_(chunk),
+            LedgerEvent.effective_date <= as_of
+        ).group_by(LedgerEvent.stock_symbol)
+        for symbol, price in session.query(LedgerEvent.stock_symbol, LedgerEvent.unit_price).filter(LedgerEvent.id.in_(latest)):
+            prices[symbol] = _money(price)
+    return prices
+
+def _compute_as_of(portfolio_id, as_of):
+    session = SessionLocal()
+    try:
+        state, snapshot_date, replayed = _replay(session, portfolio_id, as_of)
+        prices = _prices_as_of(session, sorted(state), as_of)
+    finally:
+        session.close()
+    holdings = []
+    for symbol, position in sorted(state.items()):
+        quantity = sum(lot[0] for lot in position['lots'])
+        if quantity == 0 and position['realized'] == 0:
+            continue
+        total_cost = sum((lot[0] * lot[1] for lot in position['lots']), Decimal('0'))
+        # Without a price event by then, the stock is valued at its last traded price
+        price = prices.get(symbol, position['last_price'])
+        holdings.append({
+            'stock_symbol': symbol,
+            'stock_name': position['name'],
+            'quantity': quantity,
+            'avg_price': float(total_cost / quantity) if quantity else 0.0,
+            'total_cost': float(total_cost),
+            'price': float(price),
+            'market_value': float(quantity * price),
+            'unrealized_pl': float(quantity * price - total_cost),
+            'realized_pl': float(position['realized'])
+        })
+    return {'as_of': as_of, 'holdings': holdings, 'snapshot_date': snapshot_date, 'events_replayed': replayed}
+
+def get_holdings_as_of(as_of, portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # A portfolio's holdings at the end of a day, rebuilt from the ledger event log; returns (True, dict) or (False, message)
+    # dict: as_of, holdings (list of dicts with quantity, avg_price, total_cost, price, market_value, unrealized_pl,
+    # realized_pl), snapshot_date (the snapshot the replay started from, or None) and events_replayed
+    errors = []
+    def load():
+        try:
+            return _compute_as_of(portfolio_id, as_of)
+        except Exception as e:
+            errors.append(str(e))
+            return None
+    result = event_bus.cached(f'holdings_as_of:{portfolio_id}:{as_of}', load, {
+        event_bus.transactions_topic(portfolio_id): None,
+        event_bus.PRICES: lambda result: [h['stock_symbol'] for h in result['holdings']]
+    })
+    if result is None:
+        return False, f"Error rebuilding holdings as of {as_of}: {errors[0] if errors else 'unknown error'}"
+    return True, result
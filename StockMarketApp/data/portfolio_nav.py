@@ -0,0 +1,164 @@
+# File contains the daily portfolio NAV (value over time) for the StockMarketApp project
+# Positions come from the transaction ledger and prices from the historical closes in bank_nifty_data
+# (the last traded price is used for stocks without closes). The whole history is valued as one
+# positions x prices matrix (utils/calculations.daily_nav) and persisted in portfolio_nav, so later
+# calls only value the days after the last cached day, unless the ledger changed before that day.
+import hashlib
+import os
+import sys
+from datetime import date, datetime
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import Column, Integer, String, Date, DateTime, DECIMAL, text, bindparam, insert
+from sqlalchemy.orm import declarative_base
+from data.portfolio_data_processor import engine, SessionLocal, Transaction, TransactionType, DEFAULT_PORTFOLIO_ID
+from utils.calculations import daily_nav
+
+Base = declarative_base()  # Base class for SQLAlchemy models
+# ================================================
+# DATABASE MODELS
+# ================================================
+
+class PortfolioNav(Base):
+    __tablename__ = 'portfolio_nav'
+
+    portfolio_id = Column(Integer, primary_key=True)
+    nav_date = Column(Date, primary_key=True)
+    market_value = Column(DECIMAL(16, 2), nullable=False)
+    net_invested = Column(DECIMAL(16, 2), nullable=False)  # Money put in minus money taken out
+
+class PortfolioNavState(Base):
+    # One row per portfolio: how far its cached series goes and which ledger it was computed from
+    __tablename__ = 'portfolio_nav_state'
+
+    portfolio_id = Column(Integer, primary_key=True)
+    cached_through = Column(Date, nullable=False)
+    ledger_fingerprint = Column(String(40), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def init_nav_tables():
+    # Create the NAV tables if they do not exist
+    try:
+        Base.metadata.create_all(bind=engine)
+        return True, "NAV tables initialized successfully"
+    except Exception as e:
+        return False, f"Error initializing NAV tables: {str(e)}"
+
+NAV_COLUMNS = ['nav_date', 'market_value', 'net_invested', 'pl']
+
+# ================================================
+# INPUTS
+# ================================================
+
+def _load_ledger(session, portfolio_id) -> pd.DataFrame:
+    # A portfolio's transactions as date, symbol, signed quantity (sells negative) and price
+    rows = session.query(Transaction.id, Transaction.transaction_date, Transaction.stock_symbol,
+                         Transaction.quantity, Transaction.unit_price, Transaction.transaction_type).filter(
+        Transaction.portfolio_id == portfolio_id
+    ).all()
+    ledger = pd.DataFrame([tuple(r) for r in rows], columns=['id', 'date', 'symbol', 'quantity', 'price', 'type'])
+    ledger['date'] = pd.to_datetime(ledger['date'])
+    ledger['price'] = ledger['price'].astype(float)
+    ledger['quantity'] = ledger['quantity'].where(ledger['type'] != TransactionType.SELL, -ledger['quantity']).astype(float)
+    return ledger.drop(columns='type').sort_values(['date', 'id'])
+
+def _ledger_fingerprint(ledger, through) -> str:
+    # Hash of the ledger rows up to a day; changes when a transaction on or before that day is added or deleted
+    rows = ledger.loc[ledger['date'] <= pd.Timestamp(through), ['id', 'date', 'symbol', 'quantity', 'price']]
+    return hashlib.sha1(pd.util.hash_pandas_object(rows, index=False).values.tobytes()).hexdigest()
+
+_CLOSES_QUERY = text(
+    "SELECT symbol, trade_date AS date, close_price AS close FROM bank_nifty_data "
+    "WHERE symbol IN :symbols AND trade_date BETWEEN :start AND :end"
+).bindparams(bindparam('symbols', expanding=True))
+
+_OPENING_CLOSES_QUERY = text(
+    "SELECT b.symbol, b.close_price AS close FROM bank_nifty_data b JOIN ("
+    "SELECT symbol, MAX(trade_date) AS trade_date FROM bank_nifty_data "
+    "WHERE symbol IN :symbols AND trade_date < :start GROUP BY symbol"
+    ") latest ON b.symbol = latest.symbol AND b.trade_date = latest.trade_date"
+).bindparams(bindparam('symbols', expanding=True))
+
+def _read_closes(session, query, **params) -> pd.DataFrame:
+    # Historical closes; without bank_nifty_data the valuation falls back to traded prices
+    try:
+        result = session.execute(query, params)
+        return pd.DataFrame([tuple(r) for r in result], columns=list(result.keys()))
+    except Exception as e:
+        print(f"Historical closes unavailable, valuing at traded prices: {e}")
+        return pd.DataFrame(columns=['symbol', 'date', 'close'])
+
+# ================================================
+# NAV SERIES
+# ================================================
+
+def _compute(session, ledger, dates) -> pd.DataFrame:
+    # Value the given days, starting from the ledger state on the day before
+    before = ledger['date'] < dates[0]
+    symbols = sorted(ledger['symbol'].unique())
+    history = ledger[before]
+    opening_closes = _read_closes(session, _OPENING_CLOSES_QUERY, symbols=symbols, start=dates[0].date())
+    opening = {
+        'positions': history.groupby('symbol')['quantity'].sum(),
+        'trade_price': history.groupby('symbol')['price'].last(),
+        'close': opening_closes.set_index('symbol')['close'].astype(float) if not opening_closes.empty else pd.Series(dtype='float64'),
+        'net_invested': float((history['quantity'] * history['price']).sum())
+    }
+    trades = ledger[~before & (ledger['date'] <= dates[-1])]
+    closes = _read_closes(session, _CLOSES_QUERY, symbols=symbols, start=dates[0].date(), end=dates[-1].date())
+    closes['close'] = closes['close'].astype(float)
+    return daily_nav(dates, trades, closes, opening)
+
+def get_portfolio_nav(portfolio_id=DEFAULT_PORTFOLIO_ID, refresh=False):
+    # Daily NAV of a portfolio from its first transaction until today; returns (True, DataFrame) or (False, message)
+    # Days before today are cached in portfolio_nav and only new days are valued on later calls;
+    # refresh=True recomputes everything (e.g. after historical closes were backfilled)
+    session = None
+    try:
+        session = SessionLocal()
+        ledger = _load_ledger(session, portfolio_id)
+        if ledger.empty:
+            return True, pd.DataFrame(columns=NAV_COLUMNS)
+        today = pd.Timestamp(date.today())
+        state = session.get(PortfolioNavState, portfolio_id)
+        cache = session.query(PortfolioNav).filter(PortfolioNav.portfolio_id == portfolio_id)
+
+        start = ledger['date'].min()
+        if state and not refresh and state.ledger_fingerprint == _ledger_fingerprint(ledger, state.cached_through):
+            start = max(start, pd.Timestamp(state.cached_through) + pd.offsets.BDay(1))
+        else:
+            cache.delete(synchronize_session=False)
+
+        dates = pd.bdate_range(start, today)
+        latest = pd.DataFrame(columns=['market_value', 'net_invested'])
+        if len(dates):
+            latest = _compute(session, ledger, dates)
+            # Today's close can still change, so only earlier days are stored
+            cached = latest[latest.index < today]
+            if not cached.empty:
+                session.execute(insert(PortfolioNav), [
+                    {'portfolio_id': portfolio_id, 'nav_date': day.date(), 'market_value': round(row.market_value, 2), 'net_invested': round(row.net_invested, 2)}
+                    for day, row in cached.iterrows()
+                ])
+                through = cached.index[-1].date()
+                if state is None:
+                    session.add(PortfolioNavState(portfolio_id=portfolio_id, cached_through=through, ledger_fingerprint=_ledger_fingerprint(ledger, through)))
+                else:
+                    state.cached_through = through
+                    state.ledger_fingerprint = _ledger_fingerprint(ledger, through)
+            session.commit()
+            latest = latest[latest.index >= today]
+
+        rows = cache.with_entities(PortfolioNav.nav_date, PortfolioNav.market_value, PortfolioNav.net_invested).order_by(PortfolioNav.nav_date).all()
+        nav = pd.DataFrame([(r[0], float(r[1]), float(r[2])) for r in rows], columns=['nav_date', 'market_value', 'net_invested'])
+        if not latest.empty:
+            nav = pd.concat([nav, latest.rename_axis('nav_date').reset_index().assign(nav_date=lambda d: d['nav_date'].dt.date)], ignore_index=True)
+        nav['pl'] = nav['market_value'] - nav['net_invested']
+        return True, nav[NAV_COLUMNS]
+    except Exception as e:
+        if session:
+            session.rollback()
+        return False, f"Error computing portfolio NAV: {str(e)}"
+    finally:
+        if session:
+            session.close()
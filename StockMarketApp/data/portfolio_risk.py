@@ -0,0 +1,102 @@
+# File contains the portfolio risk analytics for the StockMarketApp project
+# Current holdings are weighted by market value, their daily closes (bank_nifty_data) become one
+# days x holdings returns matrix, and volatility, beta against the benchmark index
+# (bank_nifty_index_data), Sharpe, Sortino and historical / parametric VaR are computed from it
+# with matrix products (utils/calculations.portfolio_risk). Results are cached per portfolio and
+# day until the portfolio's transactions or the prices of its holdings change.
+import os
+import sys
+from datetime import date, timedelta
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text, bindparam
+from config.settings import RISK_BENCHMARK_INDEX, RISK_LOOKBACK_DAYS, RISK_FREE_RATE, RISK_VAR_CONFIDENCE, TRADING_DAYS_PER_YEAR
+from data.portfolio_data_processor import SessionLocal, get_portfolio_summary, DEFAULT_PORTFOLIO_ID
+from data import event_bus
+from utils.calculations import portfolio_risk
+
+MIN_RISK_DAYS = 20  # Fewer common trading days than this do not give meaningful risk numbers
+
+_CLOSES_QUERY = text(
+    "SELECT symbol, trade_date, close_price FROM bank_nifty_data "
+    "WHERE symbol IN :symbols AND trade_date >= :start"
+).bindparams(bindparam('symbols', expanding=True))
+
+_BENCHMARK_QUERY = text(
+    "SELECT historical_date, close FROM bank_nifty_index_data "
+    "WHERE UPPER(index_name) = :index_name AND historical_date >= :start"
+)
+
+def _read_holding_returns(session, symbols, start):
+    # Daily returns of the holdings since start (days x symbols, NaN where a stock did not trade)
+    rows = session.execute(_CLOSES_QUERY, {'symbols': symbols, 'start': start}).all()
+    closes = pd.DataFrame([tuple(r) for r in rows], columns=['symbol', 'trade_date', 'close_price'])
+    prices = closes.pivot_table(index='trade_date', columns='symbol', values='close_price', aggfunc='last').sort_index()
+    return prices.astype(float).pct_change(fill_method=None).iloc[1:]
+
+def _read_benchmark_returns(session, start):
+    # Daily returns of the benchmark index since start
+    rows = session.execute(_BENCHMARK_QUERY, {'index_name': RISK_BENCHMARK_INDEX.upper(), 'start': start}).all()
+    benchmark = pd.Series({day: close for day, close in rows}, dtype='float64').sort_index()
+    return benchmark.pct_change().iloc[1:]
+
+def _holding_values(portfolio_id):
+    # Market value of every current holding by symbol
+    success, holdings = get_portfolio_summary(portfolio_id)
+    if not success:
+        raise RuntimeError(holdings)
+    if not holdings:
+        raise ValueError("No holdings to analyse")
+    return pd.Series({h['stock_symbol']: h['quantity'] * h['current_price'] for h in holdings})
+
+def _compute_risk(portfolio_id, as_of):
+    values = _holding_values(portfolio_id)
+    start = as_of - timedelta(days=RISK_LOOKBACK_DAYS)
+    session = SessionLocal()
+    try:
+        returns = _read_holding_returns(session, sorted(values.index), start)
+        benchmark = _read_benchmark_returns(session, start)
+    finally:
+        session.close()
+    # Holdings without price history are left out of the returns matrix and reported
+    missing = sorted(set(values.index) - set(returns.columns))
+    covered = values.drop(missing)
+    if covered.empty or len(returns.index.intersection(benchmark.index)) < MIN_RISK_DAYS:
+        raise ValueError(f"Not enough price history in the last {RISK_LOOKBACK_DAYS} days")
+
+    summary, by_holding = portfolio_risk(returns[covered.index], covered / covered.sum(), benchmark,
+                                         risk_free_rate=RISK_FREE_RATE, confidence=RISK_VAR_CONFIDENCE,
+                                         periods_per_year=TRADING_DAYS_PER_YEAR)
+    market_value = float(covered.sum())
+    summary.update({
+        'as_of': as_of,
+        'market_value': market_value,
+        'var_historical_amount': summary['var_historical'] * market_value,
+        'var_parametric_amount': summary['var_parametric'] * market_value,
+        'confidence': RISK_VAR_CONFIDENCE,
+        'benchmark': RISK_BENCHMARK_INDEX,
+        'missing': missing,
+        'holdings': by_holding.rename_axis('stock_symbol').reset_index()
+    })
+    return summary
+
+def get_portfolio_risk(portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Risk numbers of a portfolio for today; returns (True, dict) or (False, message)
+    # dict: volatility, beta, sharpe, sortino, var_historical / var_parametric (fractions and *_amount in rupees),
+    # annual_return, days, market_value, missing (holdings without price history) and a per-holding DataFrame
+    as_of = date.today()
+    errors = []
+    def load():
+        try:
+            return _compute_risk(portfolio_id, as_of)
+        except Exception as e:
+            errors.append(str(e))
+            return None
+    # Weights come from current prices, so a price change of a held stock invalidates the result too
+    risk = event_bus.cached(f'portfolio_risk:{portfolio_id}:{as_of}', load, {
+        event_bus.transactions_topic(portfolio_id): None,
+        event_bus.PRICES: lambda result: result['holdings']['stock_symbol'].tolist() + result['missing']
+    })
+    if risk is None:
+        return False, f"Error computing portfolio risk: {errors[0] if errors else 'unknown error'}"
+    return True, risk
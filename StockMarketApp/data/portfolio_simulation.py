@@ -0,0 +1,88 @@
+# File contains the Monte Carlo scenario simulator for the StockMarketApp project
+# The current holdings are projected over a horizon of trading days from their daily returns in
+# bank_nifty_data, either by resampling whole historical days (bootstrap) or from correlated normal
+# returns with the historical mean and covariance. Paths are generated in memory-bounded chunks
+# (utils/calculations.simulate_portfolio_paths) and summarised as percentile bands of the portfolio value.
+# Results are cached per portfolio, day and scenario until its transactions or the prices of its holdings change.
+import os
+import sys
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (RISK_LOOKBACK_DAYS, RISK_VAR_CONFIDENCE, TRADING_DAYS_PER_YEAR, SIMULATION_PATHS, SIMULATION_BAND_POINTS,
+                             SIMULATION_PERCENTILES, SIMULATION_CHUNK_ELEMENTS, SIMULATION_WORKERS)
+from data.portfolio_data_processor import SessionLocal, DEFAULT_PORTFOLIO_ID
+from data.portfolio_risk import MIN_RISK_DAYS, _holding_values, _read_holding_returns
+from data import event_bus
+from utils.calculations import simulate_portfolio_paths
+
+SIMULATION_METHODS = {
+    'bootstrap': 'Historical bootstrap',  # Resample whole trading days of the lookback window
+    'normal': 'Correlated normal'  # Normal log returns with the historical mean and covariance
+}
+
+def _compute_simulation(portfolio_id, as_of, horizon_days, method, n_paths, seed):
+    values = _holding_values(portfolio_id)
+    session = SessionLocal()
+    try:
+        returns = _read_holding_returns(session, sorted(values.index), as_of - timedelta(days=RISK_LOOKBACK_DAYS))
+    finally:
+        session.close()
+    # Holdings without price history are left out of the simulation and reported
+    missing = sorted(set(values.index) - set(returns.columns))
+    covered = values.drop(missing)
+    if covered.empty or len(returns) < MIN_RISK_DAYS:
+        raise ValueError(f"Not enough price history in the last {RISK_LOOKBACK_DAYS} days")
+
+    checkpoints = np.unique(np.linspace(1, horizon_days, min(horizon_days, SIMULATION_BAND_POINTS)).round().astype(int))
+    paths = simulate_portfolio_paths(returns[covered.index], covered / covered.sum(), horizon_days, n_paths, method,
+                                     checkpoints=checkpoints, seed=seed, chunk_elements=SIMULATION_CHUNK_ELEMENTS,
+                                     workers=SIMULATION_WORKERS)
+    market_value = float(covered.sum())
+    bands = pd.DataFrame(np.percentile(paths, SIMULATION_PERCENTILES, axis=0).T * market_value,
+                         columns=[f'p{q}' for q in SIMULATION_PERCENTILES])
+    bands.insert(0, 'day', checkpoints)
+    today = pd.DataFrame([[0] + [market_value] * len(SIMULATION_PERCENTILES)], columns=bands.columns)
+    final = paths[:, -1].astype(float) * market_value
+    return {
+        'as_of': as_of,
+        'horizon_days': horizon_days,
+        'method': method,
+        'paths': n_paths,
+        'days': len(returns),
+        'market_value': market_value,
+        'bands': pd.concat([today, bands], ignore_index=True),
+        'expected_value': float(final.mean()),
+        'probability_of_loss': float((final < market_value).mean()),
+        'var_amount': float(market_value - np.percentile(final, (1 - RISK_VAR_CONFIDENCE) * 100)),
+        'confidence': RISK_VAR_CONFIDENCE,
+        'symbols': covered.index.tolist(),
+        'missing': missing
+    }
+
+def get_portfolio_simulation(portfolio_id=DEFAULT_PORTFOLIO_ID, horizon_days=TRADING_DAYS_PER_YEAR, method='bootstrap',
+                             n_paths=SIMULATION_PATHS, seed=None):
+    # Simulated value distribution of a portfolio's current holdings; returns (True, dict) or (False, message)
+    # dict: bands (DataFrame of day and the value percentiles p5 ... p95 in rupees, day 0 = today),
+    # expected_value, probability_of_loss and var_amount (loss at the VaR confidence) at the horizon,
+    # market_value, days of history used and missing (holdings without price history)
+    if method not in SIMULATION_METHODS:
+        return False, f"Unknown simulation method: {method}"
+    if horizon_days < 1 or n_paths < 1:
+        return False, "Horizon and number of paths must be positive"
+    as_of = date.today()
+    errors = []
+    def load():
+        try:
+            return _compute_simulation(portfolio_id, as_of, horizon_days, method, n_paths, seed)
+        except Exception as e:
+            errors.append(str(e))
+            return None
+    simulation = event_bus.cached(f'portfolio_simulation:{portfolio_id}:{as_of}:{horizon_days}:{method}:{n_paths}:{seed}', load, {
+        event_bus.transactions_topic(portfolio_id): None,
+        event_bus.PRICES: lambda result: result['symbols'] + result['missing']
+    })
+    if simulation is None:
+        return False, f"Error simulating portfolio: {errors[0] if errors else 'unknown error'}"
+    return True, simulation
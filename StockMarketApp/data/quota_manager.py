@@ -0,0 +1,170 @@
+# File contains the API quota manager for the StockMarketApp project
+# Every external provider (Alpha Vantage, Finnhub, Marketaux, NSE) gets one or more token buckets.
+# The bucket state lives in a local SQLite file, so all Streamlit workers and the ingestion scripts
+# share the same budget. The same file keeps the last good response of every call, which the API
+# client falls back to when a bucket is empty or the provider returns an error payload.
+import json
+import os
+import sqlite3
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import API_RATE_LIMITS, API_QUOTA_DB_PATH, API_QUOTA_WAIT_SECONDS
+
+def _connect():
+    # Open the shared quota store (autocommit mode, transactions are started explicitly)
+    connection = sqlite3.connect(API_QUOTA_DB_PATH, timeout=10, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS token_buckets (
+            bucket TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            cache_key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            body TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )""")
+    return connection
+
+def _bucket_name(provider, period):
+    return f"{provider}:{period}"
+
+def _refilled(row, capacity, period, now):
+    # Return the token count of a bucket after refilling it for the time elapsed since its last update
+    if row is None:
+        return float(capacity)
+    tokens, updated_at = row
+    return min(float(capacity), tokens + (now - updated_at) * capacity / period)
+
+# ================================================
+# TOKEN BUCKETS
+# ================================================
+
+def try_acquire(provider: str, tokens=1):
+    # Try to take tokens from every bucket of a provider in one transaction
+    # Returns (acquired, seconds_until_available)
+    limits = API_RATE_LIMITS.get(provider)
+    if not limits:
+        return True, 0.0
+    connection = None
+    try:
+        connection = _connect()
+        connection.execute("BEGIN IMMEDIATE")  # Locks the store against other processes
+        now = time.time()
+        levels = []
+        wait_seconds = 0.0
+        for capacity, period in limits:
+            name = _bucket_name(provider, period)
+            row = connection.execute("SELECT tokens, updated_at FROM token_buckets WHERE bucket = ?", (name,)).fetchone()
+            level = _refilled(row, capacity, period, now)
+            levels.append((name, level))
+            if level < tokens:
+                wait_seconds = max(wait_seconds, (tokens - level) * period / capacity)
+        if wait_seconds > 0:
+            connection.execute("ROLLBACK")
+            return False, wait_seconds
+        connection.executemany(
+            "INSERT OR REPLACE INTO token_buckets (bucket, tokens, updated_at) VALUES (?, ?, ?)",
+            [(name, level - tokens, now) for name, level in levels]
+        )
+        connection.execute("COMMIT")
+        return True, 0.0
+    except sqlite3.Error as e:
+        print(f"Quota store error for {provider}: {e}")
+        return True, 0.0  # Never block API calls because the quota store is unavailable
+    finally:
+        if connection:
+            connection.close()
+
+def acquire(provider: str, tokens=1, max_wait=None) -> bool:
+    # Take tokens for a provider, queueing for up to max_wait seconds when a bucket is empty
+    if max_wait is None:
+        max_wait = API_QUOTA_WAIT_SECONDS
+    deadline = time.time() + max_wait
+    while True:
+        acquired, wait_seconds = try_acquire(provider, tokens)
+        if acquired:
+            return True
+        if time.time() + wait_seconds > deadline:
+            return False
+        time.sleep(wait_seconds)
+
+def get_remaining_budget() -> dict:
+    # Return the remaining tokens of every bucket, e.g. {'alphavantage': [{'period': 60, 'remaining': 3, 'capacity': 5}, ...]}
+    budget = {}
+    try:
+        connection = _connect()
+        try:
+            now = time.time()
+            for provider, limits in API_RATE_LIMITS.items():
+                budget[provider] = []
+                for capacity, period in limits:
+                    row = connection.execute(
+                        "SELECT tokens, updated_at FROM token_buckets WHERE bucket = ?",
+                        (_bucket_name(provider, period),)
+                    ).fetchone()
+                    budget[provider].append({
+                        'period': period,
+                        'remaining': int(_refilled(row, capacity, period, now)),
+                        'capacity': capacity
+                    })
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Quota store error: {e}")
+    return budget
+
+PERIOD_LABELS = {1: 'sec', 60: 'min', 3600: 'hour', 86400: 'day'}
+
+def describe_remaining_budget() -> dict:
+    # Return the remaining budget as display text per provider, e.g. {'alphavantage': '3/5 per min, 20/25 per day'}
+    return {
+        provider: ", ".join(
+            f"{b['remaining']}/{b['capacity']} per {PERIOD_LABELS.get(b['period'], str(b['period']) + 's')}"
+            for b in buckets
+        )
+        for provider, buckets in get_remaining_budget().items()
+    }
+
+def render_budget_sidebar():
+    # Show the remaining API budget (shared by all workers and ingestion scripts) in the page sidebar
+    import streamlit as st  # Imported here so ingestion scripts do not need streamlit
+    with st.sidebar:
+        st.markdown("#### API Budget")
+        for provider, budget in describe_remaining_budget().items():
+            st.caption(f"**{provider}**: {budget}")
+
+# ================================================
+# RESPONSE CACHE (degraded mode)
+# ================================================
+
+def store_response(cache_key: str, provider: str, body):
+    # Keep the last good response of an API call
+    try:
+        connection = _connect()
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO response_cache (cache_key, provider, body, fetched_at) VALUES (?, ?, ?, ?)",
+                (cache_key, provider, json.dumps(body), time.time())
+            )
+        finally:
+            connection.close()
+    except (sqlite3.Error, TypeError) as e:
+        print(f"Error caching response for {cache_key}: {e}")
+
+def get_cached_response(cache_key: str):
+    # Return the last good response of an API call (or None)
+    try:
+        connection = _connect()
+        try:
+            row = connection.execute("SELECT body FROM response_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Error reading cached response for {cache_key}: {e}")
+        return None
+    return json.loads(row[0]) if row else None
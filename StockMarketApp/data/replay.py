@@ -0,0 +1,88 @@
+# File contains the record/replay provider adapter for the StockMarketApp project
+# It sits under the API client (HTTP calls) and the NSE library calls (nsetools / nsepython / nselib),
+# so the fetch pipeline can be benchmarked on an offline box:
+#   STOCKAPP_HTTP_MODE=live    - call the real providers (default)
+#   STOCKAPP_HTTP_MODE=record  - call the real providers and save every response to STOCKAPP_REPLAY_DIR
+#   STOCKAPP_HTTP_MODE=replay  - serve the saved responses, with configurable latency and error injection
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import pandas as pd
+import requests
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import HTTP_MODE, REPLAY_DIR, REPLAY_LATENCY_MS, REPLAY_JITTER_MS, REPLAY_ERROR_RATE
+
+class ReplayError(Exception):
+    # Raised for injected provider failures and for calls that were never recorded
+    pass
+
+def is_replaying() -> bool:
+    return HTTP_MODE == 'replay'
+
+_injected = threading.local()  # Injected failures per thread; callers often swallow them in a cache fallback
+
+def injected_failures() -> int:
+    # Number of failures injected into calls made by the current thread so far
+    return getattr(_injected, 'count', 0)
+
+def _recording_path(key: str) -> str:
+    # Readable file name plus a short hash, so keys differing only in punctuation do not collide
+    safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', key)[:80]
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(REPLAY_DIR, f"{safe}-{digest}.json")
+
+def _save_recording(key: str, kind: str, body):
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    with open(_recording_path(key), 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'kind': kind, 'recorded_at': time.time(), 'body': body}, f, default=str)
+
+def _load_recording(key: str) -> dict:
+    path = _recording_path(key)
+    if not os.path.exists(path):
+        raise ReplayError(f"No recording for {key} in {REPLAY_DIR}")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _simulate_provider():
+    # Sleep for the configured latency and inject failures at the configured rate
+    delay_ms = max(0.0, random.gauss(REPLAY_LATENCY_MS, REPLAY_JITTER_MS)) if REPLAY_JITTER_MS else REPLAY_LATENCY_MS
+    if delay_ms:
+        time.sleep(delay_ms / 1000)
+    if REPLAY_ERROR_RATE and random.random() < REPLAY_ERROR_RATE:
+        _injected.count = injected_failures() + 1
+        raise ReplayError("Injected provider error")
+
+# ================================================
+# ADAPTERS
+# ================================================
+
+def get_json(key: str, url: str, timeout=30):
+    # Drop-in for requests.get(url).json(); key identifies the call without secrets such as API keys
+    if is_replaying():
+        _simulate_provider()
+        return _load_recording(key)['body']
+    data = requests.get(url, timeout=timeout).json()
+    if HTTP_MODE == 'record':
+        _save_recording(key, 'json', data)
+    return data
+
+def call(key: str, func, *args, **kwargs):
+    # Wrap a library call (e.g. nse.get_stock_quote_in_index) that returns a DataFrame, list or dict
+    if is_replaying():
+        _simulate_provider()
+        recording = _load_recording(key)
+        if recording['kind'] == 'dataframe':
+            return pd.DataFrame.from_records(recording['body'])
+        return recording['body']
+    result = func(*args, **kwargs)
+    if HTTP_MODE == 'record':
+        if isinstance(result, pd.DataFrame):
+            _save_recording(key, 'dataframe', json.loads(result.to_json(orient='records', date_format='iso')))
+        else:
+            _save_recording(key, 'json', result)
+    return result
@@ -0,0 +1,90 @@
+# File contains the columnar snapshot store for the dashboard datasets of the StockMarketApp project
+# CSV snapshots (advance/decline, gainers, losers, index valuation) are converted to uncompressed
+# Arrow IPC (Feather v2) files next to them. These are opened memory-mapped, so numeric columns are
+# read straight from the OS page cache, shared by every worker process, instead of being re-parsed.
+# pyarrow is optional: without it, data/file_data_processor.py keeps reading the CSV files.
+#
+# Usage: python data/snapshot_store.py   (converts all dashboard snapshots and compares load times)
+import os
+import sys
+import time
+import uuid
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+ARROW_SUFFIX = '.arrow'
+
+def is_available() -> bool:
+    # True when pyarrow is installed and columnar snapshots can be used
+    return feather is not None
+
+def arrow_path(csv_path: str) -> str:
+    # Columnar snapshot file that belongs to a CSV snapshot (same name, .arrow suffix)
+    return os.path.splitext(csv_path)[0] + ARROW_SUFFIX
+
+def write_atomic(path: str, write):
+    # Write a file by calling write(tmp_path) and renaming the result over path, so readers never see a half-written
+    # file; the temporary name is unique per call, so concurrent writers of the same file (the ingestion and a
+    # dashboard converting the CSV it just saw) never clobber each other's temporary file, and the last rename wins
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_arrow(path: str, df: pd.DataFrame):
+    # Write uncompressed, so the file can be memory-mapped without decoding
+    write_atomic(path, lambda tmp_path: feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed'))
+
+def read_arrow(path: str, columns=None) -> pd.DataFrame:
+    # Open a columnar snapshot memory-mapped; numeric columns without nulls stay zero-copy
+    # (read-only views on the mapped file), only string columns are materialized
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+def convert_snapshot(csv_path: str, schema=None):
+    # Convert one CSV snapshot to its columnar file; returns (success, message)
+    if not is_available():
+        return False, "pyarrow is not installed"
+    from data.file_data_processor import _read_file
+    try:
+        df = _read_file(csv_path, schema)
+        write_arrow(arrow_path(csv_path), df)
+        return True, f"Converted {os.path.basename(csv_path)} ({len(df)} rows)"
+    except Exception as e:
+        return False, f"Error converting {csv_path}: {str(e)}"
+
+def convert_all():
+    # Convert every dashboard CSV snapshot that exists
+    from data.file_data_processor import DATASET_PATHS, DATASET_SCHEMAS
+    results = {}
+    for name, csv_path in DATASET_PATHS.items():
+        if os.path.exists(csv_path):
+            results[name] = convert_snapshot(csv_path, DATASET_SCHEMAS.get(name))
+    return results
+
+def _time(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+if __name__ == "__main__":
+    if not is_available():
+        print("pyarrow is not installed, dashboard snapshots stay CSV")
+        sys.exit(1)
+    from data.file_data_processor import DATASET_PATHS, DATASET_SCHEMAS, _read_file
+    for name, (success, message) in convert_all().items():
+        print(("OK: " if success else "FAILED: ") + message)
+        if success:
+            csv_path = DATASET_PATHS[name]
+            csv_ms = _time(lambda: _read_file(csv_path, DATASET_SCHEMAS.get(name)))
+            arrow_ms = _time(lambda: read_arrow(arrow_path(csv_path)))
+            print(f"    {name:<16} csv parse {csv_ms:7.2f}ms   arrow mmap {arrow_ms:7.2f}ms")
@@ -0,0 +1,118 @@
+# File contains the snapshot file watcher for the StockMarketApp project
+# Watches the data directory for new dashboard snapshot files (written by data_fetch.py or
+# data/ingest_pipeline.py) and publishes a version bump per dataset. On a bump only that dataset's
+# cached frame is dropped, and subscribers (e.g. dashboard sections) learn which dataset changed.
+# Uses inotify through the optional watchdog package, and falls back to polling the file stats.
+#
+# Usage: python data/snapshot_watcher.py   (prints version bumps as files change)
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import SNAPSHOT_POLL_SECONDS
+from data.file_data_processor import DATASET_PATHS, get_file_version, invalidate_dataset
+from data import snapshot_store
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+def _file_stamp(name):
+    # The CSV is the file writers replace; its columnar copy (written by the loader from that same
+    # CSV) only counts when there is no CSV, so a conversion does not look like a new snapshot
+    path = DATASET_PATHS[name]
+    return get_file_version(path) or get_file_version(snapshot_store.arrow_path(path))
+
+_versions = {name: 0 for name in DATASET_PATHS}  # dataset -> version counter, bumped on every change
+_file_versions = {name: _file_stamp(name) for name in DATASET_PATHS}  # last seen file stats
+_subscribers = []
+_lock = threading.Lock()
+
+def get_versions() -> dict:
+    # Return the current version counter of every dataset
+    with _lock:
+        return dict(_versions)
+
+def get_version(name) -> int:
+    # Return the current version counter of one dataset
+    with _lock:
+        return _versions[name]
+
+def subscribe(callback):
+    # Register callback(name, version), called from the watcher thread after a dataset changed
+    with _lock:
+        _subscribers.append(callback)
+
+def check_dataset(name):
+    # Bump the dataset version if its snapshot file changed since the last check; returns True on a bump
+    file_version = _file_stamp(name)
+    with _lock:
+        if file_version == _file_versions[name]:
+            return False
+        _file_versions[name] = file_version
+        _versions[name] += 1
+        version = _versions[name]
+        subscribers = list(_subscribers)
+    invalidate_dataset(name)
+    for callback in subscribers:
+        try:
+            callback(name, version)
+        except Exception as e:
+            print(f"Error in snapshot subscriber for {name}: {e}")
+    return True
+
+# Snapshot file (CSV or columnar copy) -> dataset name
+_PATH_TO_DATASET = {}
+for _name, _path in DATASET_PATHS.items():
+    _PATH_TO_DATASET[os.path.abspath(_path)] = _name
+    _PATH_TO_DATASET[os.path.abspath(snapshot_store.arrow_path(_path))] = _name
+
+class _SnapshotEventHandler(FileSystemEventHandler):
+    # Snapshots are replaced atomically (tmp file + rename), so look at both ends of a move
+    def on_any_event(self, event):
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            name = _PATH_TO_DATASET.get(os.path.abspath(path)) if path else None
+            if name:
+                check_dataset(name)
+
+def _poll_forever(interval_seconds):
+    while True:
+        for name in DATASET_PATHS:
+            check_dataset(name)
+        time.sleep(interval_seconds)
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def start_watcher(interval_seconds=None):
+    # Start watching the snapshot files (once per process); returns the observer or polling thread
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            directories = {os.path.dirname(os.path.abspath(path)) for path in DATASET_PATHS.values()}
+            if Observer is not None:
+                try:
+                    observer = Observer()
+                    observer.daemon = True
+                    for directory in directories:
+                        observer.schedule(_SnapshotEventHandler(), directory, recursive=False)
+                    observer.start()
+                    _watcher = observer
+                except Exception as e:
+                    print(f"inotify watcher unavailable ({e}), polling snapshot files instead")
+            if _watcher is None:
+                _watcher = threading.Thread(target=_poll_forever, args=(interval_seconds or SNAPSHOT_POLL_SECONDS,),
+                                            daemon=True, name="snapshot-watcher")
+                _watcher.start()
+    return _watcher
+
+if __name__ == "__main__":
+    subscribe(lambda name, version: print(f"{name}: version {version}"))
+    watcher = start_watcher()
+    print(f"Watching dashboard snapshots with {type(watcher).__name__}")
+    while True:
+        time.sleep(1)
@@ -0,0 +1,230 @@
+# File contains the offline symbol master for the StockMarketApp project
+# The symbol master is built once from the NSE index constituent lists (niftystocks / nsetools)
+# and saved to a local .csv file, so that symbol lookups never have to call a remote API.
+# Lookups are served from an in-memory sorted prefix index with a fuzzy fallback.
+
+# Documentation: NSE index constituents can be found at https://www.nseindia.com/products-services/indices-nifty500-index
+import bisect
+import difflib
+import io
+import os
+import sys
+import threading
+import pandas as pd
+import requests
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import SYMBOL_MASTER_INDICES, NIFTY500_CONSTITUENTS_URL
+
+SYMBOL_MASTER_CSV_PATH = os.path.join(os.path.dirname(__file__), "symbol_master.csv")
+SYMBOL_MASTER_COLUMNS = ['symbol', 'name', 'sector', 'isin']
+
+# Seed list used until the symbol master has been built (and as a fallback when NSE is unreachable)
+SEED_SYMBOLS = [
+    ("TCS", "Tata Consultancy Services", "Information Technology", "INE467B01029"),
+    ("RELIANCE", "Reliance Industries", "Oil Gas & Consumable Fuels", "INE002A01018"),
+    ("INFY", "Infosys", "Information Technology", "INE009A01021"),
+    ("HDFCBANK", "HDFC Bank", "Financial Services", "INE040A01034"),
+    ("ICICIBANK", "ICICI Bank", "Financial Services", "INE090A01021"),
+    ("HINDUNILVR", "Hindustan Unilever", "Fast Moving Consumer Goods", "INE030A01027"),
+    ("ITC", "ITC Limited", "Fast Moving Consumer Goods", "INE154A01025"),
+    ("SBIN", "State Bank of India", "Financial Services", "INE062A01020"),
+    ("BHARTIARTL", "Bharti Airtel", "Telecommunication", "INE397D01024"),
+    ("KOTAKBANK", "Kotak Mahindra Bank", "Financial Services", "INE237A01028"),
+    ("LT", "Larsen & Toubro", "Construction", "INE018A01030"),
+    ("AXISBANK", "Axis Bank", "Financial Services", "INE238A01034"),
+    ("WIPRO", "Wipro", "Information Technology", "INE075A01022"),
+    ("MARUTI", "Maruti Suzuki", "Automobile and Auto Components", "INE585B01010"),
+    ("TATAMOTORS", "Tata Motors", "Automobile and Auto Components", "INE155A01022"),
+    ("HCLTECH", "HCL Technologies", "Information Technology", "INE860A01027"),
+    ("SUNPHARMA", "Sun Pharmaceutical", "Healthcare", "INE044A01036"),
+    ("BAJFINANCE", "Bajaj Finance", "Financial Services", "INE296A01024"),
+    ("TITAN", "Titan Company", "Consumer Durables", "INE280A01028"),
+    ("ASIANPAINT", "Asian Paints", "Consumer Durables", "INE021A01026"),
+    ("BEL", "Bharat Electronics", "Capital Goods", "INE263A01024"),
+    ("ONGC", "Oil & Natural Gas Corporation", "Oil Gas & Consumable Fuels", "INE213A01029"),
+    ("NTPC", "NTPC", "Power", "INE733E01010")
+]
+
+# ================================================
+# BUILDING THE SYMBOL MASTER (network, run offline from the app)
+# ================================================
+
+def fetch_nifty500_constituents() -> pd.DataFrame:
+    # Download the Nifty 500 constituent list (company name, industry, symbol, ISIN) from NSE archives
+    response = requests.get(NIFTY500_CONSTITUENTS_URL, headers={'User-Agent': 'Mozilla/5.0'}, timeout=30)
+    response.raise_for_status()
+    df = pd.read_csv(io.StringIO(response.text))
+    df = df.rename(columns={'Symbol': 'symbol', 'Company Name': 'name', 'Industry': 'sector', 'ISIN Code': 'isin'})
+    return df[SYMBOL_MASTER_COLUMNS]
+
+def fetch_index_symbols() -> list:
+    # Collect symbols from ns.get_nifty500() and nse.get_stocks_in_index() for the configured indices
+    from niftystocks import ns
+    from nsetools import Nse
+    nse = Nse()
+    symbols = []
+    try:
+        symbols.extend(ns.get_nifty500())
+    except Exception as e:
+        print(f"Error fetching Nifty 500 symbols: {e}")
+    for index in SYMBOL_MASTER_INDICES:
+        try:
+            symbols.extend(nse.get_stocks_in_index(index=index))
+        except Exception as e:
+            print(f"Error fetching symbols for {index}: {e}")
+    # niftystocks returns Yahoo style tickers (e.g. 'TCS.NS')
+    return [str(symbol).upper().removesuffix('.NS') for symbol in symbols]
+
+def build_symbol_master(file_path=None) -> pd.DataFrame:
+    # Build the symbol master from the NSE lists and save it to a local .csv file
+    if file_path is None:
+        file_path = SYMBOL_MASTER_CSV_PATH
+    frames = [pd.DataFrame(SEED_SYMBOLS, columns=SYMBOL_MASTER_COLUMNS)]
+    try:
+        frames.append(fetch_nifty500_constituents())
+    except Exception as e:
+        print(f"Error fetching Nifty 500 constituents: {e}")
+    # Symbols without constituent metadata fall back to the symbol as name
+    index_symbols = pd.DataFrame({'symbol': fetch_index_symbols()})
+    index_symbols['name'] = index_symbols['symbol']
+    frames.append(index_symbols)
+
+    df = pd.concat(frames, ignore_index=True)
+    df['symbol'] = df['symbol'].astype(str).str.strip().str.upper()
+    # Later frames carry the official NSE metadata, so keep the last occurrence of each symbol
+    # but never let a bare symbol-only row overwrite a row that has a proper name
+    df['has_metadata'] = df['name'] != df['symbol']
+    df = df.sort_values('has_metadata', kind='stable').drop_duplicates('symbol', keep='last')
+    df = df[SYMBOL_MASTER_COLUMNS].sort_values('symbol').reset_index(drop=True)
+    df.to_csv(file_path, index=False)
+    print(f"Symbol master saved with {len(df)} symbols: {file_path}")
+    return df
+
+# ================================================
+# IN-MEMORY SEARCH INDEX
+# ================================================
+
+class SymbolIndex:
+    # Sorted prefix index over symbols and company name words, with a fuzzy fallback
+
+    def __init__(self, records):
+        self._records = {record['symbol']: record for record in records}
+        entries = []
+        for symbol, record in self._records.items():
+            # Rank 0 for symbol keys so that symbol matches sort ahead of name matches
+            entries.append((symbol, 0, symbol))
+            entries.append((record['name'].upper(), 1, symbol))
+            for word in record['name'].upper().split()[1:]:
+                entries.append((word, 2, symbol))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = entries
+        self._fuzzy_keys = {}
+        for key, _, symbol in entries:
+            self._fuzzy_keys.setdefault(key, symbol)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, symbol):
+        return symbol in self._records
+
+    def get(self, symbol):
+        # Return the symbol master record for a symbol (or None)
+        return self._records.get(symbol)
+
+    def symbols(self):
+        # Return all symbols in alphabetical order
+        return sorted(self._records)
+
+    def prefix_search(self, prefix, limit=10):
+        # Return records whose symbol or company name (word) starts with the prefix
+        prefix = prefix.strip().upper()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._keys, prefix)
+        matches = []
+        for key, rank, symbol in self._entries[start:]:
+            if not key.startswith(prefix):
+                break
+            matches.append((rank, len(key), symbol))
+        result = []
+        seen = set()
+        for _, _, symbol in sorted(matches):
+            if symbol not in seen:
+                seen.add(symbol)
+                result.append(self._records[symbol])
+                if len(result) == limit:
+                    break
+        return result
+
+    def fuzzy_search(self, query, limit=10, cutoff=0.6):
+        # Return records whose symbol or company name is close to the query (handles typos)
+        close = difflib.get_close_matches(query.strip().upper(), self._fuzzy_keys.keys(), n=limit * 3, cutoff=cutoff)
+        result = []
+        for key in close:
+            record = self._records[self._fuzzy_keys[key]]
+            if record not in result:
+                result.append(record)
+        return result[:limit]
+
+    def search(self, query, limit=10):
+        # Prefix matches first, topped up with fuzzy matches
+        result = self.prefix_search(query, limit)
+        if len(result) < limit:
+            for record in self.fuzzy_search(query, limit):
+                if record not in result:
+                    result.append(record)
+        return result[:limit]
+
+# ================================================
+# LOADING (process-wide, reloaded when the .csv changes)
+# ================================================
+
+_index_lock = threading.Lock()
+_index = None
+_index_mtime = None
+
+def load_symbol_master(file_path=None) -> pd.DataFrame:
+    # Read the symbol master .csv, falling back to the seed list if it has not been built yet
+    if file_path is None:
+        file_path = SYMBOL_MASTER_CSV_PATH
+    if os.path.exists(file_path):
+        try:
+            df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+            return df[SYMBOL_MASTER_COLUMNS]
+        except Exception as e:
+            print(f"Error reading symbol master {file_path}: {e}")
+    return pd.DataFrame(SEED_SYMBOLS, columns=SYMBOL_MASTER_COLUMNS)
+
+def get_symbol_index() -> SymbolIndex:
+    # Return the shared symbol index, rebuilding it only when the symbol master file changes
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(SYMBOL_MASTER_CSV_PATH)
+    except OSError:
+        mtime = None
+    if _index is not None and mtime == _index_mtime:
+        return _index
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            df = load_symbol_master()
+            _index = SymbolIndex(df.to_dict(orient='records'))
+            _index_mtime = mtime
+    return _index
+
+def is_valid_symbol(symbol: str) -> bool:
+    # Check whether a symbol exists in the symbol master
+    return symbol in get_symbol_index()
+
+def search_symbols(query: str, limit=10) -> list:
+    # Search the symbol master by symbol or company name prefix (with typo tolerance)
+    return get_symbol_index().search(query, limit)
+
+def get_symbol_list() -> list:
+    # Return the symbol master as a list of (symbol, name) tuples
+    index = get_symbol_index()
+    return [(symbol, index.get(symbol)['name']) for symbol in index.symbols()]
+
+if __name__ == "__main__":
+    build_symbol_master()
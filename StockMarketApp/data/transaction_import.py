@@ -0,0 +1,132 @@
+# File contains the bulk transaction import for the StockMarketApp project
+# Parses broker tradebook / contract-note CSV exports (Zerodha, Upstox, Groww, ICICI Direct style headers),
+# validates all rows at once against the symbol master, and books the valid rows with
+# portfolio_data_processor.add_transactions_bulk (one database transaction, multi-row INSERTs).
+#
+# Usage: python data/transaction_import.py tradebook.csv [portfolio_id]
+import os
+import re
+import sys
+import time
+from datetime import date
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.symbol_master import get_symbol_index
+from data.portfolio_data_processor import add_transactions_bulk, DEFAULT_PORTFOLIO_ID
+
+# Broker column names (lower case, letters only) for each transaction field
+COLUMN_ALIASES = {
+    'stock_symbol': ['symbol', 'tradingsymbol', 'stocksymbol', 'scripname', 'scrip', 'stock', 'ticker', 'instrument'],
+    'transaction_date': ['tradedate', 'date', 'transactiondate', 'orderexecutiontime', 'executiondate', 'tradedatetime'],
+    'transaction_type': ['tradetype', 'buysell', 'transactiontype', 'side', 'action', 'type'],
+    'quantity': ['quantity', 'qty', 'tradedquantity', 'filledquantity'],
+    'unit_price': ['price', 'tradeprice', 'unitprice', 'rate', 'netrate', 'averageprice', 'avgprice', 'tradedprice']
+}
+
+# Broker buy/sell markers -> transaction type
+TYPE_ALIASES = {'BUY': 'BUY', 'B': 'BUY', 'PURCHASE': 'BUY', 'SELL': 'SELL', 'S': 'SELL', 'SALE': 'SELL'}
+
+IMPORT_COLUMNS = ['row', 'stock_symbol', 'transaction_date', 'transaction_type', 'quantity', 'unit_price']
+
+def _normalize_header(name):
+    return re.sub('[^a-z]', '', str(name).lower())
+
+def parse_contract_note(source):
+    # Read a broker CSV (path or file-like object) into the standard import columns
+    # Returns (True, DataFrame) or (False, message)
+    try:
+        raw = pd.read_csv(source, dtype=str, skipinitialspace=True)
+    except Exception as e:
+        return False, f"Error reading CSV: {str(e)}"
+
+    headers = {_normalize_header(column): column for column in raw.columns}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        column = next((headers[alias] for alias in aliases if alias in headers), None)
+        if column is not None:
+            mapping[field] = column
+    missing = [field for field in COLUMN_ALIASES if field not in mapping]
+    if missing:
+        return False, f"Missing columns: {', '.join(missing)} (found: {', '.join(map(str, raw.columns))})"
+
+    df = pd.DataFrame({field: raw[column] for field, column in mapping.items()})
+    df.insert(0, 'row', np.arange(len(df)) + 2)  # Line number in the file (line 1 is the header)
+    # NSE:TCS, TCS-EQ and tcs all mean TCS
+    df['stock_symbol'] = (df['stock_symbol'].fillna('').str.upper().str.strip()
+                          .str.replace(r'^(NSE|BSE):', '', regex=True)
+                          .str.replace(r'-(EQ|BE|BZ)$', '', regex=True))
+    df['transaction_type'] = df['transaction_type'].fillna('').str.upper().str.strip().map(TYPE_ALIASES)
+    df['quantity'] = pd.to_numeric(df['quantity'].str.replace(',', '', regex=False), errors='coerce')
+    df['unit_price'] = pd.to_numeric(df['unit_price'].str.replace(',', '', regex=False), errors='coerce')
+    # ISO dates first, then day-first dates (31-01-2024, 31/01/2024) for the rest
+    dates = pd.to_datetime(df['transaction_date'], format='ISO8601', errors='coerce')
+    retry = dates.isna() & df['transaction_date'].notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(df.loc[retry, 'transaction_date'], dayfirst=True, format='mixed', errors='coerce')
+    df['transaction_date'] = dates.dt.date
+    return True, df[IMPORT_COLUMNS]
+
+def validate_import(df):
+    # Validate all rows at once; returns (valid rows, rejects DataFrame with row, stock_symbol and reason)
+    index = get_symbol_index()
+    checks = [
+        (~df['stock_symbol'].isin(index.symbols()), "Unknown stock symbol"),
+        (df['transaction_type'].isna(), "Buy/sell type not recognized"),
+        (df['transaction_date'].isna(), "Invalid trade date"),
+        (df['transaction_date'].notna() & (df['transaction_date'] > date.today()), "Trade date is in the future"),
+        (~(df['quantity'] > 0) | (df['quantity'] % 1 != 0), "Quantity must be a whole number greater than 0"),
+        (~(df['unit_price'] > 0), "Unit price must be greater than 0")
+    ]
+    reasons = pd.Series('', index=df.index)
+    for failed, reason in checks:
+        reasons = reasons.where(~failed, reasons + np.where(reasons == '', '', '; ') + reason)
+    rejected = reasons != ''
+    rejects = df.loc[rejected, ['row', 'stock_symbol']].assign(reason=reasons[rejected])
+    valid = df.loc[~rejected].copy()
+    valid['quantity'] = valid['quantity'].astype(int)
+    valid['stock_name'] = valid['stock_symbol'].map(lambda symbol: index.get(symbol)['name'])
+    return valid, rejects
+
+def import_transactions(source, portfolio_id=DEFAULT_PORTFOLIO_ID):
+    # Parse, validate and book a broker CSV into a portfolio; returns (True, report) or (False, message)
+    # report: rows, imported, rejected, seconds, rows_per_second, a rejects DataFrame (row, stock_symbol, reason)
+    # and the portfolio's transactions version after the import
+    start = time.perf_counter()
+    success, df = parse_contract_note(source)
+    if not success:
+        return False, df
+    valid, rejects = validate_import(df)
+
+    success, result = add_transactions_bulk(valid.to_dict('records'), portfolio_id)
+    if not success:
+        return False, result
+    if result['rejects']:
+        symbols = dict(zip(valid['row'], valid['stock_symbol']))
+        booking_rejects = pd.DataFrame([(row, symbols[row], reason) for row, reason in result['rejects']],
+                                       columns=['row', 'stock_symbol', 'reason'])
+        rejects = pd.concat([rejects, booking_rejects], ignore_index=True)
+
+    seconds = time.perf_counter() - start
+    return True, {
+        'rows': len(df),
+        'imported': result['imported'],
+        'rejected': len(rejects),
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(len(df) / seconds, 1) if seconds > 0 else 0.0,
+        'rejects': rejects.sort_values('row').reset_index(drop=True),
+        'version': result['version']  # Transactions version after the import (None when nothing was written)
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python data/transaction_import.py <broker csv> [portfolio_id]")
+        sys.exit(1)
+    success, report = import_transactions(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_PORTFOLIO_ID)
+    if not success:
+        print(f"FAILED: {report}")
+        sys.exit(1)
+    print(f"Imported {report['imported']} of {report['rows']} rows in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/sec), {report['rejected']} rejected")
+    for reject in report['rejects'].itertuples(index=False):
+        print(f"  line {reject.row} {reject.stock_symbol}: {reject.reason}")
@@ -4,83 +4,61 @@ import streamlit as st
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data.database import read_data, read_specific_data, read_nifty_indexes_data, read_nifty_stocks_quotes # Importing read_data function from data package
-from data.file_data_processor import read_csv_to_dataframe, read_top_gainers_csv_to_dataframe, read_top_losers_csv_to_dataframe, read_index_valuation_csv_to_dataframe
+from data.database import read_data, read_specific_data # Importing read_data function from data package
+from data.dashboard_snapshot import load_dashboard_snapshot, DISPLAY_FORMATS
+from data.quota_manager import render_budget_sidebar
+from data.snapshot_watcher import start_watcher, get_version, get_versions
+from config.settings import SNAPSHOT_REFRESH_SECONDS
+from utils.ticker import ticker_css, price_ticker, cached_ticker
 # Set page configuration
 st.set_page_config(page_title="Dashboard", layout="wide", page_icon="📊")
 
+# Remaining API budget (shared by all workers and ingestion scripts)
+render_budget_sidebar()
+
+# Snapshot files are watched once per server process; each snapshot section below is a fragment,
+# so paging through a table re-renders only that section (not the whole page)
+@st.cache_resource
+def start_snapshot_watcher():
+    return start_watcher()
+
+start_snapshot_watcher()
+
+@st.fragment(run_every=SNAPSHOT_REFRESH_SECONDS)
+def watch_snapshot_versions():
+    # The only timed run: compares the watcher's version counters and draws nothing, so the page
+    # (tickers, styled tables) is rebuilt only after the watcher saw a new snapshot file
+    versions = get_versions()
+    if st.session_state.setdefault('watched_versions', versions) != versions:
+        st.session_state.watched_versions = versions
+        st.rerun()
+
+watch_snapshot_versions()
+
+def snapshot_changed(name):
+    # True when the watcher published a new version of the dataset since this session last rendered it
+    version = get_version(name)
+    key = f"snapshot_version_{name}"
+    changed = st.session_state.get(key, version) != version
+    st.session_state[key] = version
+    return changed
+
+# All display frames come pre-filtered, pre-sorted and renamed from the dashboard snapshot
+# (materialized at ingest time), so each rerun or fragment run only loads it and slices what it shows
+def get_dashboard_snapshot():
+    return load_dashboard_snapshot()
+
 st.title("Stock Market Dashboard")
+# Shared ticker stylesheet (assets/css/custom.css), added once for both tickers
+st.markdown(ticker_css(), unsafe_allow_html=True)
 st.subheader("Nifty Indexes")
 
-@st.cache_data
-def get_nifty_indexes_data():
-    return read_nifty_indexes_data()
 #  Nifty Index Tickers
-df = get_nifty_indexes_data()
-
-# HTML+CSS to create a ticker with scrolling effect
-ticker_html = '''
-<style>
-.ticker-wrap {
-  width: 100%;
-  overflow: hidden;
-  background-color: #f9f9f9;
-  border: 1px solid #ddd;
-  white-space: nowrap;
-  box-sizing: border-box;
-  padding: 10px 0;
-}
-
-.ticker-move {
-  display: inline-block;
-  padding-left: 100%;
-  animation: ticker 200s linear infinite;
-}
-
-.ticker-item {
-  display: inline-block;
-  padding: 0 40px;
-  font-size: 16px;
-  color: #333;
-  border-right: 1px solid #ccc;
-}
-
-.ticker-item:last-child {
-  border-right: none;
-}
-
-.positive {
-  color: #00C853;
-  font-weight: bold;
-}
-
-.negative {
-  color: #D32F2F;
-  font-weight: bold;
-}
-
-@keyframes ticker {
-  0% { transform: translate3d(0, 0, 0); }
-  100% { transform: translate3d(-100%, 0, 0); }
-}
-</style>
-
-<div class="ticker-wrap">
-  <div class="ticker-move">
-'''
-
-# Add each Nifty index as a tile
-for _, row in df.iterrows():
-    # Determine the color class based on percentage change
-    percentage = float(row.percentage_change)
-    color_class = 'positive' if percentage >= 0 else 'negative'
-    tile_content = f'<div class="ticker-item"><strong>{row.index_name}</strong> {row.last_price}  <span class="{color_class}">{row.percentage_change}%</span></div>'
-    ticker_html += tile_content
-
-ticker_html += '''
-  </div>
-</div>
-'''
+# Tickers are re-rendered only when a new dashboard snapshot version arrives
+snapshot = get_dashboard_snapshot()
+df = snapshot['indexes']
+ticker_html = cached_ticker('nifty_indexes', snapshot['version'],
+                            lambda: price_ticker(df['index_name'], df['last_price'], df['percentage_change'], seconds_per_tile=1.5) if not df.empty else '')
 
 # Render the ticker in Streamlit page
 st.markdown(ticker_html, unsafe_allow_html=True)
@@ -88,357 +66,166 @@ st.divider()
 
 st.subheader("Nifty Stocks Ticker")
 #  Stock tricker scroller
-@st.cache_data
-def get_nifty_stocks_quotes():
-    return read_nifty_stocks_quotes()
-
-nifty_stocks_df = get_nifty_stocks_quotes()
-
-ticker_html_stocks = '''
-<style>
-.ticker-wrap {
-  width: 100%;
-  overflow: hidden;
-  background-color: #f9f9f9;
-  border: 1px solid #ddd;
-  white-space: nowrap;
-  box-sizing: border-box;
-  padding: 10px 0;
-}
-
-.ticker-move {
-  display: inline-block;
-  padding-left: 100%;
-  animation: ticker 100s linear infinite;
-}
-
-.ticker-item {
-  display: inline-block;
-  padding: 0 40px;
-  font-size: 16px;
-  color: #333;
-  border-right: 1px solid #ccc;
-}
-
-.ticker-item:last-child {
-  border-right: none;
-}
-
-.positive {
-  color: #00C853;
-  font-weight: bold;
-}
-
-.negative {
-  color: #D32F2F;
-  font-weight: bold;
-}
-
-@keyframes ticker {
-  0% { transform: translate3d(0, 0, 0); }
-  100% { transform: translate3d(-100%, 0, 0); }
-}
-</style>
-
-<div class="ticker-wrap">
-  <div class="ticker-move">
-'''
-
-# Add each Nifty stock as a tile
-for _, row in nifty_stocks_df.iterrows():
-    # Determine the color class based on percentage change
-    percentage = float(row.p_change)
-    color_class = 'positive' if percentage >= 0 else 'negative'
-    tile_content = f'<div class="ticker-item"><strong>{row.symbol}</strong> {row.last_price}  <span class="{color_class}">{row.p_change}%</span></div>'
-    ticker_html_stocks += tile_content
-
-ticker_html_stocks += '''
-  </div>
-</div>
-'''
+nifty_stocks_df = snapshot['stocks']
+ticker_html_stocks = cached_ticker('nifty_stocks', snapshot['version'],
+                                   lambda: price_ticker(nifty_stocks_df['symbol'], nifty_stocks_df['last_price'], nifty_stocks_df['p_change']) if not nifty_stocks_df.empty else '')
 
 # Render the ticker in Streamlit page
 st.markdown(ticker_html_stocks, unsafe_allow_html=True)
 st.divider()
 
 #  Nifty Advance Decline Data
-# Fetch Nifty Advance Decline data for dashboard page
-st.subheader("Nifty Advance Decline Data")
-@st.cache_data
-def get_nifty_advance_decline_data():
-    return read_csv_to_dataframe()
-
-adv_decl_df = get_nifty_advance_decline_data()
-# st.dataframe(adv_decl_df, hide_index=True) # Show only selected columns and format the date column
-
-col1, col2 = st.columns([2,1])
-with col1:
-    # Dropdown filter
-    filter_option = st.selectbox(
-        "Select Filter:",
-        ["Advances", "Declines"],
-        key="advance_decline_filter"
-    )
-with col2:
-    # Records per page (default 5)
-    records_per_page = st.number_input(
-        "Records per page:",
-        min_value=5,
-        max_value=10,
-        value=5,
-        step=5
+def style_change(page_df, color):
+    # Format and colour only the rows on screen (a page or a short list), so styling cost stays constant
+    return page_df.style.set_properties(subset=['Change %'], **{'color': color, 'font-weight': 'bold'}).format(
+        {column: fmt for column, fmt in DISPLAY_FORMATS.items() if column in page_df.columns}
     )
-# Filter data based on selection
-if filter_option == "Advances":
-    filtered_df = adv_decl_df[adv_decl_df['pChange'] > 0].copy()
-    st.success(f"Showing {len(filtered_df)} stocks with positive changes")
-else:  # Declines
-    filtered_df = adv_decl_df[adv_decl_df['pChange'] < 0].copy()
-    st.error(f"Showing {len(filtered_df)} stocks with negative changes")
-
-# Sort by pChange in descending order for Advances, ascending for Declines
-if filter_option == "Advances":
-    filtered_df = filtered_df.sort_values('pChange', ascending=False)
-else:
-    filtered_df = filtered_df.sort_values('pChange', ascending=True)
-
-# Select specific columns to display
-display_columns = [
-    'symbol',
-    'lastPrice',
-    'change',
-    'pChange',
-    'totalTradedVolume'
-]
-
-# Filter to only display selected columns
-display_df = filtered_df[display_columns].copy()
-
-# Rename columns for better display
-display_df.columns = [
-    'Symbol',
-    'Last Price',
-    'Change',
-    'Change %',
-    'Volume'
-]
-
-# Calculate total pages
-total_records = len(display_df)
-total_pages = (total_records - 1) // records_per_page + 1 if total_records > 0 else 0
-
-# Initialize session state for page number
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 1
-
-# Reset to page 1 if filter changes
-if 'last_filter' not in st.session_state:
-    st.session_state.last_filter = filter_option
-elif st.session_state.last_filter != filter_option:
-    st.session_state.current_page = 1
-    st.session_state.last_filter = filter_option
-
-# Pagination controls
-if total_records > 0:
-    col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
-    
+
+@st.fragment
+def show_advance_decline():
+    if snapshot_changed('advance_decline'):
+        st.toast("Advance decline data updated")
+        st.session_state.current_page = 1  # The new snapshot may have fewer pages
+    st.subheader("Nifty Advance Decline Data")
+
+    col1, col2 = st.columns([2,1])
     with col1:
-        if st.button("⏮️ First", disabled=(st.session_state.current_page == 1)):
-            st.session_state.current_page = 1
-            st.rerun()
-    
+        # Dropdown filter
+        filter_option = st.selectbox(
+            "Select Filter:",
+            ["Advances", "Declines"],
+            key="advance_decline_filter"
+        )
     with col2:
-        if st.button("◀️ Previous", disabled=(st.session_state.current_page == 1)):
-            st.session_state.current_page -= 1
-            st.rerun()
+        # Records per page (default 5)
+        records_per_page = st.number_input(
+            "Records per page:",
+            min_value=5,
+            max_value=10,
+            value=5,
+            step=5
+        )
+    # Advances come sorted by pChange descending, declines ascending
+    if filter_option == "Advances":
+        display_df = get_dashboard_snapshot()['advances']
+        st.success(f"Showing {len(display_df)} stocks with positive changes")
+    else:  # Declines
+        display_df = get_dashboard_snapshot()['declines']
+        st.error(f"Showing {len(display_df)} stocks with negative changes")
+
+    # Calculate total pages
+    total_records = len(display_df)
+    total_pages = (total_records - 1) // records_per_page + 1 if total_records > 0 else 0
+
+    # Initialize session state for page number
+    if 'current_page' not in st.session_state:
+        st.session_state.current_page = 1
+
+    # Reset to page 1 if filter changes
+    if 'last_filter' not in st.session_state:
+        st.session_state.last_filter = filter_option
+    elif st.session_state.last_filter != filter_option:
+        st.session_state.current_page = 1
+        st.session_state.last_filter = filter_option
+
+    # Pagination controls
+    if total_records > 0:
+        col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
     
-    with col3:
-        st.markdown(f"<center>Page {st.session_state.current_page} of {total_pages}</center>", 
-                   unsafe_allow_html=True)
+        with col1:
+            if st.button("⏮️ First", disabled=(st.session_state.current_page == 1)):
+                st.session_state.current_page = 1
+                st.rerun(scope="fragment")
     
-    with col4:
-        if st.button("Next ▶️", disabled=(st.session_state.current_page == total_pages)):
-            st.session_state.current_page += 1
-            st.rerun()
+        with col2:
+            if st.button("◀️ Previous", disabled=(st.session_state.current_page == 1)):
+                st.session_state.current_page -= 1
+                st.rerun(scope="fragment")
     
-    with col5:
-        if st.button("Last ⏭️", disabled=(st.session_state.current_page == total_pages)):
-            st.session_state.current_page = total_pages
-            st.rerun()
-
-    # Calculate start and end indices for current page
-    start_idx = (st.session_state.current_page - 1) * records_per_page
-    end_idx = min(start_idx + records_per_page, total_records)
+        with col3:
+            st.markdown(f"<center>Page {st.session_state.current_page} of {total_pages}</center>", 
+                       unsafe_allow_html=True)
     
-    # Get current page data
-    # page_df = display_df.iloc[start_idx:end_idx].reset_index(drop=True)
-    page_df = display_df.iloc[start_idx:end_idx].copy()
-    # Reset index to start from 1 instead of 0
-    page_df.index = range(start_idx + 1, end_idx + 1)
-
-
-    # Apply color styling to the dataframe
-    def color_percentage(val):
-        if isinstance(val, (int, float)):
-            color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-            return f'color: {color}; font-weight: bold'
-        return ''
+        with col4:
+            if st.button("Next ▶️", disabled=(st.session_state.current_page == total_pages)):
+                st.session_state.current_page += 1
+                st.rerun(scope="fragment")
     
-    # Style the dataframe
-    styled_df = page_df.style.applymap(
-        color_percentage,
-        subset=['Change %']
-    ).format({
-        'Last Price': '₹{:.2f}',
-        'Change': '{:.2f}',
-        'Change %': '{:.2f}%',
-        'Volume': '{:,.0f}'
-    })
-
-    # Display the styled dataframe
-    st.dataframe(
-        styled_df,
-        use_container_width=True,
-        # height=400
-    )
+        with col5:
+            if st.button("Last ⏭️", disabled=(st.session_state.current_page == total_pages)):
+                st.session_state.current_page = total_pages
+                st.rerun(scope="fragment")
+
+        # Calculate start and end indices for current page
+        start_idx = (st.session_state.current_page - 1) * records_per_page
+        end_idx = min(start_idx + records_per_page, total_records)
+    
+        # Current page of the snapshot frame (already numbered from 1)
+        page_df = display_df.iloc[start_idx:end_idx]
+
+        # Display the styled page
+        st.dataframe(
+            style_change(page_df, 'green' if filter_option == "Advances" else 'red'),
+            use_container_width=True,
+            # height=400
+        )
 
-    # Show record range
-    st.caption(f"Showing records {start_idx + 1} to {end_idx} of {total_records}")
+        # Show record range
+        st.caption(f"Showing records {start_idx + 1} to {end_idx} of {total_records}")
 
-else:
-    st.warning("No records found for the selected filter.")
-    st.session_state.current_page = 1  # Reset to page 1 if no records found
+    else:
+        st.warning("No records found for the selected filter.")
+        st.session_state.current_page = 1  # Reset to page 1 if no records found
+
+show_advance_decline()
 
 st.divider()
 
 #  Top Gainers and Losers
-st.subheader("Nifty Top Gainers and Losers")
-@st.cache_data
-def get_nifty_top_gainers_data():
-    return read_top_gainers_csv_to_dataframe()
-
-@st.cache_data
-def get_nifty_top_losers_data():
-    return read_top_losers_csv_to_dataframe()
-
-nifty_top_gainers_df = get_nifty_top_gainers_data()
-nifty_top_losers_df = get_nifty_top_losers_data()
-
-display_columns_gainers = [
-    'symbol',
-    'lastPrice',
-    'change',
-    'pChange'
-]
-
-display_columns_losers = [
-    'symbol',
-    'lastPrice',
-    'change',
-    'pChange'
-]
-
-nifty_top_gainers_df = nifty_top_gainers_df[display_columns_gainers]
-nifty_top_losers_df = nifty_top_losers_df[display_columns_losers]
-
-nifty_top_gainers_df.columns = [
-    'Symbol',
-    'Last Price',
-    'Change',
-    'Change %'
-]
-nifty_top_losers_df.columns = [
-    'Symbol',
-    'Last Price',
-    'Change',
-    'Change %'
-]
-nifty_top_gainers_df.index = range(1, len(nifty_top_gainers_df) + 1)
-nifty_top_losers_df.index = range(1, len(nifty_top_losers_df) + 1)
-
-# Style function for gainers (green color)
-def style_gainers(val):
-    if isinstance(val, (int, float)):
-        return 'color: green; font-weight: bold'
-    return ''
-
-
-# Style function for losers (red color)
-def style_losers(val):
-    if isinstance(val, (int, float)):
-        return 'color: red; font-weight: bold'
-    return ''
-
-# Apply styling to gainers dataframe
-styled_gainers_df = nifty_top_gainers_df.style.applymap(
-    style_gainers,
-    subset=['Change %']
-).format({
-    'Last Price': '₹{:.2f}',
-    'Change': '{:.2f}',
-    'Change %': '{:.2f}%'
-})
-
-# Apply styling to losers dataframe
-styled_losers_df = nifty_top_losers_df.style.applymap(
-    style_losers,
-    subset=['Change %']
-).format({
-    'Last Price': '₹{:.2f}',
-    'Change': '{:.2f}',
-    'Change %': '{:.2f}%'
-})
-
-# nifty_top_gainers_df['Change %'] = nifty_top_gainers_df['Change %'].apply(lambda x: f"{x}%")
-# nifty_top_losers_df['Change %'] = nifty_top_losers_df['Change %'].apply(lambda x: f"{x}%")
-
-col1, col2 = st.columns(2)
-with col1:
-    st.markdown("### Top Gainers")
-    st.dataframe(
-        styled_gainers_df,
-        # nifty_top_gainers_df,
-        use_container_width=True,
-        # height=400
-    )
-with col2:
-    st.markdown("### Top Losers")
+@st.fragment
+def show_top_gainers_losers():
+    if any([snapshot_changed('top_gainers'), snapshot_changed('top_losers')]):
+        st.toast("Top gainers and losers updated")
+    st.subheader("Nifty Top Gainers and Losers")
+    snapshot = get_dashboard_snapshot()
+    styled_gainers_df = style_change(snapshot['top_gainers'], 'green')
+    styled_losers_df = style_change(snapshot['top_losers'], 'red')
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Top Gainers")
+        st.dataframe(
+            styled_gainers_df,
+            # nifty_top_gainers_df,
+            use_container_width=True,
+            # height=400
+        )
+    with col2:
+        st.markdown("### Top Losers")
+        st.dataframe(
+            styled_losers_df,
+            # nifty_top_losers_df,
+            use_container_width=True,
+            # height=400
+        )
+
+show_top_gainers_losers()
+st.divider()
+
+#  Nifty Index Valuation
+@st.fragment
+def show_index_valuation():
+    if snapshot_changed('index_valuation'):
+        st.toast("Index valuation data updated")
+    st.subheader("Nifty Index Valuation Levels")   
+    nifty_index_valuation_df = get_dashboard_snapshot()['index_valuation']
     st.dataframe(
-        styled_losers_df,
-        # nifty_top_losers_df,
+        nifty_index_valuation_df,
         use_container_width=True,
         # height=400
     )
-st.divider()
 
-#  Nifty Index Valuation
-st.subheader("Nifty Index Valuation Levels")   
-@st.cache_data
-def get_nifty_index_valuation_data():
-    return read_index_valuation_csv_to_dataframe()
-
-nifty_index_valuation_df = get_nifty_index_valuation_data()
-# st.dataframe(nifty_index_valuation_df, hide_index=True) # Show only selected columns and format the date column
-# Select specific columns to display
-valuation_display_columns = [
-    'index',
-    'pe',
-    'pb',
-    'dy'
-]
-nifty_index_valuation_df = nifty_index_valuation_df[valuation_display_columns]
-nifty_index_valuation_df.columns = [
-    'Index',
-    'P/E Ratio',
-    'P/B Ratio',
-    'Dividend Yield (%)'    
-]
-nifty_index_valuation_df.index = range(1, len(nifty_index_valuation_df) + 1)
-st.dataframe(
-    nifty_index_valuation_df,
-    use_container_width=True,
-    # height=400
-)
+show_index_valuation()
 st.divider()
 
 #  Heatmap of Stock Performance
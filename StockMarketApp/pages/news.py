@@ -7,7 +7,9 @@ import base64
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data.api_client import fetch_market_news, fetch_global_market_news # Importing read_data function from data package
+from data.news_store import init_news_tables, ingest_news, start_background_ingester, read_latest_news, read_news_page # Importing news store functions from data package
+from data.quota_manager import render_budget_sidebar
+from utils.ticker import ticker_css, news_ticker, cached_ticker
 # Replace missing or invalid image URLs with the default image 
 local_image_path = os.path.join(os.path.dirname(__file__),"..","assets","images","stock_market_image.jpg") # Local path to # Encode image as base64 string
 with open(local_image_path, "rb") as image_file: 
@@ -17,6 +19,9 @@ image_data_uri = f"data:image/jpeg;base64,{encoded_string}"
 # Set page configuration
 st.set_page_config(page_title="News", layout="centered", page_icon="📰")
 
+# Remaining API budget (shared by all workers and ingestion scripts)
+render_budget_sidebar()
+
 st.subheader("Secondary Page: News and Research Page")
 st.write("This is the secondary page of the StockMarketApp app. More content can be added here.")
 
@@ -29,7 +34,20 @@ st.write("This is the secondary page of the StockMarketApp app. More content can
 
 # st.divider()
 
-df = fetch_market_news(3) # Fetch 3 latest market news articles 
+# Start the background news ingester once per server process
+@st.cache_resource
+def start_news_ingester():
+    init_news_tables()
+    return start_background_ingester()
+
+start_news_ingester()
+
+df = read_latest_news(3) # Read 3 latest market news articles from the local news store
+if df.empty:
+    # First run: fill the store once before rendering
+    with st.spinner("Fetching latest news..."):
+        ingest_news()
+    df = read_latest_news(3)
 # Show only selected columns and format the date column 
 selected_df = df[['title', 'source', 'published_at', 'image_url']].copy()
 # Rename the column
@@ -42,102 +60,26 @@ selected_df['Date'] = pd.to_datetime(selected_df['Date']).dt.strftime('%d-%m-%Y'
 
 st.divider()
 
-# HTML+CSS to create a ticker with scrolling effect
-ticker_html = '''
-<style>
-.ticker-wrap {
-  width: 100%;
-  overflow: hidden;
-  background-color: black; /* Dark grey background */
-  border: 0px solid #ddd;
-  white-space: nowrap;
-  box-sizing: border-box;
-  padding: 10px 0;
-}
-.ticker-move {
-  display: inline-block;
-  padding-left: 100%;
-  animation: ticker 20s linear infinite;
-}
-.ticker-item {
-  display: inline-block;
-  width: auto;
-  height: 350px; /* Fixed height for each tile */ 
-  padding: 15px 30px;
-  font-size: 16px;
-  color: #333;
-  background-color: #add8e6; /* Light blue background */ 
-  border: 1px solid #ccc;
-  border-radius: 8px;
-  box-shadow: 2px 2px 6px rgba(0,0,0,0.1);
-  margin-right: 20px;  /* Space between cards */
-  vertical-align: top;
-  white-space: normal;  /* Allow multiline content */
-  width: 220px;
-  box-sizing: border-box;
-}
-.ticker-item:last-child {
-  margin-right: 0;
-}
-.ticker-item img {
-  max-width: 100%;
-  height: 100px; /* Adjust the height of thumbnails as needed */
-  object-fit: cover;
-  border-radius: 8px;
-  margin-bottom: 10px;
-}
-.ticker-item strong {
-  display: block;
-  margin-bottom: 8px;
-  font-size: 18px;
-}
-.ticker-item .source,
-.ticker-item .date {
-  display: block;
-  margin-bottom: 4px;
-  font-size: 14px;
-  color: #666;
-}
-@keyframes ticker {
-  0% { transform: translate3d(0, 0, 0); }
-  100% { transform: translate3d(-100%, 0, 0); }
-}
-</style>
-<div class="ticker-wrap">
-  <div class="ticker-move">
-'''
-
-# Add each news piece as a tile
-for _, row in selected_df.iterrows():
-    tile_content = f'''
-    <div class="ticker-item">
-      <img src="{row.Image}" alt="News Image" onerror="this.style.display='none', this.onerror=null, this.src='{image_data_uri}'"/> <!-- Hide image if not available -->
-      <strong>{row.Title}</strong>
-      <span class="source">Source: {row.Source}</span>
-      <span class="date">Date: {row.Date}</span>
-    </div>
-    ''' 
-    ticker_html += tile_content
-
-ticker_html += '''
-  </div>
-</div>
-'''
+# Ticker of the latest articles, re-rendered only when they change (the iframe needs its own copy of the stylesheet)
+ticker_html = ticker_css() + cached_ticker('news', tuple(df['url']), lambda: news_ticker(
+    selected_df['Title'], selected_df['Source'], selected_df['Date'], selected_df['Image'], image_data_uri))
 
 # Display the ticker
 # st.markdown(ticker_html, unsafe_allow_html=True)
 components.html(ticker_html, height=400, scrolling=False)
 st.divider()
 
-st.subheader("Global Market News from Alpha Vantage API")
-df2 = fetch_global_market_news() # Fetch global market news articles
-# st.dataframe(df2, hide_index=True) # Show only selected columns and format the date column
+st.subheader("Global Market News")
 # Pagination Settings
 items_per_page = 10
-num_pages = (len(df2) - 1) // items_per_page + 1
 # Initialize session state page number
 if 'page_number' not in st.session_state:
     st.session_state.page_number = 0
+# Read only the current page of articles from the local news store
+page_df, total_articles = read_news_page(st.session_state.page_number, items_per_page)
+num_pages = max((total_articles - 1) // items_per_page + 1, 1)
+df2 = page_df.rename(columns={'title': 'Title', 'summary': 'Summary', 'source': 'Source', 'published_at': 'Date', 'url': 'URL'})
+df2['Date'] = pd.to_datetime(df2['Date']).dt.strftime('%d-%m-%Y %H:%M')
 # Function to display news tile
 def display_tile(row):
     st.markdown(f"##### {row['Title']}")
@@ -146,17 +88,15 @@ def display_tile(row):
     st.markdown(f"**Published:** {row['Date']}")
     st.markdown(f"**Read more...** {row['URL']}")
     st.markdown("---")
-# Calculate start and end indices for current page
-start_idx = st.session_state.page_number * items_per_page
-end_idx = min(start_idx + items_per_page, len(df2))
 # Display current page tiles vertically
-for idx in range(start_idx, end_idx):
+for idx in range(len(df2)):
     display_tile(df2.iloc[idx])
 # Navigation buttons
 col1, col2, col3 = st.columns([1, 2, 1])
 with col1:
     if st.button("Previous") and st.session_state.page_number > 0:
         st.session_state.page_number -= 1
+        st.rerun()
 
 with col2:
     st.markdown(f"**Page {st.session_state.page_number + 1} of {num_pages}**")
@@ -164,6 +104,7 @@ with col2:
 with col3:
     if st.button("Next") and st.session_state.page_number < num_pages - 1:
         st.session_state.page_number += 1
+        st.rerun()
 
 st.success("Global market news displayed successfully!")
 st.divider() 
\ No newline at end of file
@@ -3,14 +3,20 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import date 
-import time
+from datetime import date, timedelta
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import data.portfolio_data_processor as backend
-# Force disable all caching temporarily for testing
-st.cache_data.clear()
+from data.transaction_import import import_transactions
+from data.portfolio_nav import get_portfolio_nav, init_nav_tables
+from data.portfolio_risk import get_portfolio_risk
+from data.portfolio_simulation import get_portfolio_simulation, SIMULATION_METHODS
+from data.portfolio_ledger import get_holdings_as_of
+from data.portfolio_attribution import get_portfolio_attribution, init_attribution_tables
+from data import event_bus
+from config.settings import TRANSACTION_PAGE_SIZE, ATTRIBUTION_BENCHMARKS
+import plotly.graph_objects as go
 # Set page configuration
 st.set_page_config(page_title="Portfolio", layout="wide", page_icon="💼")
 
@@ -30,6 +36,21 @@ if 'refresh_data' not in st.session_state:
 if 'show_delete_section' not in st.session_state:
     st.session_state.show_delete_section = False
 
+if 'transaction_cursors' not in st.session_state:
+    st.session_state.transaction_cursors = {}  # Per portfolio: cursors of the transaction pages visited, the last one is shown
+
+if 'simulation_request' not in st.session_state:
+    st.session_state.simulation_request = None  # (portfolio_id, horizon_days, method) of the last simulation run
+
+if 'portfolio_id' not in st.session_state:
+    st.session_state.portfolio_id = backend.DEFAULT_PORTFOLIO_ID
+
+if 'data_versions' not in st.session_state:
+    st.session_state.data_versions = {}  # Event topic -> version returned by this session's last write to it
+
+if 'flash_message' not in st.session_state:
+    st.session_state.flash_message = None  # Success message shown once after the rerun that follows a write
+
 if 'db_initialized' not in st.session_state:
     with st.spinner("Initializing database..."):
         success, message = backend.init_database()
@@ -37,6 +58,8 @@ if 'db_initialized' not in st.session_state:
         if success:
             # Ensure current prices are available
             backend.initialize_default_prices()
+            init_nav_tables()
+            init_attribution_tables()
         else:
             st.error(f"⚠️ {message}")
             st.stop()
@@ -61,24 +84,95 @@ if not health_success:
 # DATA CACHING (Performance Optimization)
 # ================================================
 
-# @st.cache_data(ttl=60, show_spinner=False)  # Reduced TTL to 60 seconds
-def get_cached_portfolio_summary():
-    # Cached version of portfolio summary - Returns immutable tuple
-    success, data = backend.get_portfolio_summary()
-    # Return immutable tuple to prevent cache pollution
-    return tuple(data) if success and data else ()
+# Cached values live in the event bus cache and are dropped only when a price or transaction
+# event touches what they depend on (see data/event_bus.py)
+
+@st.cache_resource
+def start_event_listener():
+    # Follow price and transaction changes made by other processes (once per server process)
+    return event_bus.start_listener()
+
+start_event_listener()
+
+def _written(result, *topics):
+    # Remember the version a write returned, so this session's next reads skip older cached values
+    for topic in topics:
+        st.session_state.data_versions[topic] = result['version']
+    return result['message']
+
+def _seen(*topics):
+    # Cache key part with this session's written versions: right after a write the key is new, so the
+    # value is read from the database even if another process has not seen the change event yet
+    return '@' + ':'.join(str(st.session_state.data_versions.get(topic, 0)) for topic in topics)
+
+def _summary_symbols(data):
+    return [stock['stock_symbol'] for stock in data]
+
+def _load_portfolio_summary(portfolio_id):
+    success, data = backend.get_portfolio_summary(portfolio_id)
+    return tuple(data) if success else None
+
+def get_cached_portfolio_summary(portfolio_id):
+    # Holdings with current prices - Returns immutable tuple
+    # New prices only invalidate it when they are for a held stock
+    transactions = event_bus.transactions_topic(portfolio_id)
+    data = event_bus.cached(f'portfolio_summary:{portfolio_id}{_seen(transactions, event_bus.PRICES)}', lambda: _load_portfolio_summary(portfolio_id),
+                            {event_bus.transactions_topic(portfolio_id): None, event_bus.PRICES: _summary_symbols})
+    return data or ()
+
+def _load_realized_pl(portfolio_id):
+    success, data = backend.get_realized_pl(portfolio_id)
+    return data if success else None
+
+def get_cached_realized_pl(portfolio_id):
+    # Realized P/L per stock, changes only with the ledger
+    return event_bus.cached(f'realized_pl:{portfolio_id}{_seen(event_bus.transactions_topic(portfolio_id))}', lambda: _load_realized_pl(portfolio_id),
+                            {event_bus.transactions_topic(portfolio_id): None}) or {}
 
 # @st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
 def get_cached_stock_list():
     # Cached version of stock list
     return backend.get_stock_list()
 
-# @st.cache_data(ttl=30, show_spinner=False)  # Reduced TTL to 30 seconds
-def get_cached_transactions():
-    # Cached version of all transactions - Returns immutable tuple
-    success, data = backend.get_all_transactions()
-    # Return immutable tuple to prevent cache pollution
-    return tuple(data) if success and data else ()
+def _load_transactions_page(portfolio_id, after, limit, stock_symbol, start_date, end_date):
+    success, data = backend.get_transactions_page(portfolio_id, after, limit, stock_symbol, start_date, end_date)
+    if not success:
+        return None
+    rows, next_cursor = data
+    return tuple(rows), next_cursor
+
+def get_cached_transactions_page(portfolio_id, after=None, limit=TRANSACTION_PAGE_SIZE, stock_symbol=None, start_date=None, end_date=None):
+    # One page of transactions (immutable tuple) and the cursor of the next page (None on the last page)
+    key = f'transactions_page:{portfolio_id}:{after}:{limit}:{stock_symbol}:{start_date}:{end_date}{_seen(event_bus.transactions_topic(portfolio_id))}'
+    page = event_bus.cached(key, lambda: _load_transactions_page(portfolio_id, after, limit, stock_symbol, start_date, end_date),
+                            {event_bus.transactions_topic(portfolio_id): None})
+    return page or ((), None)
+
+def _load_portfolio_nav(portfolio_id):
+    success, nav = get_portfolio_nav(portfolio_id)
+    if not success:
+        st.warning(f"⚠️ {nav}")
+        return None
+    return nav
+
+def get_cached_portfolio_nav(portfolio_id):
+    # Daily NAV series, keyed by day (valued at historical closes, so price refreshes do not affect it)
+    nav = event_bus.cached(f'portfolio_nav:{portfolio_id}:{date.today()}{_seen(event_bus.transactions_topic(portfolio_id))}', lambda: _load_portfolio_nav(portfolio_id),
+                           {event_bus.transactions_topic(portfolio_id): None})
+    return nav if nav is not None else pd.DataFrame()
+
+def _load_portfolio_attribution(portfolio_id, benchmark):
+    success, attribution = get_portfolio_attribution(portfolio_id, benchmark)
+    if not success:
+        st.warning(f"⚠️ {attribution}")
+        return None
+    return attribution
+
+def get_cached_portfolio_attribution(portfolio_id, benchmark):
+    # Monthly attribution, keyed by day like the NAV (completed months are also stored by the backend)
+    key = f'portfolio_attribution:{portfolio_id}:{benchmark}:{date.today()}{_seen(event_bus.transactions_topic(portfolio_id))}'
+    return event_bus.cached(key, lambda: _load_portfolio_attribution(portfolio_id, benchmark),
+                            {event_bus.transactions_topic(portfolio_id): None})
 
 # ================================================
 # CUSTOM CSS STYLING
@@ -175,30 +269,49 @@ st.markdown('<p class="subtitle">Track your investments, monitor performance, an
 
 top_col1, top_col2, top_col3, top_col4 = st.columns([2, 1, 1, 1])
 
+with top_col1:
+    # Every holding, transaction and chart below belongs to the selected portfolio
+    portfolios_success, portfolios = backend.get_portfolios()
+    portfolios = portfolios if portfolios_success else []
+    portfolio_names = {p['id']: p['name'] for p in portfolios}
+    if st.session_state.portfolio_id not in portfolio_names:
+        st.session_state.portfolio_id = next(iter(portfolio_names), backend.DEFAULT_PORTFOLIO_ID)
+    portfolio_options = list(portfolio_names) or [st.session_state.portfolio_id]
+    select_col, new_col = st.columns([3, 2])
+    with select_col:
+        st.session_state.portfolio_id = st.selectbox(
+            "Portfolio",
+            options=portfolio_options,
+            index=portfolio_options.index(st.session_state.portfolio_id),
+            format_func=lambda portfolio_id: portfolio_names.get(portfolio_id, "Default"),
+            label_visibility="collapsed"
+        )
+    with new_col:
+        with st.popover("New Portfolio", use_container_width=True):
+            new_name = st.text_input("Portfolio name", key="new_portfolio_name")
+            if st.button("Create", use_container_width=True):
+                success, result = backend.create_portfolio(new_name)
+                if success:
+                    st.session_state.portfolio_id = result
+                    st.session_state.flash_message = f"Portfolio '{new_name.strip()}' created"
+                    st.rerun()
+                else:
+                    st.error(f"❌ {result}")
+
+portfolio_id = st.session_state.portfolio_id
+
 with top_col2:
     if st.button("Refresh Prices", use_container_width=True):
         with st.spinner("Updating current prices... Please wait"):
-            # Clear all caches first
-            st.cache_data.clear()
-            
-            # Update prices
-            success, message = backend.update_current_prices()
+            # The update publishes the changed symbols, which drops only the cached values using them
+            success, result = backend.update_current_prices()
             
             if success:
-                # Wait for DB to commit
-                time.sleep(0.8)
-                
-                # Clear caches again to ensure fresh data
-                st.cache_data.clear()
-                
-                # Update session state
                 st.session_state.refresh_data = True
-                
-                st.success(f"✅ {message}")
-                time.sleep(0.5)  # Show success message briefly
+                st.session_state.flash_message = _written(result, event_bus.PRICES)
                 st.rerun()
             else:
-                st.error(f"❌ {message}")
+                st.error(f"❌ {result}")
 
 with top_col3:
     last_update = backend.get_last_price_update()
@@ -211,12 +324,24 @@ with top_col4:
     if st.button("Manage Transactions", use_container_width=True):
         st.session_state.show_delete_section = not st.session_state.show_delete_section
 
+if st.session_state.flash_message:
+    st.success(f"✅ {st.session_state.flash_message}")
+    st.session_state.flash_message = None
+    if st.session_state.form_submitted:
+        st.balloons()
+        st.session_state.form_submitted = False
+
 st.divider()
 
 # ================================================
 # MAIN TWO-COLUMN LAYOUT
 # ================================================
 
+# Holdings are read once per run (a primary-key scan of the holdings table) and shared by
+# the holdings table and the quick stats below
+with st.spinner("Loading portfolio data..."):
+    portfolio_data = get_cached_portfolio_summary(portfolio_id)
+
 col_left, col_right = st.columns([2, 1], gap="large")
 
 # ================================================
@@ -230,25 +355,29 @@ with col_left:
         st.subheader("Portfolio Holdings")
     with col_header2:
         if st.button("Refresh Data", use_container_width=True, key="refresh_portfolio"):
-            st.cache_data.clear()
+            event_bus.clear_cache()
             st.rerun()
     
     try:
-        # LOADING STATE
-        with st.spinner("Loading portfolio data..."):
-            portfolio_data = get_cached_portfolio_summary()
-        
         if portfolio_data and len(portfolio_data) > 0:
             # Convert tuple to list for processing
             portfolio_list = list(portfolio_data)
             
             # Calculate metrics using backend
             metrics = backend.calculate_portfolio_metrics(portfolio_list)
+            # Realized P/L includes positions that were sold off completely
+            realized_by_stock = get_cached_realized_pl(portfolio_id)
+            if realized_by_stock:
+                metrics['realized_pl'] = round(sum(realized_by_stock.values()), 2)
+            # Money-weighted return, accounts for when each purchase and sale happened
+            xirr_success, xirr = backend.get_portfolio_xirr(portfolio_id)
+            if not xirr_success:
+                xirr = {'portfolio': None, 'holdings': {}}
             
             # ============================================
             # PORTFOLIO SUMMARY CARDS
             # ============================================
-            metric_cols = st.columns(4)
+            metric_cols = st.columns(6)
             
             with metric_cols[0]:
                 st.metric(
@@ -265,13 +394,26 @@ with col_left:
             with metric_cols[2]:
                 delta_color = "normal" if metrics['net_pl'] >= 0 else "inverse"
                 st.metric(
-                    label="Net P/L",
+                    label="Unrealized P/L",
                     value=f"₹{metrics['net_pl']:,.2f}",
                     delta=f"{metrics['pl_percent']:.2f}%",
                     delta_color=delta_color
                 )
             
             with metric_cols[3]:
+                st.metric(
+                    label="Realized P/L",
+                    value=f"₹{metrics['realized_pl']:,.2f}"
+                )
+            
+            with metric_cols[4]:
+                st.metric(
+                    label="XIRR (annual)",
+                    value=f"{xirr['portfolio']:.2f}%" if xirr['portfolio'] is not None else "—",
+                    help="Money-weighted annual return of all purchases, sales and today's value"
+                )
+            
+            with metric_cols[5]:
                 st.metric(
                     label="Total Stocks",
                     value=metrics['total_stocks']
@@ -293,18 +435,19 @@ with col_left:
             df['Current Value'] = df['quantity'] * df['current_price']
             df['P/L Amount'] = df['Current Value'] - df['Investment']
             df['P/L %'] = (df['P/L Amount'] / df['Investment'] * 100).round(2)
+            df['XIRR %'] = df['stock_symbol'].map(xirr['holdings']).astype(float)
             
             # Prepare display dataframe
             display_df = df[[
                 'stock_name', 'stock_symbol', 'quantity', 
                 'avg_buy_price', 'current_price', 'Investment', 
-                'Current Value', 'P/L Amount', 'P/L %'
+                'Current Value', 'P/L Amount', 'P/L %', 'XIRR %', 'realized_pl'
             ]].copy()
             
             display_df.columns = [
                 'Stock Name', 'Symbol', 'Qty', 
                 'Avg Buy Price', 'Current Price', 'Investment', 
-                'Current Value', 'P/L Amount', 'P/L %'
+                'Current Value', 'P/L Amount', 'P/L %', 'XIRR %', 'Realized P/L'
             ]
             
             # Style the dataframe with color coding
@@ -330,10 +473,12 @@ with col_left:
                 'Investment': '₹{:,.2f}',
                 'Current Value': '₹{:,.2f}',
                 'P/L Amount': '₹{:,.2f}',
-                'P/L %': '{:.2f}%'
-            }).applymap(
+                'P/L %': '{:.2f}%',
+                'XIRR %': '{:.2f}%',
+                'Realized P/L': '₹{:,.2f}'
+            }, na_rep='—').map(
                 highlight_pl, 
-                subset=['P/L Amount', 'P/L %']
+                subset=['P/L Amount', 'P/L %', 'XIRR %', 'Realized P/L']
             ).apply(highlight_row, axis=1)
             
             # Display the table
@@ -353,6 +498,144 @@ with col_left:
                 mime="text/csv",
                 use_container_width=True
             )
+
+            # Portfolio value over time (daily NAV from the transaction history)
+            nav_df = get_cached_portfolio_nav(portfolio_id)
+            if len(nav_df) > 1:
+                st.markdown("#### Portfolio Value Over Time")
+                nav_fig = go.Figure()
+                nav_fig.add_trace(go.Scatter(x=nav_df['nav_date'], y=nav_df['market_value'], mode='lines', name='Market Value'))
+                nav_fig.add_trace(go.Scatter(x=nav_df['nav_date'], y=nav_df['net_invested'], mode='lines', name='Net Invested'))
+                nav_fig.update_layout(xaxis_title='Date', yaxis_title='Value (₹)', height=350, margin=dict(t=20, b=20))
+                st.plotly_chart(nav_fig, use_container_width=True)
+
+            # Risk of the current holdings (cached per portfolio and day by the backend)
+            with st.expander("Risk Analytics"):
+                risk_success, risk = get_portfolio_risk(portfolio_id)
+                if risk_success:
+                    risk_col1, risk_col2, risk_col3, risk_col4 = st.columns(4)
+                    risk_col1.metric("Volatility (annual)", f"{risk['volatility'] * 100:.1f}%")
+                    risk_col2.metric(f"Beta vs {risk['benchmark'].title()}", f"{risk['beta']:.2f}")
+                    risk_col3.metric("Sharpe / Sortino", f"{risk['sharpe']:.2f} / {risk['sortino']:.2f}")
+                    risk_col4.metric(f"1-day VaR ({risk['confidence']:.0%})", f"₹{risk['var_historical_amount']:,.0f}",
+                                     delta=f"parametric ₹{risk['var_parametric_amount']:,.0f}", delta_color="off")
+                    st.dataframe(
+                        risk['holdings'].rename(columns={
+                            'stock_symbol': 'Stock', 'weight': 'Weight', 'volatility': 'Volatility',
+                            'beta': 'Beta', 'risk_contribution': 'Share of Risk'
+                        }).style.format({'Weight': '{:.1%}', 'Volatility': '{:.1%}', 'Beta': '{:.2f}', 'Share of Risk': '{:.1%}'}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    st.caption(f"Based on {risk['days']} trading days of closes"
+                               + (f"; no price history for {', '.join(risk['missing'])}" if risk['missing'] else ""))
+                else:
+                    st.info(risk)
+
+            # Monte Carlo projection of the current holdings (runs on request, then cached per scenario)
+            with st.expander("Scenario Simulation"):
+                horizons = {"1 month": 21, "3 months": 63, "6 months": 126, "1 year": 252}
+                sim_col1, sim_col2, sim_col3 = st.columns([2, 2, 1])
+                with sim_col1:
+                    horizon_label = st.selectbox("Horizon", options=list(horizons), index=len(horizons) - 1)
+                with sim_col2:
+                    method = st.selectbox("Returns", options=list(SIMULATION_METHODS), format_func=SIMULATION_METHODS.get)
+                with sim_col3:
+                    st.write("")
+                    if st.button("Run", use_container_width=True):
+                        st.session_state.simulation_request = (portfolio_id, horizons[horizon_label], method)
+
+                request = st.session_state.simulation_request
+                if request and request[0] == portfolio_id:
+                    with st.spinner("Simulating..."):
+                        sim_success, simulation = get_portfolio_simulation(*request)
+                    if sim_success:
+                        bands = simulation['bands']
+                        sim_fig = go.Figure()
+                        sim_fig.add_trace(go.Scatter(x=bands['day'], y=bands['p95'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                        sim_fig.add_trace(go.Scatter(x=bands['day'], y=bands['p5'], mode='lines', line=dict(width=0), fill='tonexty',
+                                                     fillcolor='rgba(31, 119, 180, 0.15)', name='5th - 95th percentile'))
+                        sim_fig.add_trace(go.Scatter(x=bands['day'], y=bands['p75'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                        sim_fig.add_trace(go.Scatter(x=bands['day'], y=bands['p25'], mode='lines', line=dict(width=0), fill='tonexty',
+                                                     fillcolor='rgba(31, 119, 180, 0.35)', name='25th - 75th percentile'))
+                        sim_fig.add_trace(go.Scatter(x=bands['day'], y=bands['p50'], mode='lines', name='Median'))
+                        sim_fig.update_layout(xaxis_title='Trading days ahead', yaxis_title='Value (₹)', height=350, margin=dict(t=20, b=20))
+                        st.plotly_chart(sim_fig, use_container_width=True)
+
+                        sim_metric1, sim_metric2, sim_metric3 = st.columns(3)
+                        sim_metric1.metric("Expected Value", f"₹{simulation['expected_value']:,.0f}",
+                                           delta=f"{(simulation['expected_value'] / simulation['market_value'] - 1) * 100:.1f}%")
+                        sim_metric2.metric("Chance of a Loss", f"{simulation['probability_of_loss']:.0%}")
+                        sim_metric3.metric(f"VaR ({simulation['confidence']:.0%})", f"₹{simulation['var_amount']:,.0f}")
+                        st.caption(f"{simulation['paths']:,} paths from {simulation['days']} trading days of closes"
+                                   + (f"; no price history for {', '.join(simulation['missing'])}" if simulation['missing'] else ""))
+                    else:
+                        st.info(simulation)
+
+            # Holdings on a past day, rebuilt from the ledger event log (nearest snapshot + later events)
+            with st.expander("Holdings As Of"):
+                as_of = st.date_input("As of", value=date.today().replace(day=1) - timedelta(days=1), max_value=date.today(), key="holdings_as_of")
+                as_of_success, as_of_view = get_holdings_as_of(as_of, portfolio_id)
+                if as_of_success and as_of_view['holdings']:
+                    as_of_df = pd.DataFrame(as_of_view['holdings'])
+                    as_of_value = as_of_df['market_value'].sum()
+                    as_of_col1, as_of_col2, as_of_col3 = st.columns(3)
+                    as_of_col1.metric("Value", f"₹{as_of_value:,.0f}")
+                    as_of_col2.metric("Unrealized P/L", f"₹{as_of_df['unrealized_pl'].sum():,.0f}")
+                    as_of_col3.metric("Realized P/L", f"₹{as_of_df['realized_pl'].sum():,.0f}")
+                    st.dataframe(
+                        as_of_df[['stock_symbol', 'stock_name', 'quantity', 'avg_price', 'price', 'market_value', 'unrealized_pl', 'realized_pl']].rename(columns={
+                            'stock_symbol': 'Symbol', 'stock_name': 'Stock Name', 'quantity': 'Quantity', 'avg_price': 'Avg Price',
+                            'price': 'Price', 'market_value': 'Market Value', 'unrealized_pl': 'Unrealized P/L', 'realized_pl': 'Realized P/L'
+                        }).style.format({'Avg Price': '₹{:,.2f}', 'Price': '₹{:,.2f}', 'Market Value': '₹{:,.0f}',
+                                         'Unrealized P/L': '₹{:,.0f}', 'Realized P/L': '₹{:,.0f}'}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    snapshot_date = as_of_view['snapshot_date']
+                    st.caption((f"From the {snapshot_date.strftime('%d %b %Y')} snapshot" if snapshot_date else "From the first transaction")
+                               + f" plus {as_of_view['events_replayed']} later transactions")
+                elif as_of_success:
+                    st.info(f"No holdings on {as_of.strftime('%d %b %Y')}")
+                else:
+                    st.info(as_of_view)
+
+            # Brinson attribution of the monthly returns against a benchmark index, by sector
+            with st.expander("Performance Attribution"):
+                benchmark = st.selectbox("Benchmark", options=list(ATTRIBUTION_BENCHMARKS), key="attribution_benchmark")
+                attribution = get_cached_portfolio_attribution(portfolio_id, benchmark)
+                if attribution and attribution['months']:
+                    attr_col1, attr_col2, attr_col3 = st.columns(3)
+                    attr_col1.metric("Portfolio Return", f"{attribution['portfolio_return'] * 100:.1f}%")
+                    attr_col2.metric(f"{benchmark.title()} Return", f"{attribution['benchmark_return'] * 100:.1f}%")
+                    attr_col3.metric("Excess Return", f"{(attribution['portfolio_return'] - attribution['benchmark_return']) * 100:.1f}%")
+                    sectors = attribution['sectors']
+                    attr_fig = go.Figure()
+                    for effect in ('allocation', 'selection', 'interaction'):
+                        attr_fig.add_trace(go.Bar(x=sectors['sector'], y=sectors[effect] * 100, name=effect.title()))
+                    attr_fig.update_layout(barmode='relative', yaxis_title='Effect (%)', height=350, margin=dict(t=20, b=20))
+                    st.plotly_chart(attr_fig, use_container_width=True)
+                    st.dataframe(
+                        sectors.rename(columns={
+                            'sector': 'Sector', 'allocation': 'Allocation', 'selection': 'Selection', 'interaction': 'Interaction',
+                            'total': 'Total', 'portfolio_weight': 'Avg Weight', 'benchmark_weight': 'Benchmark Weight'
+                        }).style.format({'Allocation': '{:.2%}', 'Selection': '{:.2%}', 'Interaction': '{:.2%}', 'Total': '{:.2%}',
+                                         'Avg Weight': '{:.1%}', 'Benchmark Weight': '{:.1%}'}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    st.dataframe(
+                        attribution['periods'].rename(columns={
+                            'period_end': 'Month End', 'portfolio_return': 'Portfolio', 'benchmark_return': 'Benchmark',
+                            'allocation': 'Allocation', 'selection': 'Selection', 'interaction': 'Interaction'
+                        }).style.format({'Month End': lambda d: d.strftime('%d %b %Y'), 'Portfolio': '{:.2%}', 'Benchmark': '{:.2%}',
+                                         'Allocation': '{:.2%}', 'Selection': '{:.2%}', 'Interaction': '{:.2%}'}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    st.caption(f"{attribution['months']} months; holdings as of each month start, sector weights of the benchmark from its factsheet")
+                elif attribution:
+                    st.info("No completed month with holdings yet")
             
         else:
             # Empty state
@@ -378,20 +661,35 @@ if st.session_state.show_delete_section:
         st.markdown("---")
         with st.expander("Delete Transactions", expanded=True):
             try:
-                # Only fetch when section is visible (LAZY LOADING)
-                transactions = list(get_cached_transactions())  # Convert from tuple
+                # Filters narrow the history; changing one starts again from the first page
+                def _reset_transaction_pages():
+                    st.session_state.transaction_cursors[portfolio_id] = [None]
+
+                filter_col1, filter_col2, filter_col3 = st.columns(3)
+                with filter_col1:
+                    symbol_filter = st.text_input("Symbol", key="transaction_symbol_filter", on_change=_reset_transaction_pages)
+                with filter_col2:
+                    start_filter = st.date_input("From", value=None, key="transaction_start_filter", on_change=_reset_transaction_pages)
+                with filter_col3:
+                    end_filter = st.date_input("To", value=None, key="transaction_end_filter", on_change=_reset_transaction_pages)
+
+                # Only fetch when section is visible (LAZY LOADING), one page at a time
+                cursors = st.session_state.transaction_cursors.setdefault(portfolio_id, [None])
+                transactions, next_cursor = get_cached_transactions_page(
+                    portfolio_id, cursors[-1], stock_symbol=symbol_filter.strip().upper() or None,
+                    start_date=start_filter, end_date=end_filter
+                )
                 
                 if transactions:
-                    trans_df = pd.DataFrame(transactions)
-                    trans_df['Display'] = trans_df.apply(
-                        lambda x: f"{x['stock_name']} ({x['stock_symbol']}) - {x['quantity']} shares @ ₹{x['unit_price']} on {x['transaction_date'].strftime('%d-%b-%Y')}", 
-                        axis=1
-                    )
+                    labels = {
+                        t['id']: f"{t['transaction_type']} {t['stock_name']} ({t['stock_symbol']}) - {t['quantity']} shares @ ₹{t['unit_price']} on {t['transaction_date'].strftime('%d-%b-%Y')}"
+                        for t in transactions
+                    }
                     
                     selected_trans = st.selectbox(
                         "Select transaction to delete:",
-                        options=trans_df['id'].tolist(),
-                        format_func=lambda x: trans_df[trans_df['id']==x]['Display'].values[0]
+                        options=list(labels),
+                        format_func=labels.get
                     )
                     
                     col_del1, col_del2 = st.columns(2)
@@ -399,14 +697,12 @@ if st.session_state.show_delete_section:
                     with col_del1:
                         if st.button("Confirm Delete", type="secondary", use_container_width=True):
                             with st.spinner("Deleting transaction..."):
-                                success, message = backend.delete_transaction(selected_trans)
+                                success, result = backend.delete_transaction(selected_trans, portfolio_id)
                                 if success:
-                                    st.success(f"✅ {message}")
-                                    st.cache_data.clear()
-                                    time.sleep(0.5)
+                                    st.session_state.flash_message = _written(result, event_bus.transactions_topic(portfolio_id))
                                     st.rerun()
                                 else:
-                                    st.error(f"❌ {message}")
+                                    st.error(f"❌ {result}")
                     
                     with col_del2:
                         if st.button("❌ Cancel", use_container_width=True):
@@ -414,6 +710,18 @@ if st.session_state.show_delete_section:
                             st.rerun()
                 else:
                     st.info("No transactions to delete")
+
+                page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
+                with page_col1:
+                    if st.button("◀ Newer", disabled=len(cursors) == 1, use_container_width=True):
+                        cursors.pop()
+                        st.rerun()
+                with page_col2:
+                    st.caption(f"Page {len(cursors)}")
+                with page_col3:
+                    if st.button("Older ▶", disabled=next_cursor is None, use_container_width=True):
+                        cursors.append(next_cursor)
+                        st.rerun()
                     
             except Exception as e:
                 st.error(f"Error loading transactions: {str(e)}")
@@ -425,9 +733,19 @@ if st.session_state.show_delete_section:
 with col_right:
     st.subheader("Add New Transaction")
     
+    # Stock search runs outside the form so the dropdown narrows as the user types
+    stock_query = st.text_input(
+        "Search Stock",
+        placeholder="Symbol or company name, e.g. TCS or Tata",
+        key="stock_search"
+    )
+    
     # LOADING STATE for stock list
     with st.spinner("Loading stock list..."):
-        stock_list = get_cached_stock_list()
+        if stock_query.strip():
+            stock_list = backend.search_stocks(stock_query, limit=50)
+        else:
+            stock_list = get_cached_stock_list()
     
     st.markdown("""
     <style>
@@ -470,12 +788,20 @@ with col_right:
             key="stock_select"
         )
         
+        # Buy adds a lot, sell is matched against the oldest lots first (FIFO)
+        trans_type = st.radio(
+            "Transaction Type *",
+            options=["BUY", "SELL"],
+            horizontal=True,
+            key="trans_type"
+        )
+        
         # Transaction date with calendar picker
         trans_date = st.date_input(
             "Transaction Date *",
             value=date.today(),
             max_value=date.today(),
-            help="Select the date when you purchased the stock",
+            help="Select the date when you bought or sold the stock",
             key="trans_date"
         )
         
@@ -485,7 +811,7 @@ with col_right:
             min_value=1,
             value=1,
             step=1,
-            help="Number of shares purchased",
+            help="Number of shares bought or sold",
             key="quantity"
         )
         
@@ -496,13 +822,13 @@ with col_right:
             value=100.00,
             step=0.01,
             format="%.2f",
-            help="Purchase price per share",
+            help="Price per share",
             key="unit_price"
         )
         
-        # Auto-calculated total investment
+        # Auto-calculated total amount
         total_investment = quantity * unit_price
-        st.markdown(f"### Total Investment")
+        st.markdown(f"### Total Amount")
         st.markdown(f"<h2 style='color: blue;'>₹{total_investment:,.2f}</h2>", unsafe_allow_html=True)
         
         st.divider()
@@ -539,38 +865,59 @@ with col_right:
                     stock_symbol, stock_name = stock_options[selected_stock]
                     
                     # Add to database using backend (includes server-side validation)
-                    success, message = backend.add_transaction(
+                    success, result = backend.add_transaction(
                         stock_symbol=stock_symbol,
                         stock_name=stock_name,
                         transaction_date=trans_date,
                         quantity=quantity,
-                        unit_price=unit_price
+                        unit_price=unit_price,
+                        transaction_type=trans_type,
+                        portfolio_id=portfolio_id
                     )
                     
                     if success:
-                        # IMPORTANT: Clear ALL caches before showing success
-                        st.cache_data.clear()
-                        
-                        # Show success message
-                        st.success(f"✅ {message}")
-                        
-                        # Update session state
+                        # The transaction event drops the cached holdings; the message and
+                        # balloons are shown after the rerun
+                        st.session_state.flash_message = _written(result, event_bus.transactions_topic(portfolio_id))
                         st.session_state.form_submitted = True
-                        
-                        # Show balloons animation
-                        st.balloons()
-                        
-                        # Wait for DB to fully commit and caches to clear
-                        time.sleep(1)
-                        
-                        # Force complete page refresh
                         st.rerun()
                     else:
-                        st.error(f"❌ {message}")
+                        st.error(f"❌ {result}")
                 
                 except Exception as e:
                     st.error(f"⚠️ Error: {str(e)}")
     
+    # ============================================
+    # BULK IMPORT FROM BROKER CSV
+    # ============================================
+    
+    with st.expander("Import from Broker CSV"):
+        st.caption("Tradebook or contract-note export with symbol, trade date, buy/sell, quantity and price columns")
+        uploaded_file = st.file_uploader("Broker CSV", type=["csv"], key="import_file")
+        if uploaded_file is not None and st.button("Import Transactions", use_container_width=True):
+            with st.spinner("Importing transactions..."):
+                success, report = import_transactions(uploaded_file, portfolio_id)
+            if success:
+                # Keep the report across the rerun that refreshes the holdings
+                st.session_state.import_report = report
+                if report['version'] is not None:
+                    st.session_state.data_versions[event_bus.transactions_topic(portfolio_id)] = report['version']
+                st.rerun()
+            else:
+                st.error(f"❌ {report}")
+        
+        report = st.session_state.get('import_report')
+        if report:
+            st.success(f"✅ Imported {report['imported']} of {report['rows']} rows "
+                       f"in {report['seconds']}s ({report['rows_per_second']:,.0f} rows/sec)")
+            if report['rejected']:
+                st.warning(f"{report['rejected']} rows rejected")
+                st.dataframe(
+                    report['rejects'].rename(columns={'row': 'Line', 'stock_symbol': 'Symbol', 'reason': 'Reason'}),
+                    use_container_width=True,
+                    hide_index=True
+                )
+    
     # ============================================
     # QUICK STATS SIDEBAR
     # ============================================
@@ -579,7 +926,7 @@ with col_right:
     st.markdown("### 📊 Quick Stats")
     
     try:
-        stats = list(get_cached_portfolio_summary())  # Convert from tuple
+        stats = list(portfolio_data)  # Convert from tuple
         if stats:
             total_holdings = len(stats)
             total_qty = sum([s['quantity'] for s in stats])
@@ -588,12 +935,12 @@ with col_right:
             st.metric("Total Shares", f"{total_qty:,}")
             
             # Show last transaction info
-            recent_trans = list(get_cached_transactions())  # Convert from tuple
+            recent_trans, _ = get_cached_transactions_page(portfolio_id, limit=1)
             if recent_trans:
                 last_trans = recent_trans[0]
                 st.markdown(f"""
                     **Last Transaction:**  
-                    {last_trans['stock_symbol']} - {last_trans['quantity']} shares  
+                    {last_trans['transaction_type']} {last_trans['stock_symbol']} - {last_trans['quantity']} shares  
                     on {last_trans['transaction_date'].strftime('%d %b %Y')}
                 """)
         else:
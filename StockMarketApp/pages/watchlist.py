@@ -7,31 +7,19 @@ import os
 import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.database import read_nifty50_stock_quotes_data # Importing read_data function from data package
+from data.symbol_master import get_symbol_index, search_symbols
 
 # Set page configuration
 st.set_page_config(page_title="Watchlist", layout="wide", page_icon="👀")
 
 st.subheader("Watchlist Management Page")
 
-# Dropdown for stock selection
-stock_list = [
-    "RELIANCE", 
-    "BHARTIARTL", 
-    "TCS", 
-    "TITAN", 
-    "INFY", 
-    "BEL", 
-    "TATAMOTORS", 
-    "ONGC", 
-    "NTPC", 
-    "WIPRO", 
-    "ITC", 
-    "HDFCBANK", 
-    "MARUTI", 
-    "HINDUNILVR", 
-    "ICICIBANK"
-    # Add more stocks as needed
-] 
+# Dropdown for stock selection (served from the offline symbol master)
+stock_query = st.text_input("Search stock:", placeholder="Symbol or company name, e.g. INFY or Infosys")
+if stock_query.strip():
+    stock_list = [record['symbol'] for record in search_symbols(stock_query, limit=50)]
+else:
+    stock_list = get_symbol_index().symbols()
 selected_stock = st.selectbox("Select a stock to add to your watchlist:", stock_list)
 columns = ["Symbol", "Last Price", "Previous Close", "Change", "Total Traded Volume", "Total Traded Value", "Year High", "Year Low"]
 # columns = ["symbol", "last_price", "previous_close", "change", "p_change", "total_traded_volume", "total_traded_value", "year_high", "year_low"] 
@@ -70,16 +58,22 @@ def get_watchlist_data(selected_stock):
         "Year Low"
     ]
     df = df[[col for col in expected_columns if col in df.columns]]
-    return df.to_dict(orient='records')[0]  # Return as dictionary
+    records = df.to_dict(orient='records')
+    return records[0] if records else None  # Return as dictionary (None if no quote is stored for the stock)
 
 # Add stock button
 if st.button("Add"):
     # Check for duplicates
     if selected_stock in st.session_state['watchlist']['Symbol'].values:
         st.error(f"The stock symbol '{selected_stock}' is already in the watchlist.")
+    elif not selected_stock:
+        st.warning("No matching stock found.")
     else:
         data = get_watchlist_data(selected_stock)
-        st.session_state['watchlist'] = pd.concat([st.session_state['watchlist'], pd.DataFrame([data])], ignore_index=True)
+        if data is None:
+            st.warning(f"No quote data available yet for '{selected_stock}'.")
+        else:
+            st.session_state['watchlist'] = pd.concat([st.session_state['watchlist'], pd.DataFrame([data])], ignore_index=True)
 
 # Editable and Deletable Table
 edited_watchlist = st.data_editor(
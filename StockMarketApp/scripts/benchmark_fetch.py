@@ -0,0 +1,81 @@
+# Script benchmarks the fetch paths of the StockMarketApp project (news, symbol search, ingestion)
+# against recorded provider responses, so throughput and tail latency can be measured offline.
+#
+# Record once on a machine with network access:
+#   python scripts/benchmark_fetch.py --mode record -n 1
+# Replay anywhere, with simulated provider latency and failures:
+#   python scripts/benchmark_fetch.py --mode replay -n 500 -c 8 --latency-ms 120 --jitter-ms 40 --error-rate 0.02
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the StockMarketApp fetch pipeline")
+    parser.add_argument('--mode', choices=['live', 'record', 'replay'], default='replay')
+    parser.add_argument('-n', '--iterations', type=int, default=100, help="Calls per workload")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Parallel callers")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workloads', default='news,search,ingest', help="Comma separated list of workloads")
+    return parser.parse_args()
+
+args = parse_args()
+# The adapter reads its mode from the environment, so set it before importing the data package
+os.environ['STOCKAPP_HTTP_MODE'] = args.mode
+os.environ['STOCKAPP_REPLAY_LATENCY_MS'] = str(args.latency_ms)
+os.environ['STOCKAPP_REPLAY_JITTER_MS'] = str(args.jitter_ms)
+os.environ['STOCKAPP_REPLAY_ERROR_RATE'] = str(args.error_rate)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from data.api_client import fetch_market_news, fetch_global_market_news, fetch_stock_ticker, fetch_stock_ticker_finnhub
+from data.ingest_pipeline import DATASETS, iter_records
+from data import replay
+
+def fetch_and_transform(name):
+    # Ingestion path without the database: fetch, normalize and batch one dataset
+    return lambda: sum(len(batch) for batch in iter_records(name))
+
+WORKLOADS = {
+    'news': [lambda: fetch_market_news(3), fetch_global_market_news],
+    'search': [lambda: fetch_stock_ticker("Infosys"), lambda: fetch_stock_ticker_finnhub("tcs")],
+    'ingest': [fetch_and_transform(name) for name in DATASETS]
+}
+
+def timed(func):
+    # A call failed when it raised, or when a provider failure was injected into it and absorbed by a fallback
+    injected = replay.injected_failures()
+    start = time.perf_counter()
+    try:
+        func()
+        failed = False
+    except Exception:
+        failed = True
+    return time.perf_counter() - start, failed or replay.injected_failures() > injected
+
+def run_workload(name, funcs):
+    calls = [funcs[i % len(funcs)] for i in range(args.iterations * len(funcs))]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed, calls))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    failures = sum(1 for _, failed in results if failed)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<8} calls={len(calls):<6} throughput={len(calls) / elapsed:8.1f}/s "
+          f"p50={p50:7.1f}ms p95={p95:7.1f}ms p99={p99:7.1f}ms max={latencies.max():7.1f}ms failures={failures}")
+
+def main():
+    print(f"Mode: {args.mode}, concurrency: {args.concurrency}, latency: {args.latency_ms}ms +/- {args.jitter_ms}ms, error rate: {args.error_rate}")
+    for name in args.workloads.split(','):
+        name = name.strip()
+        if name not in WORKLOADS:
+            print(f"Unknown workload: {name}")
+            continue
+        run_workload(name, WORKLOADS[name])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+-- This script adds the unique keys used by the streaming ingestion pipeline (data/ingest_pipeline.py)
+-- New installations get them automatically; run this once on databases created by the old database.py upload code.
+-- ================================================
+-- Remove duplicate rows first (keeps the latest upload of each key)
+-- ================================================
+
+USE stock_market_db;
+
+DELETE a FROM bank_nifty_data a JOIN bank_nifty_data b
+    ON a.symbol = b.symbol AND a.trade_date = b.trade_date AND a.id < b.id;
+DELETE a FROM bank_nifty_index_data a JOIN bank_nifty_index_data b
+    ON a.index_name = b.index_name AND a.historical_date = b.historical_date AND a.id < b.id;
+DELETE a FROM nifty50_stock_quotes_data a JOIN nifty50_stock_quotes_data b
+    ON a.symbol = b.symbol AND a.id < b.id;
+DELETE a FROM nifty_indexes_data a JOIN nifty_indexes_data b
+    ON a.index_name = b.index_name AND a.date_time = b.date_time AND a.id < b.id;
+
+-- ================================================
+-- Unique keys for INSERT ... ON DUPLICATE KEY UPDATE
+-- ================================================
+
+-- Skip this one if bank_nifty_data was created by db_setup.sql (it already has unique_symbol_date)
+ALTER TABLE bank_nifty_data ADD UNIQUE KEY unique_symbol_date (symbol, trade_date);
+ALTER TABLE bank_nifty_index_data ADD UNIQUE KEY uix_index_date (index_name, historical_date);
+ALTER TABLE nifty50_stock_quotes_data ADD UNIQUE KEY uix_symbol (symbol);
+ALTER TABLE nifty_indexes_data ADD UNIQUE KEY uix_index_date_time (index_name, date_time);
+
+SELECT 'Ingestion unique keys added successfully!' AS Status;
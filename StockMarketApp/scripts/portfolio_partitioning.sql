@@ -0,0 +1,61 @@
+-- This script partitions the portfolio tables by portfolio (data/portfolio_data_processor.py, data/portfolio_nav.py)
+-- New installations get this layout automatically; run it once on databases created before portfolios existed.
+-- All existing rows are assigned to portfolio 1 ('Default'). current_prices stays shared by all portfolios.
+-- ================================================
+-- Portfolios
+-- ================================================
+
+USE stock_market_db;
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL,
+    owner VARCHAR(100),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_portfolios_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO portfolios (id, name) VALUES (1, 'Default');
+
+-- ================================================
+-- portfolio_id columns and composite indexes
+-- (every per-portfolio query starts with portfolio_id, so it stays inside that portfolio's index range)
+-- ================================================
+
+ALTER TABLE transactions
+    ADD COLUMN portfolio_id INT NOT NULL DEFAULT 1 AFTER id,
+    ADD INDEX idx_transactions_portfolio_symbol (portfolio_id, stock_symbol),
+    ADD INDEX idx_transactions_portfolio_date (portfolio_id, transaction_date);
+
+ALTER TABLE lots
+    ADD COLUMN portfolio_id INT NOT NULL DEFAULT 1 AFTER transaction_id,
+    DROP INDEX idx_lots_fifo,
+    ADD INDEX idx_lots_fifo (portfolio_id, stock_symbol, acquired_date, id);
+
+ALTER TABLE lot_matches
+    ADD COLUMN portfolio_id INT NOT NULL DEFAULT 1 AFTER lot_id,
+    ADD INDEX idx_lot_matches_portfolio_symbol (portfolio_id, stock_symbol);
+
+ALTER TABLE holdings
+    ADD COLUMN portfolio_id INT NOT NULL DEFAULT 1 FIRST,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (portfolio_id, stock_symbol);
+
+-- The single-column indexes are covered by the composite ones. Their names depend on who created the table:
+-- portfolio_tables.sql (idx_stock_symbol, idx_transaction_date, idx_lot_matches_symbol) or the
+-- application (ix_transactions_stock_symbol, ix_transactions_transaction_date, ix_lot_matches_stock_symbol).
+-- Drop whichever pair exists:
+ALTER TABLE transactions DROP INDEX idx_stock_symbol, DROP INDEX idx_transaction_date;
+ALTER TABLE lot_matches DROP INDEX idx_lot_matches_symbol;
+-- ALTER TABLE transactions DROP INDEX ix_transactions_stock_symbol, DROP INDEX ix_transactions_transaction_date;
+-- ALTER TABLE lot_matches DROP INDEX ix_lot_matches_stock_symbol;
+
+-- ================================================
+-- NAV cache (recomputed on the next visit of the portfolio page)
+-- ================================================
+
+DROP TABLE IF EXISTS portfolio_nav;
+DROP TABLE IF EXISTS portfolio_nav_state;
+
+SELECT 'Portfolio partitioning applied successfully!' AS Status;
@@ -11,12 +11,36 @@ COLLATE utf8mb4_unicode_ci;
 USE stock_market_db;
 
 -- Drop existing tables (optional - only if you want to start fresh)
+-- DROP TABLE IF EXISTS portfolio_attribution_state;
+-- DROP TABLE IF EXISTS portfolio_attribution;
+-- DROP TABLE IF EXISTS portfolio_nav_state;
+-- DROP TABLE IF EXISTS portfolio_nav;
+-- DROP TABLE IF EXISTS holdings;
+-- DROP TABLE IF EXISTS lot_matches;
+-- DROP TABLE IF EXISTS lots;
 -- DROP TABLE IF EXISTS transactions;
 -- DROP TABLE IF EXISTS current_prices;
+-- DROP TABLE IF EXISTS portfolios;
+-- DROP TABLE IF EXISTS data_versions;
+-- DROP TABLE IF EXISTS ledger_snapshots;
+-- DROP TABLE IF EXISTS ledger_events;
+
+-- Create portfolios table (transactions, lots and holdings are partitioned by portfolio_id; prices are shared)
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL,
+    owner VARCHAR(100),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_portfolios_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO portfolios (id, name) VALUES (1, 'Default');
 
 -- Create transactions table
 CREATE TABLE IF NOT EXISTS transactions (
     id INT NOT NULL AUTO_INCREMENT,
+    portfolio_id INT NOT NULL DEFAULT 1,
     stock_symbol VARCHAR(20) NOT NULL,
     stock_name VARCHAR(100) NOT NULL,
     transaction_date DATE NOT NULL,
@@ -25,8 +49,16 @@ CREATE TABLE IF NOT EXISTS transactions (
     transaction_type ENUM('BUY', 'SELL') DEFAULT 'BUY',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (id),
-    INDEX idx_stock_symbol (stock_symbol),
-    INDEX idx_transaction_date (transaction_date)
+    INDEX idx_transactions_portfolio_symbol (portfolio_id, stock_symbol, transaction_date),
+    INDEX idx_transactions_portfolio_date (portfolio_id, transaction_date),
+    INDEX ix_transactions_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create data_versions table (one counter per change topic, incremented by every write and returned to the writer)
+CREATE TABLE IF NOT EXISTS data_versions (
+    topic VARCHAR(50) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (topic)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create current_prices table
@@ -38,6 +70,124 @@ CREATE TABLE IF NOT EXISTS current_prices (
     PRIMARY KEY (stock_symbol)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Create lots table (one FIFO lot per BUY transaction)
+CREATE TABLE IF NOT EXISTS lots (
+    id INT NOT NULL AUTO_INCREMENT,
+    transaction_id INT NOT NULL,
+    portfolio_id INT NOT NULL DEFAULT 1,
+    stock_symbol VARCHAR(20) NOT NULL,
+    stock_name VARCHAR(100) NOT NULL,
+    acquired_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    remaining_quantity INT NOT NULL,
+    unit_price DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_lots_transaction (transaction_id),
+    INDEX idx_lots_fifo (portfolio_id, stock_symbol, acquired_date, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create lot_matches table (part of a SELL matched against one lot)
+CREATE TABLE IF NOT EXISTS lot_matches (
+    id INT NOT NULL AUTO_INCREMENT,
+    sell_transaction_id INT NOT NULL,
+    lot_id INT NOT NULL,
+    portfolio_id INT NOT NULL DEFAULT 1,
+    stock_symbol VARCHAR(20) NOT NULL,
+    quantity INT NOT NULL,
+    buy_price DECIMAL(10, 2) NOT NULL,
+    sell_price DECIMAL(10, 2) NOT NULL,
+    sell_date DATE NOT NULL,
+    realized_pl DECIMAL(14, 2) NOT NULL,
+    PRIMARY KEY (id),
+    INDEX idx_lot_matches_sell (sell_transaction_id),
+    INDEX idx_lot_matches_lot (lot_id),
+    INDEX idx_lot_matches_portfolio_symbol (portfolio_id, stock_symbol)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create holdings table (current position per portfolio and stock, maintained on every write)
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id INT NOT NULL DEFAULT 1,
+    stock_symbol VARCHAR(20) NOT NULL,
+    stock_name VARCHAR(100) NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    total_cost DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    realized_pl DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (portfolio_id, stock_symbol)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create ledger_events table (append-only audit log of transactions, deletions and price changes, see data/portfolio_ledger.py)
+CREATE TABLE IF NOT EXISTS ledger_events (
+    id INT NOT NULL AUTO_INCREMENT,
+    event_type ENUM('ADD', 'REVERSAL', 'PRICE') NOT NULL,
+    portfolio_id INT,
+    transaction_id INT,
+    stock_symbol VARCHAR(20) NOT NULL,
+    stock_name VARCHAR(100),
+    effective_date DATE NOT NULL,
+    transaction_type ENUM('BUY', 'SELL'),
+    quantity INT,
+    unit_price DECIMAL(10, 2) NOT NULL,
+    recorded_at DATETIME,
+    PRIMARY KEY (id),
+    INDEX idx_ledger_events_portfolio_date (portfolio_id, effective_date),
+    INDEX idx_ledger_events_type_symbol_date (event_type, stock_symbol, effective_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create ledger_snapshots table (month-end books of a portfolio that as-of views start replaying from)
+CREATE TABLE IF NOT EXISTS ledger_snapshots (
+    portfolio_id INT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    state JSON NOT NULL,
+    events INT NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (portfolio_id, snapshot_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create portfolio_nav table (cached daily portfolio value, see data/portfolio_nav.py)
+CREATE TABLE IF NOT EXISTS portfolio_nav (
+    portfolio_id INT NOT NULL,
+    nav_date DATE NOT NULL,
+    market_value DECIMAL(16, 2) NOT NULL,
+    net_invested DECIMAL(16, 2) NOT NULL,
+    PRIMARY KEY (portfolio_id, nav_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create portfolio_nav_state table (how far portfolio_nav goes and which ledger it was computed from)
+CREATE TABLE IF NOT EXISTS portfolio_nav_state (
+    portfolio_id INT NOT NULL,
+    cached_through DATE NOT NULL,
+    ledger_fingerprint VARCHAR(40) NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (portfolio_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create portfolio_attribution table (cached monthly Brinson effects per sector, see data/portfolio_attribution.py)
+CREATE TABLE IF NOT EXISTS portfolio_attribution (
+    portfolio_id INT NOT NULL,
+    benchmark VARCHAR(50) NOT NULL,
+    period_end DATE NOT NULL,
+    sector VARCHAR(100) NOT NULL,
+    portfolio_weight DOUBLE NOT NULL,
+    benchmark_weight DOUBLE NOT NULL,
+    portfolio_return DOUBLE,
+    benchmark_return DOUBLE NOT NULL,
+    allocation DOUBLE NOT NULL,
+    selection DOUBLE NOT NULL,
+    interaction DOUBLE NOT NULL,
+    PRIMARY KEY (portfolio_id, benchmark, period_end, sector)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create portfolio_attribution_state table (how far portfolio_attribution goes and which ledger it was computed from)
+CREATE TABLE IF NOT EXISTS portfolio_attribution_state (
+    portfolio_id INT NOT NULL,
+    benchmark VARCHAR(50) NOT NULL,
+    cached_through DATE NOT NULL,
+    ledger_fingerprint VARCHAR(40) NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (portfolio_id, benchmark)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Insert popular Indian stocks with sample prices
 INSERT INTO current_prices (stock_symbol, stock_name, current_price) VALUES
 ('TCS', 'Tata Consultancy Services', 3850.00),
@@ -58,8 +208,16 @@ ON DUPLICATE KEY UPDATE
 SHOW TABLES;
 
 -- Display table structures
+DESCRIBE portfolios;
 DESCRIBE transactions;
 DESCRIBE current_prices;
+DESCRIBE lots;
+DESCRIBE lot_matches;
+DESCRIBE holdings;
+DESCRIBE portfolio_nav;
+DESCRIBE portfolio_nav_state;
+DESCRIBE portfolio_attribution;
+DESCRIBE portfolio_attribution_state;
 
 -- Display data
 SELECT * FROM current_prices;
@@ -0,0 +1,30 @@
+# Script verifies the materialized holdings table of the StockMarketApp project against the transaction ledger
+# Every stock's quantity, FIFO cost and realized P&L is recomputed from the transactions and compared
+# with the holdings row. Exits with status 1 when they differ.
+#
+# Usage:
+#   python scripts/reconcile_holdings.py          (report mismatches)
+#   python scripts/reconcile_holdings.py --fix    (rebuild lots and holdings from the ledger on a mismatch)
+#   python scripts/reconcile_holdings.py --portfolio 2   (only check one portfolio)
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.portfolio_data_processor import reconcile_holdings
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the holdings table with the transaction ledger")
+    parser.add_argument('--fix', action='store_true', help="Rebuild lots and holdings when they do not match")
+    parser.add_argument('--portfolio', type=int, default=None, help="Portfolio id to check (default: all portfolios)")
+    args = parser.parse_args()
+
+    success, mismatches = reconcile_holdings(fix=args.fix, portfolio_id=args.portfolio)
+    for mismatch in mismatches:
+        print(mismatch)
+    print("OK: holdings match the ledger" if success and not mismatches else
+          "FIXED: holdings rebuilt from the ledger" if success else
+          "FAILED: holdings do not match the ledger")
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
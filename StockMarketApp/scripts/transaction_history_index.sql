@@ -0,0 +1,12 @@
+-- This script extends the per-stock transactions index for the paginated transaction history (get_transactions_page in data/portfolio_data_processor.py)
+-- New installations get it automatically; run this once on databases created before the Manage Transactions view was paginated.
+-- With transaction_date in the index, a page filtered by stock is read in date order without sorting the stock's whole history.
+-- ================================================
+
+USE stock_market_db;
+
+ALTER TABLE transactions
+    DROP INDEX idx_transactions_portfolio_symbol,
+    ADD INDEX idx_transactions_portfolio_symbol (portfolio_id, stock_symbol, transaction_date);
+
+SELECT 'Transaction history index applied successfully!' AS Status;
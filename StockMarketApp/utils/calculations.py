@@ -2,4 +2,283 @@
 # Author: Ayan Banerjee
 # This script is used to calculate technical indicators for StockMarketApp project.   
 # It includes functions to calculate moving averages, MACD, RSI, and Bollinger Bands.
-# It also includes functions to calculate the percentage change between two values.
\ No newline at end of file
+# It also includes functions to calculate the percentage change between two values.
+# Sections: portfolio valuation (daily NAV), portfolio risk, money-weighted return (XIRR),
+# Monte Carlo simulation and performance attribution; the data/portfolio_*.py modules call them.
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+# ================================================
+# PORTFOLIO VALUATION
+# ================================================
+
+def forward_fill(matrix):
+    # Carry the last known value of every column down the rows (NaN until the first value)
+    rows = np.arange(matrix.shape[0])[:, None]
+    last = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return matrix[last, np.arange(matrix.shape[1])]
+
+def _scatter(n_days, symbols, day, symbol, values, opening):
+    # Days x symbols matrix with values at (day, symbol) and the opening values in row 0, NaN elsewhere
+    matrix = np.full((n_days, len(symbols)), np.nan)
+    matrix[0] = opening.reindex(symbols).to_numpy(dtype=float)
+    matrix[day, symbol] = values
+    return matrix
+
+def daily_nav(dates, trades, closes, opening=None):
+    # Daily portfolio value as one cumulative position x price matrix (days x symbols), no per-day loops
+    # dates: sorted DatetimeIndex of valuation days
+    # trades: DataFrame with date, symbol, quantity (negative for sells) and price, dated within dates
+    # closes: DataFrame with date, symbol and close
+    # opening: state on the day before dates[0] so a cached series can be extended: dict with
+    #          'positions', 'close' and 'trade_price' Series by symbol, and 'net_invested'
+    # Prices are the last close, or the last traded price for stocks without closes.
+    # Returns DataFrame indexed by date with market_value and net_invested
+    opening = opening or {}
+    empty = pd.Series(dtype='float64')
+    open_positions = opening.get('positions', empty)
+    symbols = pd.Index(sorted(set(trades['symbol']) | set(closes['symbol']) | set(open_positions.index)))
+    n_days = len(dates) + 1  # Row 0 holds the opening state
+
+    trade_day = dates.searchsorted(pd.to_datetime(trades['date'])) + 1
+    trade_symbol = symbols.get_indexer(trades['symbol'])
+    quantity = trades['quantity'].to_numpy(dtype=float)
+    price = trades['price'].to_numpy(dtype=float)
+
+    changes = np.zeros((n_days, len(symbols)))
+    changes[0] = open_positions.reindex(symbols).fillna(0).to_numpy(dtype=float)
+    np.add.at(changes, (trade_day, trade_symbol), quantity)
+    positions = changes.cumsum(axis=0)
+
+    flows = np.zeros(n_days)
+    flows[0] = opening.get('net_invested', 0.0)
+    np.add.at(flows, trade_day, quantity * price)
+    net_invested = flows.cumsum()
+
+    close_day = dates.searchsorted(pd.to_datetime(closes['date'])) + 1
+    in_range = close_day < n_days
+    close_matrix = _scatter(n_days, symbols, close_day[in_range], symbols.get_indexer(closes['symbol'])[in_range],
+                            closes['close'].to_numpy(dtype=float)[in_range], opening.get('close', empty))
+    trade_matrix = _scatter(n_days, symbols, trade_day, trade_symbol, price, opening.get('trade_price', empty))
+    close_matrix = forward_fill(close_matrix)
+    prices = np.where(np.isnan(close_matrix), forward_fill(trade_matrix), close_matrix)
+
+    market_value = np.nansum(positions * prices, axis=1)
+    return pd.DataFrame({'market_value': market_value[1:], 'net_invested': net_invested[1:]}, index=dates)
+
+# ================================================
+# PORTFOLIO RISK
+# ================================================
+
+def portfolio_risk(returns, weights, benchmark, risk_free_rate=0.0, confidence=0.95, periods_per_year=252):
+    # Risk of a weighted portfolio from a daily returns matrix, computed with matrix products only
+    # returns: DataFrame of daily returns (days x symbols, NaN where a stock did not trade)
+    # weights: Series of portfolio weights by symbol; benchmark: Series of daily benchmark returns by day
+    # Returns (summary dict, per-holding DataFrame with weight, volatility, beta and risk_contribution)
+    # VaR values are one-day losses as a fraction of the portfolio value (positive = loss)
+    benchmark = benchmark.reindex(returns.index)
+    days = benchmark.notna().to_numpy()
+    matrix = returns.to_numpy(dtype=float)[days]
+    matrix = np.nan_to_num(matrix)  # No trade that day: no return
+    market = benchmark.to_numpy(dtype=float)[days]
+    w = weights.reindex(returns.columns).fillna(0).to_numpy(dtype=float)
+    n = len(matrix)
+
+    demeaned = matrix - matrix.mean(axis=0)
+    market_demeaned = market - market.mean()
+    covariance = demeaned.T @ demeaned / (n - 1)
+    market_variance = market_demeaned @ market_demeaned / (n - 1)
+    betas = demeaned.T @ market_demeaned / (n - 1) / market_variance
+
+    portfolio = matrix @ w
+    variance = w @ covariance @ w
+    daily_sigma = np.sqrt(variance)
+    volatility = daily_sigma * np.sqrt(periods_per_year)
+    excess_return = portfolio.mean() * periods_per_year - risk_free_rate
+    downside = np.minimum(portfolio - risk_free_rate / periods_per_year, 0)
+    downside_volatility = np.sqrt(np.mean(downside ** 2)) * np.sqrt(periods_per_year)
+
+    summary = {
+        'days': n,
+        'annual_return': float(portfolio.mean() * periods_per_year),
+        'volatility': float(volatility),
+        'beta': float(w @ betas),
+        'sharpe': float(excess_return / volatility) if volatility > 0 else np.nan,
+        'sortino': float(excess_return / downside_volatility) if downside_volatility > 0 else np.nan,
+        'var_historical': float(-np.quantile(portfolio, 1 - confidence)),
+        'var_parametric': float(-(portfolio.mean() + NormalDist().inv_cdf(1 - confidence) * daily_sigma))
+    }
+    holdings = pd.DataFrame({
+        'weight': w,
+        'volatility': np.sqrt(np.diag(covariance) * periods_per_year),
+        'beta': betas,
+        'risk_contribution': w * (covariance @ w) / variance if variance > 0 else np.zeros_like(w)  # Shares of the variance, sum to 1
+    }, index=returns.columns)
+    return summary, holdings
+
+# ================================================
+# MONEY-WEIGHTED RETURN (XIRR)
+# ================================================
+
+def _npv(amounts, years, rates):
+    # NPV of every row at its own rate, and the derivative with respect to the rate
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        discount = (1 + rates[:, None]) ** -years[None, :]
+        npv = (amounts * discount).sum(axis=1)
+        slope = -(amounts * years[None, :] * discount).sum(axis=1) / (1 + rates)
+    return npv, slope
+
+_XIRR_MAX_RATE = 1e300  # Highest annual rate searched (any higher and (1 + r) ** years overflows)
+
+def xirr(amounts, years, tolerance=1e-7, max_iterations=100):
+    # Annual rate r of every row that solves sum_j amounts[i, j] * (1 + r) ** -years[j] = 0, all rows at once
+    # amounts: rows x dates matrix of cash flows (money paid in negative, money taken out and the
+    #          current value positive); years: time of each date column in years from the first date
+    # Newton steps are taken while they stay inside each row's sign-change bracket, bisection otherwise.
+    # Returns an array of rates, NaN for rows without a sign change (e.g. no flows or only payments, or a rate above _XIRR_MAX_RATE)
+    amounts = np.asarray(amounts, dtype=float)
+    years = np.asarray(years, dtype=float)
+    n = amounts.shape[0]
+    low = np.full(n, -0.9999)
+    high = np.full(n, 10.0)
+    npv_low, _ = _npv(amounts, years, low)
+    npv_high, _ = _npv(amounts, years, high)
+    # Very short holding periods can have huge annual rates (e.g. +50% in two days): widen the bracket where
+    # needed in log space, squaring the upper bound, up to a float-safe cap
+    for _ in range(10):
+        widen = (np.sign(npv_low) == np.sign(npv_high)) & (high < _XIRR_MAX_RATE)
+        if not widen.any():
+            break
+        high = np.where(widen, np.minimum(high, np.sqrt(_XIRR_MAX_RATE)) ** 2, high)
+        npv_high, _ = _npv(amounts, years, high)
+    solvable = (np.sign(npv_low) != np.sign(npv_high)) & np.isfinite(npv_low) & np.isfinite(npv_high)
+
+    rates = np.where(solvable, np.clip(0.1, low, high), np.nan)
+    active = solvable.copy()
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        npv, slope = _npv(amounts[active], years, rates[active])
+        r, lo, hi, f_lo = rates[active], low[active], high[active], npv_low[active]
+        # Keep the root between lo and hi
+        same_side = np.sign(npv) == np.sign(f_lo)
+        lo, f_lo = np.where(same_side, r, lo), np.where(same_side, npv, f_lo)
+        hi = np.where(same_side, hi, r)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = r - npv / slope
+        # Bisection halves log(1 + r), so brackets spanning many orders of magnitude close as fast as narrow ones
+        bisect = np.expm1((np.log1p(lo) + np.log1p(hi)) / 2)
+        step = np.where(np.isfinite(newton) & (newton > lo) & (newton < hi), newton, bisect)
+        done = (np.abs(step - r) <= tolerance * np.maximum(1, np.abs(r))) | (npv == 0)
+        index = np.flatnonzero(active)
+        rates[index], low[index], high[index], npv_low[index] = step, lo, hi, f_lo
+        active[index[done]] = False
+    return rates
+
+# ================================================
+# MONTE CARLO SIMULATION
+# ================================================
+
+def _simulate_chunk(log_returns, weights, horizon, n_paths, method, checkpoints, seed):
+    # Portfolio value (start = 1) of n_paths buy-and-hold paths at the checkpoint days, a paths x checkpoints float32 matrix
+    # Every asset's log returns are summed along the path, compounded with one exp and weighted with one matrix product
+    rng = np.random.default_rng(seed)
+    n_assets = log_returns.shape[1]
+    if method == 'bootstrap':
+        # Whole historical days are drawn, which keeps the co-movement and fat tails of the stocks.
+        # Each day's draws are added into a paths x assets running total instead of materialising the
+        # days x paths indices or the paths x days x assets tensor, so memory does not grow with the horizon
+        totals = np.zeros((n_paths, n_assets), dtype=np.float32)
+        cumulative = np.empty((len(checkpoints), n_paths, n_assets), dtype=np.float32)
+        day = 0
+        for i, end in enumerate(checkpoints):
+            while day < end:
+                totals += log_returns[rng.integers(0, len(log_returns), size=n_paths)]
+                day += 1
+            cumulative[i] = totals
+    else:
+        # A sum of k daily correlated normal log returns is normal with k times their mean and covariance,
+        # so only the steps between checkpoints are drawn (exact, not an approximation)
+        mean = log_returns.mean(axis=0, dtype=float)
+        covariance = np.cov(log_returns, rowvar=False, dtype=float).reshape(n_assets, n_assets)
+        # Eigen-decomposition instead of Cholesky: sample covariances of short histories are often only semi-definite
+        values, vectors = np.linalg.eigh(covariance)
+        factor = (vectors * np.sqrt(np.clip(values, 0, None))).astype(np.float32)
+        steps = np.diff(checkpoints, prepend=0).astype(np.float32)[:, None, None]
+        cumulative = rng.standard_normal((len(checkpoints), n_paths, n_assets), dtype=np.float32) @ factor.T
+        cumulative *= np.sqrt(steps)
+        cumulative += steps * mean.astype(np.float32)
+        np.cumsum(cumulative, axis=0, out=cumulative)
+    return (np.exp(cumulative, out=cumulative) @ weights.astype(np.float32)).T
+
+def simulate_portfolio_paths(returns, weights, horizon, n_paths, method='bootstrap', checkpoints=None, seed=None,
+                             chunk_elements=4_000_000, workers=1):
+    # Monte Carlo portfolio values for the next horizon trading days
+    # returns: days x assets matrix of historical daily returns (NaN = no trade, counted as 0)
+    # weights: asset weights (summing to 1); method: 'bootstrap' (resample historical days) or
+    #          'normal' (correlated normal log returns with the historical mean and covariance)
+    # checkpoints: days (1..horizon) to record, all days by default
+    # Paths are generated in chunks of about chunk_elements paths x checkpoints x assets numbers to bound memory
+    # (whatever the horizon; a chunk holds about two arrays of that size besides the returned matrix);
+    # workers > 1 spreads the chunks over that many processes. Every chunk gets its own child seed,
+    # so the result only depends on seed, not on the number of workers.
+    # Returns an n_paths x checkpoints float32 matrix of portfolio values relative to today (1.0 = unchanged)
+    log_returns = np.log1p(np.nan_to_num(np.asarray(returns, dtype=float))).astype(np.float32)
+    weights = np.asarray(weights, dtype=float)
+    checkpoints = np.arange(1, horizon + 1) if checkpoints is None else np.asarray(checkpoints)
+    chunk_paths = max(1, int(chunk_elements // (len(checkpoints) * log_returns.shape[1])))
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(log_returns, weights, horizon, size, method, checkpoints, child) for size, child in zip(sizes, seeds)]
+
+    values = np.empty((n_paths, len(checkpoints)), dtype=np.float32)
+    parallel = workers > 1 and len(tasks) > 1
+    start = 0
+    with ProcessPoolExecutor(max_workers=workers) if parallel else nullcontext() as pool:
+        for chunk in (pool.map if parallel else map)(_simulate_chunk, *zip(*tasks)):
+            values[start:start + len(chunk)] = chunk
+            start += len(chunk)
+    return values
+
+# ================================================
+# PERFORMANCE ATTRIBUTION
+# ================================================
+
+def brinson_attribution(portfolio_weights, portfolio_returns, benchmark_weights, benchmark_returns):
+    # Brinson-Fachler allocation, selection and interaction effects of every period and sector at once
+    # All arguments are periods x sectors arrays (benchmark_weights may be one row for all periods);
+    # weights of a period sum to 1. Sectors the portfolio does not hold (NaN return) earn the benchmark
+    # sector return, so they only have an allocation effect.
+    # Returns (allocation, selection, interaction, portfolio total return, benchmark total return);
+    # per period, the three effects summed over the sectors equal portfolio minus benchmark return
+    wp = np.asarray(portfolio_weights, dtype=float)
+    wb = np.broadcast_to(np.asarray(benchmark_weights, dtype=float), wp.shape)
+    rb = np.asarray(benchmark_returns, dtype=float)
+    rp = np.where(np.isnan(portfolio_returns), rb, portfolio_returns)
+    portfolio_total = (wp * rp).sum(axis=1)
+    benchmark_total = (wb * rb).sum(axis=1)
+    allocation = (wp - wb) * (rb - benchmark_total[:, None])
+    selection = wb * (rp - rb)
+    interaction = (wp - wb) * (rp - rb)
+    return allocation, selection, interaction, portfolio_total, benchmark_total
+
+def _carino(portfolio, benchmark):
+    # Carino scaling factor (ln(1 + Rp) - ln(1 + Rb)) / (Rp - Rb), or 1 / (1 + R) when the returns are equal
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (np.log1p(portfolio) - np.log1p(benchmark)) / (portfolio - benchmark)
+    return np.where(np.isclose(portfolio, benchmark), 1 / (1 + portfolio), factor)
+
+def link_effects(effects, portfolio_total, benchmark_total):
+    # Carino-linked multi-period effects: each period's effects (periods x sectors) are scaled so that the
+    # sums over periods and sectors add up to the compounded portfolio minus compounded benchmark return
+    portfolio_total = np.asarray(portfolio_total, dtype=float)
+    benchmark_total = np.asarray(benchmark_total, dtype=float)
+    compounded_portfolio = np.prod(1 + portfolio_total) - 1
+    compounded_benchmark = np.prod(1 + benchmark_total) - 1
+    weights = _carino(portfolio_total, benchmark_total) / _carino(compounded_portfolio, compounded_benchmark)
+    return (np.asarray(effects, dtype=float) * weights[:, None]).sum(axis=0)
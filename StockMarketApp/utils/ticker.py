@@ -0,0 +1,79 @@
+# File contains the scrolling ticker renderer for StockMarketApp project
+# This script builds the HTML of the Nifty index and stock tickers (pages/dashboard.py) and the news ticker (pages/news.py).
+# Tiles are generated with whole-column string operations instead of a Python loop over rows, so a Nifty 500
+# ticker renders as fast as a Nifty 50 one, and the result is cached per ticker until its data version changes.
+# All tickers share one stylesheet, assets/css/custom.css, which is read once per process.
+
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "css", "custom.css")
+
+# ================================================
+# STYLESHEET
+# ================================================
+
+@lru_cache(maxsize=None)
+def ticker_css() -> str:
+    # The shared stylesheet as a <style> block (st.markdown it once per page, or prepend it inside components.html)
+    with open(CSS_PATH, encoding="utf-8") as css_file:
+        return f"<style>\n{css_file.read()}\n</style>"
+
+# ================================================
+# TILES (vectorized)
+# ================================================
+
+_HTML_ENTITIES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;'))
+
+def _text(values) -> pd.Series:
+    # HTML-escaped text column ('&' first, so entities are not escaped twice)
+    text = pd.Series(values, dtype='string').reset_index(drop=True).fillna('')
+    for char, entity in _HTML_ENTITIES:
+        text = text.str.replace(char, entity, regex=False)
+    return text
+
+def _number(values, fmt='%.2f') -> pd.Series:
+    # Numbers formatted in one numpy call; missing values shown as '-'
+    numbers = pd.to_numeric(pd.Series(values).reset_index(drop=True), errors='coerce').to_numpy(dtype=float)
+    return pd.Series(np.where(np.isnan(numbers), '-', np.char.mod(fmt, numbers)), dtype='string')
+
+def _wrap(tiles, seconds_per_tile, css_class=''):
+    # Scrolling strip around the tiles; the scroll time grows with the number of tiles so long tickers stay readable
+    duration = max(len(tiles) * seconds_per_tile, 10)
+    return (f'<div class="{" ".join(filter(None, ["ticker-wrap", css_class]))}"><div class="ticker-move" style="animation-duration: {duration:.0f}s">'
+            f'{tiles.str.cat()}</div></div>')
+
+def price_ticker(labels, prices, changes, seconds_per_tile=2.0) -> str:
+    # Ticker of label, price and coloured percentage change tiles (e.g. index_name, last_price, percentage_change)
+    percent = pd.to_numeric(pd.Series(changes).reset_index(drop=True), errors='coerce')
+    color_class = pd.Series(np.where(percent.to_numpy() >= 0, 'positive', 'negative'), dtype='string')
+    tiles = ('<div class="ticker-item"><strong>' + _text(labels) + '</strong> ' + _number(prices)
+             + '  <span class="' + color_class + '">' + _number(changes) + '%</span></div>')
+    return _wrap(tiles, seconds_per_tile)
+
+def news_ticker(titles, sources, dates, images, fallback_image, seconds_per_tile=7.0) -> str:
+    # Ticker of news cards; a missing or broken thumbnail is replaced with fallback_image (e.g. a data URI)
+    tiles = ('<div class="ticker-item"><img src="' + _text(images) + '" alt="News Image" onerror="this.onerror=null; this.src=\''
+             + fallback_image + '\'"/><strong>' + _text(titles) + '</strong><span class="source">Source: ' + _text(sources)
+             + '</span><span class="date">Date: ' + _text(dates) + '</span></div>')
+    return _wrap(tiles, seconds_per_tile, 'news')
+
+# ================================================
+# FRAGMENT CACHE
+# ================================================
+
+_rendered = {}  # ticker name -> (data version, HTML)
+_rendered_lock = threading.Lock()
+
+def cached_ticker(name, version, render) -> str:
+    # HTML of a ticker; render() runs only when the ticker's data version changed since the last call
+    cached = _rendered.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    html = render()
+    with _rendered_lock:
+        _rendered[name] = (version, html)
+    return html